@@ -0,0 +1,151 @@
+"""
+AsyncNeonBrain — asyncio-native brain for the FastAPI backend.
+
+NeonBrain.chat() blocks a worker thread inside requests for up to TIMEOUT
+seconds. AsyncNeonBrain keeps the exact same turn logic (it reuses
+_prepare_turn / _complete_turn) but awaits Ollama over a pooled
+httpx.AsyncClient, and pushes tool execution (subprocess / browser / Selenium)
+to a worker thread, so one uvicorn worker can serve many phone clients.
+
+Usage:
+    brain = AsyncNeonBrain()
+    reply = await brain.achat("open youtube on mobile", target="mobile")
+
+The sync chat() / chat_stream() API is still available on the same object.
+Note: like NeonBrain, one instance holds ONE conversation — concurrent turns
+on the same instance share history and emotion state.
+"""
+
+import time
+import asyncio
+from typing import Dict, Optional
+
+try:
+    import httpx
+    _HTTPX_OK = True
+except ImportError:
+    print("[WARN] httpx not installed — AsyncNeonBrain will run HTTP in threads. Run: pip install httpx")
+    httpx = None
+    _HTTPX_OK = False
+
+try:
+    from brain.llm import NeonBrain, OLLAMA_URL, TIMEOUT, TURN_DEADLINE, CONNECT_TIMEOUT, OFFLINE_REPLY
+except ImportError:
+    from llm import NeonBrain, OLLAMA_URL, TIMEOUT, TURN_DEADLINE, CONNECT_TIMEOUT, OFFLINE_REPLY
+
+# Connection pool for the async client — one pool per event loop, shared by
+# every AsyncNeonBrain (one brain per session, see brain/sessions.py)
+ASYNC_MAX_CONNECTIONS = 32
+ASYNC_MAX_KEEPALIVE   = 16
+
+_aclient = None
+_aclient_loop = None
+
+
+def _get_aclient():
+    global _aclient, _aclient_loop
+    # httpx clients are bound to the loop they were first used on
+    loop = asyncio.get_running_loop()
+    if _aclient is None or _aclient_loop is not loop:
+        _aclient = httpx.AsyncClient(
+            timeout=TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=ASYNC_MAX_KEEPALIVE,
+            ),
+        )
+        _aclient_loop = loop
+    return _aclient
+
+
+async def aclose_shared_client() -> None:
+    """Close the shared async pool (call from the FastAPI shutdown hook)."""
+    global _aclient, _aclient_loop
+    if _aclient is not None:
+        await _aclient.aclose()
+        _aclient = None
+        _aclient_loop = None
+
+
+class AsyncNeonBrain(NeonBrain):
+    def _abreaker_record(self, exc: Optional[Exception] = None) -> None:
+        """_breaker_record() for httpx errors."""
+        if self.breaker is None:
+            return
+        response = getattr(exc, "response", None) if isinstance(exc, httpx.HTTPStatusError) else None
+        if isinstance(exc, httpx.TransportError) or (response is not None and response.status_code >= 500):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    async def _apost(self, payload: Dict, label: str = "", deadline: Optional[float] = None) -> Optional[Dict]:
+        """Async twin of NeonBrain._post()."""
+        if deadline is None:
+            deadline = time.time() + TURN_DEADLINE
+        if not _HTTPX_OK:
+            return await asyncio.to_thread(self._post, payload, label, deadline)
+        if not self._breaker_allows(label):
+            return None
+
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            print(f"[WARN] [NEON] Timeout during {label or 'request'}")
+            return None
+        client = _get_aclient()
+        try:
+            resp = await client.post(
+                OLLAMA_URL, json=payload,
+                timeout=httpx.Timeout(remaining, connect=min(CONNECT_TIMEOUT, remaining)),
+            )
+            # 404 = missing model / no /api/chat: rare, so reuse the sync
+            # fallback chain (model swap, /api/generate) off the event loop.
+            if resp.status_code == 404:
+                return await asyncio.to_thread(self._post, payload, label, deadline)
+            resp.raise_for_status()
+            self._abreaker_record()
+            return resp.json()
+        except httpx.TimeoutException as e:
+            self._abreaker_record(e)
+            print(f"[WARN] [NEON] Timeout during {label or 'request'}")
+            return None
+        except Exception as e:
+            self._abreaker_record(e)
+            print(f"[ERROR] [NEON NET ERROR] {label}: {e}")
+            return None
+
+    async def achat(self, user_input: str, target: str = "auto") -> Optional[str]:
+        """Async twin of NeonBrain.chat()."""
+        self._begin_trace()
+        try:
+            return await self._achat_turn(user_input, target)
+        finally:
+            self._end_trace()
+
+    async def _achat_turn(self, user_input: str, target: str) -> Optional[str]:
+        turn, early_reply = self._prepare_turn(user_input, target)
+        if turn is None:
+            return early_reply
+        if turn["fast_message"] is not None:
+            # Fast-path command: no model call, but the tool may still block
+            return await asyncio.to_thread(self._complete_turn, turn, turn["fast_message"])
+        cached = self._cached_reply(turn)
+        if cached is not None:
+            return cached
+
+        with self._trace.span("http"):
+            if turn["hedge_model"]:
+                # Two racing streams + cancellation live in threads (see brain/hedging.py)
+                response = await asyncio.to_thread(self._post_hedged, turn)
+            else:
+                response = await self._apost(turn["payload"], label="primary", deadline=turn["deadline"])
+        if response is None:
+            self._trace.set(outcome="offline")
+            return OFFLINE_REPLY
+
+        self._record_eval_stats(response, turn)
+        message_data = response.get("message", {})
+        self._store_cached_reply(turn, message_data)
+        if turn["is_command"] and message_data.get("tool_calls"):
+            # Tools shell out / open browsers / drive Selenium — keep them off the loop
+            return await asyncio.to_thread(self._complete_turn, turn, message_data)
+        return self._complete_turn(turn, message_data)
@@ -0,0 +1,163 @@
+"""
+Neon Async Tools — slow tools answer now and deliver their result later.
+
+play_music on YouTube can sit 15 s in yt-dlp plus 10 s in the HTML fallback,
+and send_whatsapp_message can wait 45 s in WebDriverWait; the whole turn (and
+the CLI) used to freeze until they returned. With async tools on, a call that
+is slow for its arguments (is_slow) is handed to an AsyncToolRunner instead:
+
+  1. the turn gets a pending result right away — an acknowledgement, said
+     as-is ("Finding 'lofi' on YouTube…"): the success flavor would report
+     a send that hasn't happened yet — plus a handle {"id", "tool"}
+     (brain.last_pending)
+  2. the tool runs on a background worker
+  3. when it finishes, the brain flavors a success (an error keeps the
+     tool's own message) and delivers
+         {"id", "tool", "status", "reply", "action", "elapsed_ms"}
+     to the on_result callback and to the runner's result queue
+
+Consumers: main.py prints / speaks results from the callback; the backend
+polls neon_brain.poll_tool_results(session_id) (think_and_reply returns the
+handles under "pending") and forwards `reply` / `action` to the phone.
+
+Off by default for the backend (the app has to poll for the action):
+NEON_ASYNC_TOOLS=1 turns it on for every brain, brain.enable_async_tools()
+for one.
+"""
+
+import os
+import time
+import queue
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from brain.youtube_cache import get_shared_youtube_cache, YT_CACHE_ENABLED
+except ImportError:
+    from youtube_cache import get_shared_youtube_cache, YT_CACHE_ENABLED
+
+ASYNC_TOOLS_ENABLED = os.getenv("NEON_ASYNC_TOOLS", "0").strip() == "1"
+ASYNC_TOOL_WORKERS  = 2
+RESULT_QUEUE_SIZE   = 100   # undelivered results kept per brain; the oldest go first
+
+_YOUTUBE = {"youtube", "yt", "youtube music", "youtubemusic"}
+
+
+def _music_is_slow(args: Dict) -> bool:
+    # Only a YouTube lookup with autoplay resolves a video; Spotify is a URL
+    platform = str(args.get("platform") or "").strip().lower()
+    query = str(args.get("query") or "").strip()
+    if platform not in _YOUTUBE or not query or args.get("autoplay", True) is False:
+        return False
+    # Already resolved once (brain/youtube_cache.py): answers instantly
+    return not (YT_CACHE_ENABLED and query in get_shared_youtube_cache())
+
+
+SLOW_TOOLS: Dict[str, Callable[[Dict], bool]] = {
+    "play_music":            _music_is_slow,
+    "send_whatsapp_message": lambda args: True,
+}
+
+
+def is_slow(tool: str, args: Dict) -> bool:
+    check = SLOW_TOOLS.get(tool)
+    return bool(check and check(args))
+
+
+def acknowledgement(tool: str, args: Dict) -> str:
+    if tool == "play_music":
+        return f"Finding '{args.get('query', '')}' on YouTube, it will start in a moment."
+    if tool == "send_whatsapp_message":
+        return f"Sending that to {args.get('contact_name') or 'them'} on WhatsApp. I'll tell you when it's through."
+    return f"Working on {tool.replace('_', ' ')} in the background."
+
+
+class PendingTool:
+    __slots__ = ("id", "tool", "args", "started", "done")
+
+    def __init__(self, handle_id: str, tool: str, args: Dict):
+        self.id      = handle_id
+        self.tool    = tool
+        self.args    = dict(args)
+        self.started = time.time()
+        self.done    = False
+
+    def to_dict(self) -> Dict:
+        return {"id": self.id, "tool": self.tool}
+
+
+class AsyncToolRunner:
+    def __init__(self, workers: int = ASYNC_TOOL_WORKERS,
+                 on_result: Optional[Callable[[Dict], None]] = None,
+                 max_queued: int = RESULT_QUEUE_SIZE):
+        self.on_result = on_result
+        self.results: "queue.Queue[Dict]" = queue.Queue(maxsize=max(1, int(max_queued)))
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="neon-async-tool")
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._pending: Dict[str, PendingTool] = {}
+        self.completed = 0
+
+    def submit(self, tool: str, args: Dict, work: Callable[[], Any],
+               finish: Callable[[Any], Dict]) -> PendingTool:
+        """
+        Runs work() in the background; finish(raw_result) turns its result
+        into the delivered dict (reply / action / status).
+        """
+        handle = PendingTool(f"{tool}-{next(self._ids)}", tool, args)
+        with self._lock:
+            self._pending[handle.id] = handle
+        self._pool.submit(self._run, handle, work, finish)
+        return handle
+
+    def _run(self, handle: PendingTool, work: Callable[[], Any], finish: Callable[[Any], Dict]) -> None:
+        try:
+            delivered = finish(work())
+        except Exception as e:
+            delivered = {"status": "error", "reply": f"{handle.tool.replace('_', ' ')} failed: {e}", "action": None}
+        delivered = {
+            **delivered,
+            "id":         handle.id,
+            "tool":       handle.tool,
+            "elapsed_ms": round((time.time() - handle.started) * 1000, 1),
+        }
+        with self._lock:
+            handle.done = True
+            self._pending.pop(handle.id, None)
+            self.completed += 1
+        if self.on_result is not None:
+            try:
+                self.on_result(delivered)
+            except Exception as e:
+                print(f"[WARN] [NEON] Async tool callback failed: {e}")
+        while True:
+            try:
+                self.results.put_nowait(delivered)
+                break
+            except queue.Full:
+                try:
+                    self.results.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def poll(self, timeout: float = 0.0) -> List[Dict]:
+        """Finished results not yet consumed; waits up to `timeout` for the first one."""
+        out: List[Dict] = []
+        try:
+            out.append(self.results.get(timeout=timeout) if timeout > 0 else self.results.get_nowait())
+        except queue.Empty:
+            return out
+        while True:
+            try:
+                out.append(self.results.get_nowait())
+            except queue.Empty:
+                return out
+
+    def pending(self) -> List[Dict]:
+        with self._lock:
+            return [h.to_dict() for h in self._pending.values()]
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,139 @@
+"""
+Neon Circuit Breaker — stop waiting on an Ollama that isn't answering.
+
+Without it every turn against a hung server pays the full request timeout
+(plus connection retries) before saying "I can't reach my model server".
+The breaker counts consecutive outages (timeouts, refused connections, 5xx):
+
+    CLOSED     normal; NEON_BREAKER_FAILURES outages in a row → OPEN
+    OPEN       turns fail fast without touching the network; a background
+               probe GETs /api/tags every NEON_BREAKER_PROBE_S seconds
+    HALF_OPEN  the probe got a 200 — requests go through again; the first
+               success closes the breaker, the first outage re-opens it
+
+/api/tags answering doesn't prove /api/chat will (a wedged model can hang
+while the HTTP server is fine), which is why the probe only half-opens it.
+
+One breaker per process is shared by every brain (get_shared_breaker).
+"""
+
+import os
+import time
+import threading
+from typing import Dict, Optional
+
+import requests
+
+BREAKER_ENABLED  = os.getenv("NEON_BREAKER", "1").strip() != "0"
+BREAKER_FAILURES = int(os.getenv("NEON_BREAKER_FAILURES", "3"))
+BREAKER_PROBE_S  = float(os.getenv("NEON_BREAKER_PROBE_S", "5"))
+
+CLOSED    = "closed"
+OPEN      = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        session: requests.Session,
+        probe_url: str,
+        failure_threshold: int = BREAKER_FAILURES,
+        probe_interval: float = BREAKER_PROBE_S,
+    ):
+        self.session           = session
+        self.probe_url         = probe_url
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.probe_interval    = max(0.05, float(probe_interval))
+
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+        self._probe_thread: Optional[threading.Thread] = None
+        self.opens = 0
+        self.fast_failures = 0
+
+    # ── GATE ──────────────────────────────────────────────────────────────────
+
+    def allow(self) -> bool:
+        """False while OPEN (the caller should fail fast)."""
+        with self._lock:
+            if self.state != OPEN:
+                return True
+            self.fast_failures += 1
+        self._ensure_probe()
+        return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            was = self.state
+            self.state = CLOSED
+            self._failures = 0
+        if was != CLOSED:
+            print("[NEON] Ollama answering again — circuit closed")
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            tripped = self.state == HALF_OPEN or (
+                self.state == CLOSED and self._failures >= self.failure_threshold
+            )
+            if tripped:
+                self.state = OPEN
+                self._opened_at = time.time()
+                self.opens += 1
+        if tripped:
+            print(f"[WARN] [NEON] Ollama not answering — circuit open, probing every {self.probe_interval:g}s")
+            self._ensure_probe()
+
+    # ── BACKGROUND PROBE ──────────────────────────────────────────────────────
+
+    def _ensure_probe(self) -> None:
+        with self._lock:
+            if self._probe_thread is not None:
+                return
+            self._probe_thread = threading.Thread(target=self._probe_loop, name="neon-breaker-probe", daemon=True)
+            self._probe_thread.start()
+
+    def _probe_loop(self) -> None:
+        while True:
+            time.sleep(self.probe_interval)
+            try:
+                ok = self.session.get(self.probe_url, timeout=2).status_code == 200
+            except Exception:
+                ok = False
+            with self._lock:
+                # Exit decisions happen under the lock so a re-open can't miss a probe
+                if self.state != OPEN:
+                    self._probe_thread = None
+                    return
+                if ok:
+                    self.state = HALF_OPEN
+                    self._probe_thread = None
+                    break
+        print("[NEON] Ollama probe answered — circuit half-open")
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "state":         self.state,
+                "failures":      self._failures,
+                "open_for_s":    round(time.time() - self._opened_at, 1) if self.state == OPEN else 0.0,
+                "opens":         self.opens,
+                "fast_failures": self.fast_failures,
+            }
+
+
+# One breaker per process: every brain talks to the same Ollama
+_SHARED_BREAKER: Optional[CircuitBreaker] = None
+_SHARED_BREAKER_LOCK = threading.Lock()
+
+
+def get_shared_breaker(**kwargs) -> CircuitBreaker:
+    global _SHARED_BREAKER
+    if _SHARED_BREAKER is None:
+        with _SHARED_BREAKER_LOCK:
+            if _SHARED_BREAKER is None:
+                _SHARED_BREAKER = CircuitBreaker(**kwargs)
+    return _SHARED_BREAKER
@@ -0,0 +1,194 @@
+"""
+Neon Hedged Requests — race SMALL against a slow LARGE under a deadline.
+
+For turns that prefer the large model but could live with the small one, a
+hedged request sends the large-model request first and, if it hasn't
+finished after NEON_HEDGE_DELAY_MS, the same context to the small model.
+Whichever completes first wins; the loser's HTTP stream is closed, which
+makes Ollama stop generating for it. If neither finishes before the
+deadline, the caller gets None (same as a timeout in _post).
+
+Both legs stream internally so that cancellation takes effect between
+chunks instead of after a full generation.
+
+HedgeStats counts how each hedged turn ended so NEON_HEDGE_DELAY_MS can be
+tuned: lots of primary_fast means the delay is long enough to rarely fire;
+lots of hedge_wins means the large model is routinely slower than delay +
+small model.
+
+Opt-in with NEON_HEDGE=1.
+"""
+
+import os
+import json
+import time
+import queue
+import threading
+from typing import Dict, Optional
+
+HEDGE_ENABLED  = os.getenv("NEON_HEDGE", "0").strip() == "1"
+HEDGE_DELAY_MS = float(os.getenv("NEON_HEDGE_DELAY_MS", "1500"))
+
+
+class HedgeStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.primary_fast = 0    # primary done before the hedge was even sent
+        self.primary_wins = 0    # hedge sent, primary still finished first
+        self.hedge_wins   = 0    # hedge model finished first
+        self.failures     = 0    # nothing usable before the deadline
+
+    def add(self, outcome: str) -> None:
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            hedged = self.primary_wins + self.hedge_wins
+            return {
+                "turns":          self.primary_fast + hedged + self.failures,
+                "primary_fast":   self.primary_fast,
+                "primary_wins":   self.primary_wins,
+                "hedge_wins":     self.hedge_wins,
+                "failures":       self.failures,
+                "hedge_win_rate": round(self.hedge_wins / hedged, 3) if hedged else 0.0,
+            }
+
+
+HEDGE_STATS = HedgeStats()
+
+
+def _run_leg(session, url: str, payload: Dict, cancel: threading.Event, holder: Dict, timeout: float) -> Optional[Dict]:
+    """
+    One streamed /api/chat call folded back into a non-streaming response
+    dict ({"model", "message", timings...}). None on error or cancellation.
+    """
+    body = dict(payload)
+    body["stream"] = True
+    try:
+        resp = session.post(url, json=body, timeout=timeout, stream=True)
+    except Exception:
+        return None
+    holder["resp"] = resp
+    if cancel.is_set():
+        resp.close()
+        return None
+
+    content, tool_calls, final = [], [], {}
+    try:
+        with resp:
+            if resp.status_code != 200:
+                return None
+            for line in resp.iter_lines(chunk_size=None):
+                if cancel.is_set():
+                    return None
+                if not line:
+                    continue
+                try:
+                    chunk = json.loads(line)
+                except ValueError:
+                    continue
+                if chunk.get("error"):
+                    return None
+                msg = chunk.get("message") or {}
+                if msg.get("content"):
+                    content.append(msg["content"])
+                if msg.get("tool_calls"):
+                    tool_calls.extend(msg["tool_calls"])
+                if chunk.get("done"):
+                    final = chunk
+                    break
+    except Exception:
+        # Includes the error raised when the winner closes our stream
+        return None
+    if cancel.is_set() or not final:
+        return None
+
+    result = {k: v for k, v in final.items() if k.endswith(("_count", "_duration"))}
+    result["model"] = payload.get("model")
+    result["done"] = True
+    result["message"] = {"role": "assistant", "content": "".join(content)}
+    if tool_calls:
+        result["message"]["tool_calls"] = tool_calls
+    return result
+
+
+def hedged_post(
+    session,
+    url: str,
+    payload: Dict,
+    hedge_model: str,
+    delay_s: float,
+    deadline_s: float,
+    stats: HedgeStats = HEDGE_STATS,
+    hedge_options: Optional[Dict] = None,
+) -> Optional[Dict]:
+    """
+    Sends `payload`, then after `delay_s` the same payload on `hedge_model`
+    (with `hedge_options` if given). Returns the first successful response
+    (its "model" says who won), or None if nothing succeeded within
+    `deadline_s`.
+    """
+    start = time.time()
+    results: "queue.Queue" = queue.Queue()
+    legs = {}
+
+    def _launch(name: str, leg_payload: Dict) -> None:
+        cancel, holder = threading.Event(), {}
+        legs[name] = (cancel, holder)
+        remaining = max(1.0, deadline_s - (time.time() - start))
+        threading.Thread(
+            target=lambda: results.put((name, _run_leg(session, url, leg_payload, cancel, holder, remaining))),
+            name=f"neon-hedge-{name}",
+            daemon=True,
+        ).start()
+
+    def _cancel(name: str) -> None:
+        cancel, holder = legs[name]
+        cancel.set()
+        resp = holder.get("resp")
+        if resp is not None:
+            try:
+                resp.close()
+            except Exception:
+                pass
+
+    _launch("primary", payload)
+    try:
+        name, result = results.get(timeout=max(0.0, delay_s))
+        if result is not None:
+            stats.add("primary_fast")
+            return result
+        pending = 0   # primary already failed; the hedge is the only hope
+    except queue.Empty:
+        pending = 1
+
+    hedge_payload = dict(payload)
+    hedge_payload["model"] = hedge_model
+    if hedge_options is not None:
+        hedge_payload["options"] = hedge_options
+    _launch("hedge", hedge_payload)
+    pending += 1
+
+    while pending:
+        remaining = deadline_s - (time.time() - start)
+        if remaining <= 0:
+            break
+        try:
+            name, result = results.get(timeout=remaining)
+        except queue.Empty:
+            break
+        pending -= 1
+        if result is None:
+            continue
+        for other in legs:
+            if other != name:
+                _cancel(other)
+        stats.add("hedge_wins" if name == "hedge" else "primary_wins")
+        print(f"[NEON] Hedge: {result['model']} won after {time.time() - start:.2f}s")
+        return result
+
+    for name in legs:
+        _cancel(name)
+    stats.add("failures")
+    return None
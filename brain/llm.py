@@ -3,11 +3,12 @@ import re
 import sys
 import json
 import time
+import functools
 import threading
-import inspect
 import requests
 from collections import deque
-from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Dict, Optional
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
@@ -41,9 +42,9 @@ except ImportError:
     from system_controller import SystemController
 
 try:
-    from prompt import get_system_prompt
+    from prompt import get_cached_system_prompt
 except ImportError:
-    from brain.prompt import get_system_prompt
+    from brain.prompt import get_cached_system_prompt
 
 try:
     from core.emotion import EmotionEngine
@@ -58,9 +59,12 @@ except ImportError:
     sys.exit(1)
 
 try:
-    from style.postprocess import postprocess_reply
+    from style.postprocess import postprocess_reply, split_complete_sentences
 except ImportError:
     def postprocess_reply(text): return text.strip().replace('"', '')
+    def split_complete_sentences(buffer, min_chars=12):
+        parts = re.split(r"(?<=[.!?])\s+", buffer or "")
+        return [p for p in parts[:-1] if p.strip()], parts[-1]
 
 try:
     from brain.personality import add_lived_in_personality
@@ -68,6 +72,65 @@ except ImportError:
     def add_lived_in_personality(reply: str, status: Dict, **kwargs) -> str:
         return reply
 
+try:
+    from brain.model_registry import get_shared_registry
+except ImportError:
+    from model_registry import get_shared_registry
+
+try:
+    from brain import response_cache
+except ImportError:
+    import response_cache
+
+try:
+    from brain.router import get_shared_router, ROUTER_ENABLED
+except ImportError:
+    from router import get_shared_router, ROUTER_ENABLED
+
+try:
+    from brain.hedging import hedged_post, HEDGE_ENABLED, HEDGE_DELAY_MS, HEDGE_STATS
+except ImportError:
+    from hedging import hedged_post, HEDGE_ENABLED, HEDGE_DELAY_MS, HEDGE_STATS
+
+try:
+    from brain import token_budget
+except ImportError:
+    import token_budget
+
+try:
+    from brain.summarizer import RollingSummarizer, SUMMARY_ENABLED
+except ImportError:
+    from summarizer import RollingSummarizer, SUMMARY_ENABLED
+
+try:
+    from brain.tool_selector import get_shared_selector, TOOL_PRUNING_ENABLED
+except ImportError:
+    from tool_selector import get_shared_selector, TOOL_PRUNING_ENABLED
+
+try:
+    from brain.tool_executor import run_tool_calls, TOOL_WORKERS
+except ImportError:
+    from tool_executor import run_tool_calls, TOOL_WORKERS
+try:
+    from brain.async_tools import AsyncToolRunner, ASYNC_TOOLS_ENABLED, is_slow, acknowledgement
+except ImportError:
+    from async_tools import AsyncToolRunner, ASYNC_TOOLS_ENABLED, is_slow, acknowledgement
+
+try:
+    from brain.tracing import TurnTrace, NULL_TRACE, get_shared_trace_stats, TRACE_ENABLED
+except ImportError:
+    from tracing import TurnTrace, NULL_TRACE, get_shared_trace_stats, TRACE_ENABLED
+
+try:
+    from brain.circuit_breaker import get_shared_breaker, BREAKER_ENABLED
+except ImportError:
+    from circuit_breaker import get_shared_breaker, BREAKER_ENABLED
+
+try:
+    from brain.warmup import get_shared_warmer, WARMUP_ENABLED
+except ImportError:
+    from warmup import get_shared_warmer, WARMUP_ENABLED
+
 try:
     from brain.command_flavor import flavor_command_response, flavor_multi_results
 except ImportError:
@@ -77,15 +140,42 @@ except ImportError:
         return "\n".join(results) if results else ""
 
 # ── CONFIGURATION ────────────────────────────────────────────────────────────
-OLLAMA_URL   = "http://localhost:11434/api/chat"
-OLLAMA_GENERATE_URL = "http://localhost:11434/api/generate"
-CHECK_URL    = "http://localhost:11434/api/tags"
+OLLAMA_BASE_URL = os.getenv("NEON_OLLAMA_URL", "http://localhost:11434").rstrip("/")
+OLLAMA_URL   = f"{OLLAMA_BASE_URL}/api/chat"
+OLLAMA_GENERATE_URL = f"{OLLAMA_BASE_URL}/api/generate"
+CHECK_URL    = f"{OLLAMA_BASE_URL}/api/tags"
+OLLAMA_SHOW_URL = f"{OLLAMA_BASE_URL}/api/show"
 # Primary model (higher quality) + small model (lower latency/cost)
 LARGE_MODEL_NAME = os.getenv("NEON_MODEL_LARGE", "llama3.2:3b")
 SMALL_MODEL_NAME = os.getenv("NEON_MODEL_SMALL", "llama3.2:1b")
 MAX_HISTORY  = 20
+HISTORY_WINDOW = 10   # messages sent with a chat turn (technical turns send 6)
 TIMEOUT      = 45
+# One budget for the whole turn: connection retries, 404 fallbacks and the
+# hedge all have to fit inside it
+TURN_DEADLINE = float(os.getenv("NEON_TURN_DEADLINE", str(TIMEOUT)))
+CONNECT_TIMEOUT = 3.0
+HTTP_RETRIES = 2
 SLOW_WARN    = 8
+HTTP_POOL_SIZE = 32   # keep-alive connections to Ollama (shared by all sessions)
+# chat_many(): requests in flight at once; match the server's OLLAMA_NUM_PARALLEL
+MAX_PARALLEL = int(os.getenv("NEON_MAX_PARALLEL", os.getenv("OLLAMA_NUM_PARALLEL", "") or "4"))
+EVAL_STATS_WINDOW = 50  # recent turns kept for prompt_eval stats
+OFFLINE_REPLY = "I can't reach my model server right now. Say 'status' and I'll tell you what's down."
+
+def _parse_keep_alive(value: str):
+    """Ollama wants seconds as a number ("-1" = forever) or a duration string ("30m")."""
+    value = (value or "").strip()
+    try:
+        return int(value)
+    except ValueError:
+        return value or "30m"
+
+# Keep the model (and its prompt cache) loaded between turns
+KEEP_ALIVE = _parse_keep_alive(os.getenv("NEON_KEEP_ALIVE", "30m"))
+
+# Rule-based command fast-path (skips the LLM for unambiguous commands)
+FAST_PATH_ENABLED = os.getenv("NEON_FAST_PATH", "1").strip() != "0"
 
 # ── INTENT DETECTION ─────────────────────────────────────────────────────────
 _COMMAND_RE = re.compile(
@@ -194,7 +284,7 @@ def _detect_target(raw_lower: str) -> str:
     if (
         "desktop" in raw_lower
         or "destop" in raw_lower
-        or "pc" in raw_lower
+        or re.search(r"\bpc\b", raw_lower)
         or "computer" in raw_lower
         or "laptop" in raw_lower
     ):
@@ -206,7 +296,7 @@ def _detect_platform(raw_lower: str) -> Optional[str]:
         return None
     if "youtube music" in raw_lower or "youtubemusic" in raw_lower:
         return "youtube"
-    if "youtube" in raw_lower or "yt" in raw_lower:
+    if "youtube" in raw_lower or re.search(r"\byt\b", raw_lower):
         return "youtube"
     if "spotify" in raw_lower:
         return "spotify"
@@ -249,6 +339,167 @@ def _select_model(technical: bool, is_command: bool) -> str:
     """
     return LARGE_MODEL_NAME if (technical or is_command) else SMALL_MODEL_NAME
 
+# ── DETERMINISTIC COMMAND FAST-PATH ──────────────────────────────────────────
+# Unambiguous one-shot commands are mapped straight to a tool call. The LLM's
+# wording would be replaced by flavor_command_response anyway, so the model
+# round trip buys nothing. Anything that doesn't match exactly — questions,
+# chained requests, vague music requests, unknown apps — falls through to the
+# LLM. High-risk tools (power, delete, WhatsApp, wifi) are never fast-pathed.
+_FAST_PREFIX_RE = re.compile(
+    r"^(?:(?:hey|ok|okay|yo)\s+)?(?:neon[\s,]+)?(?:(?:can|could|would)\s+you\s+)?(?:please\s+)?",
+)
+_FAST_SUFFIXES = (" please", " for me", " right now", " now", " neon")
+_FAST_TARGET_RE = re.compile(
+    r"\s+(?:on|in)\s+(?:my\s+|the\s+)?(?:mobile|desktop|destop|pc|computer|laptop)$",
+)
+_FAST_PLATFORM_RE = re.compile(r"\s+on\s+(spotify|youtube music|youtube|yt)$")
+
+_FAST_MUTE_RE       = re.compile(r"^(mute|unmute)(?:\s+(?:the\s+)?(?:volume|sound|audio|speakers?))?$")
+_FAST_VOL_SET_RE    = re.compile(r"^(?:set\s+)?(?:the\s+)?volume\s+(?:to\s+|at\s+)?(\d{1,3})\s*(?:%|percent)?$")
+_FAST_VOL_STEP_RE   = re.compile(r"^(?:turn\s+(?:the\s+)?volume\s+|volume\s+|turn\s+it\s+)(up|down)$")
+_FAST_BRIGHT_SET_RE = re.compile(r"^(?:set\s+)?(?:the\s+)?brightness\s+(?:to\s+|at\s+)?(\d{1,3})\s*(?:%|percent)?$")
+_FAST_BRIGHT_STEP_RE = re.compile(r"^(?:turn\s+(?:the\s+)?brightness\s+|brightness\s+)(up|down)$")
+_FAST_DIM_RE        = re.compile(r"^(dim|brighten)\s+(?:the\s+|my\s+)?(?:screen|display)$")
+_FAST_SCREENSHOT_RE = re.compile(r"^(?:(?:take|grab)\s+(?:a\s+)?screen\s?shot|screen\s?shot|(?:capture|grab)\s+(?:the\s+|my\s+)?screen)$")
+_FAST_LOCK_RE       = re.compile(r"^lock\s+(?:my\s+|the\s+)?(?:screen|pc|computer|laptop|system)$")
+_FAST_STATUS_RE     = re.compile(r"^(?:check\s+)?(?:the\s+)?(?:system\s+)?status$")
+_FAST_MODE_RE       = re.compile(r"^(?:switch\s+to\s+|change\s+to\s+|set\s+|go\s+)?(balanced|roaster|curious)\s+mode$")
+_FAST_OPEN_RE       = re.compile(r"^(?:open|launch|start)\s+(?:the\s+|my\s+)?([a-z][a-z0-9 .]{0,30}?)(?:\s+app)?$")
+_FAST_PLAY_RE       = re.compile(r"^play\s+(.+)$")
+_FAST_YT_SEARCH_RE  = re.compile(r"^(?:search\s+youtube\s+for|youtube\s+search(?:\s+for)?)\s+(.+)$")
+_FAST_G_SEARCH_RE   = re.compile(r"^(?:google|search\s+google\s+for|search\s+for)\s+(.+)$")
+
+# Exact names _infer_open_app_name knows ("open scam" must not become camera)
+_FAST_APP_ALIASES = frozenset({
+    "camera", "cam", "gallery", "photos", "photo", "images", "whatsapp", "whatapp",
+    "instagram", "insta", "chatgpt", "chat gpt", "youtube music", "youtubemusic",
+    "youtube", "yt", "spotify", "gmail", "maps", "google maps", "google",
+})
+
+# "play it again", "play some music" — let the LLM / prefs figure those out
+_VAGUE_PLAY_WORDS = frozenset({
+    "it", "that", "this", "something", "anything", "some", "music", "song",
+    "songs", "again", "next", "previous", "more", "a",
+})
+
+
+def _match_fast_command(raw_lower: str) -> Optional[Dict]:
+    """
+    Maps an unambiguous command to {"name": tool, "arguments": {...}}, or
+    returns None when the sentence needs the LLM. Arguments left out here
+    (target, platform, autoplay) are filled by _execute_tool_calls exactly as
+    for a model-issued call.
+    """
+    t = (raw_lower or "").strip().lower()
+    if not t or len(t) > 80 or "?" in t:
+        return None
+    t = _FAST_PREFIX_RE.sub("", t).strip(" .!,")
+    changed = True
+    while changed:
+        changed = False
+        for suffix in _FAST_SUFFIXES:
+            if t.endswith(suffix):
+                t = t[: -len(suffix)].strip(" .!,")
+                changed = True
+    # Chained or conversational requests go to the LLM
+    if not t or _QUESTION_RE.match(t) or re.search(r"\b(?:and|then|also|but|if)\b|,", t):
+        return None
+
+    m = _FAST_MUTE_RE.match(t)
+    if m:
+        return {"name": "volume_control", "arguments": {"action": m.group(1)}}
+    m = _FAST_VOL_SET_RE.match(t)
+    if m and int(m.group(1)) <= 100:
+        return {"name": "volume_control", "arguments": {"action": "set", "level": int(m.group(1))}}
+    m = _FAST_VOL_STEP_RE.match(t)
+    if m:
+        return {"name": "volume_control", "arguments": {"action": m.group(1)}}
+    if t in ("louder", "quieter"):
+        return {"name": "volume_control", "arguments": {"action": "up" if t == "louder" else "down"}}
+
+    m = _FAST_BRIGHT_SET_RE.match(t)
+    if m and int(m.group(1)) <= 100:
+        return {"name": "brightness_control", "arguments": {"action": "set", "level": int(m.group(1))}}
+    m = _FAST_BRIGHT_STEP_RE.match(t)
+    if m:
+        return {"name": "brightness_control", "arguments": {"action": m.group(1)}}
+    m = _FAST_DIM_RE.match(t)
+    if m:
+        return {"name": "brightness_control", "arguments": {"action": "down" if m.group(1) == "dim" else "up"}}
+
+    if _FAST_SCREENSHOT_RE.match(t):
+        return {"name": "take_screenshot", "arguments": {}}
+    if _FAST_LOCK_RE.match(t):
+        return {"name": "lock_screen", "arguments": {}}
+    if _FAST_STATUS_RE.match(t):
+        return {"name": "system_status", "arguments": {}}
+    m = _FAST_MODE_RE.match(t)
+    if m:
+        return {"name": "set_personality", "arguments": {"mode": m.group(1)}}
+
+    # Everything below may name a device ("... on mobile"); _detect_target
+    # reads it from the full sentence later, so just drop it here.
+    t = _FAST_TARGET_RE.sub("", t)
+
+    m = _FAST_OPEN_RE.match(t)
+    if m:
+        app_text = m.group(1).strip()
+        # Only apps we recognise by name; "open the door" goes to the LLM
+        if app_text in _FAST_APP_ALIASES:
+            return {"name": "open_app", "arguments": {"app_name": _infer_open_app_name(app_text)}}
+        return None
+
+    m = _FAST_PLAY_RE.match(t)
+    if m:
+        # The title is taken verbatim ("eye of the tiger", "python tutorial");
+        # only a trailing "on spotify / on youtube" names the platform
+        query = m.group(1).strip()
+        platform = None
+        pm = _FAST_PLATFORM_RE.search(query)
+        if pm:
+            platform = "spotify" if pm.group(1) == "spotify" else "youtube"
+            query = query[: pm.start()].strip()
+        words = query.split()
+        if not words or words[0] in _VAGUE_PLAY_WORDS or len(query) > 60:
+            return None
+        # A device / platform word inside the title would be read back out of
+        # the sentence by _detect_target / _detect_platform: let the LLM decide
+        if _detect_target(query) != "auto" or _detect_platform(query):
+            return None
+        args = {"query": query}
+        if platform:
+            args["platform"] = platform
+        return {"name": "play_music", "arguments": args}
+
+    m = _FAST_YT_SEARCH_RE.match(t)
+    if m:
+        return {"name": "search_youtube", "arguments": {"query": m.group(1).strip()}}
+    m = _FAST_G_SEARCH_RE.match(t)
+    if m:
+        return {"name": "search_google", "arguments": {"query": m.group(1).strip()}}
+    return None
+
+def _looks_like_tool_json(text: str) -> bool:
+    """
+    True when the model emitted a raw tool-call JSON blob instead of speech.
+    BUG FIX: Old guard only caught '{' and '```json'.  The model can also
+    emit '[{', '```\n{', or just a dict-like blob.  Catch more patterns.
+    """
+    stripped = (text or "").strip()
+    _looks_like_json = (
+        stripped.startswith("{") or stripped.startswith("[{")
+        or stripped.startswith("```")
+    )
+    _has_tool_markers = (
+        '"name"' in stripped or '"function"' in stripped
+        or '"tool_call"' in stripped or '"action"' in stripped
+    )
+    _has_arg_markers = (
+        '"arguments"' in stripped or '"parameters"' in stripped
+        or '"type"' in stripped
+    )
+    return _looks_like_json and _has_tool_markers and _has_arg_markers
+
 # ── TOOL DEFINITIONS ─────────────────────────────────────────────────────────
 TOOLS: List[Dict] = [
     {
@@ -592,32 +843,168 @@ _TOOL_RULE = (
     "NEVER say 'shutting down' or 'done' if the tool did not return status='success'."
 )
 
+def build_http_session() -> requests.Session:
+    """Keep-alive session (connection pool) for Ollama; shareable across brains."""
+    session = requests.Session()
+    retries = Retry(total=HTTP_RETRIES, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504])
+    session.mount("http://", HTTPAdapter(max_retries=retries, pool_maxsize=HTTP_POOL_SIZE))
+    return session
+
+def _request_timeout(deadline: float):
+    """
+    (connect, read) timeout for one request of a turn. The connect timeout is
+    split across every retry attempt the adapter may make, so retries can't
+    push the turn past its deadline.
+    """
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        raise requests.exceptions.Timeout("turn deadline exceeded")
+    return (min(CONNECT_TIMEOUT, remaining / (HTTP_RETRIES + 1)), remaining)
+
+def _is_outage(exc: Exception) -> bool:
+    """Timeouts, refused connections and 5xx count against the circuit breaker."""
+    if isinstance(exc, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+        return True
+    response = getattr(exc, "response", None)
+    return response is not None and getattr(response, "status_code", 0) >= 500
+
+def _cleaned_stream_prefix(raw: str) -> Optional[str]:
+    """
+    postprocess_reply() of the complete sentences streamed so far, or None
+    while that can't be final yet: no sentence finished, or a *action* /
+    (aside) still open (the cleanup strips it only once it closes).
+    """
+    _, remainder = split_complete_sentences(raw)
+    complete = raw[:len(raw) - len(remainder)]
+    if not complete.strip():
+        return None
+    if complete.count("*") % 2 or complete.count("(") > complete.count(")"):
+        return None
+    cleaned = postprocess_reply(complete)
+    # Nothing left after cleanup ("*smiles* ") comes back as a placeholder
+    if cleaned == "Hmm?" and "hmm" not in complete.lower():
+        return None
+    return cleaned
+
+
+def _tool_result_to_text(result) -> str:
+    """
+    Tool methods return dicts for structured status.
+    For user-facing speech, prefer the 'message' field.
+    """
+    if isinstance(result, dict):
+        msg = result.get("message")
+        if isinstance(msg, str) and msg.strip():
+            return msg.strip()
+        # Fall back to a compact representation
+        status = result.get("status")
+        if isinstance(status, str) and status.strip():
+            return status.strip()
+        return ""
+    return str(result).strip()
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # 🧠  NeonBrain
 # ─────────────────────────────────────────────────────────────────────────────
 class NeonBrain:
-    def __init__(self):
+    def __init__(self, system=None, memory=None, http_session=None, check_connection: bool = True,
+                 restore_emotion: bool = True):
+        """
+        system / memory / http_session let many brains (one per backend
+        session, see brain/sessions.py) share the SystemController, the
+        persistent MemoryManager and the HTTP connection pool. Anything not
+        passed is created here, exactly like a standalone brain.
+        restore_emotion=False starts from a fresh emotion state instead of
+        the one persisted in memory (and skips the memory-restore note).
+        """
         self.engine  = EmotionEngine()
-        self.memory  = MemoryManager()
+        self.memory  = memory or MemoryManager()
         # BUG FIX: Was defaulting to require_confirmation=True, which blocked
         # high-risk commands (shutdown, delete, whatsapp) with no way to
         # actually confirm — the LLM would then hallucinate success.
-        self.system  = SystemController(require_confirmation=False)
+        self.system  = system or SystemController(require_confirmation=False)
         self.history: List[Dict[str, str]] = []
         self.last_action: Optional[Dict] = None
+        self.last_tools: List[str] = []   # tools executed by the last turn
+        # Slow tools this turn left running in the background (see brain/async_tools.py)
+        self.last_pending: List[Dict] = []
+        self._pending_acks: set = set()   # their acknowledgements, never flavored as done
+        # Streaming: cleaned final reply + time-to-first-token of the last turn
+        self.last_reply: Optional[str] = None
+        self.last_ttft: Optional[float] = None
+        # Ollama timings of the last turn + a rolling window (see eval_stats_summary)
+        self.last_eval_stats: Optional[Dict] = None
+        self._eval_stats: deque = deque(maxlen=EVAL_STATS_WINDOW)
+        # Per-stage spans of the current / last turn (see brain/tracing.py)
+        self._trace = NULL_TRACE
+        self._last_trace = None
+        self._trace_stats = get_shared_trace_stats()
 
         self._last_input: str  = ""
         self._last_input_ts: float = 0.0
         self._current_user_lower: str = ""
+        self._current_target: str = "auto"
         # Feature 5: Smart command cooldown — deque of (tool_name, timestamp)
         self._command_history: deque = deque(maxlen=20)
 
-        self.session = requests.Session()
-        retries = Retry(total=2, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504])
-        self.session.mount("http://", HTTPAdapter(max_retries=retries))
+        self.session = http_session or build_http_session()
+
+        if check_connection:
+            self._check_connection()
+
+        # Installed models + /api/show capabilities, cached process-wide
+        self.registry = get_shared_registry(
+            session=self.session, tags_url=CHECK_URL, show_url=OLLAMA_SHOW_URL,
+        )
+        self.registry.installed()   # first fetch runs in the background
+
+        # Preload LARGE + SMALL in the background and keep them resident
+        # (one shared warmer per process; start() is idempotent)
+        self.warmer = None
+        if WARMUP_ENABLED:
+            self.warmer = get_shared_warmer(
+                session=self.session,
+                models=(LARGE_MODEL_NAME, SMALL_MODEL_NAME),
+                generate_url=OLLAMA_GENERATE_URL,
+                keep_alive=KEEP_ALIVE,
+                options={"num_ctx": token_budget.NUM_CTX_MIN},
+            )
+            self.warmer.start()
+
+        # Per-model num_ctx bucket (shared: it's the loaded model's state in Ollama)
+        self.sizer = token_budget.get_shared_sizer()
+
+        # Command turns only carry the tool schemas that match the request
+        self.tool_selector = get_shared_selector(tools=TOOLS, command_re=_COMMAND_RE) if TOOL_PRUNING_ENABLED else None
+
+        # Turns evicted from history are folded into a running summary by
+        # SMALL in the background (per brain: it's this conversation's summary)
+        self.summarizer = None
+        self._summarized = 0   # leading history messages already handed to the summarizer
+        if SUMMARY_ENABLED:
+            self.summarizer = RollingSummarizer(
+                session=self.session,
+                chat_url=OLLAMA_URL,
+                model=SMALL_MODEL_NAME,
+                keep_alive=KEEP_ALIVE,
+                # SMALL's current num_ctx, so the fold doesn't force a reload
+                options=lambda: {"num_ctx": self.sizer.current(SMALL_MODEL_NAME)},
+            )
+
+        # Latency-aware LARGE/SMALL routing (rolling p50/p95 per model)
+        self.router = get_shared_router(large=LARGE_MODEL_NAME, small=SMALL_MODEL_NAME) if ROUTER_ENABLED else None
 
-        self._check_connection()
-        boot_ctx = self.memory.restore(self.engine)
+        # Fail fast while Ollama is down; a background probe notices it coming back
+        self.breaker = get_shared_breaker(session=self.session, probe_url=CHECK_URL) if BREAKER_ENABLED else None
+
+        # Opt-in disk cache for repeated technical Q&A (NEON_RESPONSE_CACHE=1)
+        self.response_cache = response_cache.get_shared_response_cache() if response_cache.CACHE_ENABLED else None
+
+        # Slow tools (YouTube lookup, WhatsApp send) acknowledge now and
+        # deliver their result later (NEON_ASYNC_TOOLS=1 or enable_async_tools)
+        self.async_tools: Optional[AsyncToolRunner] = AsyncToolRunner() if ASYNC_TOOLS_ENABLED else None
+        boot_ctx = self.memory.restore(self.engine) if restore_emotion else None
         self._boot_memory: Optional[str] = boot_ctx.get("description") if boot_ctx else None
         if self._boot_memory:
             print(f"[NEON MEMORY] {self._boot_memory}")
@@ -630,21 +1017,34 @@ class NeonBrain:
             else:
                 print(f"[WARN] [NEON] Ollama returned {r.status_code}")
         except requests.RequestException:
-            print("[WARN] [NEON] Ollama unreachable at localhost:11434")
-
-    def _trim_history(self) -> None:
+            print(f"[WARN] [NEON] Ollama unreachable at {OLLAMA_BASE_URL}")
+
+    def _trim_history(self, window: Optional[int] = None) -> None:
+        # A message is summarized as soon as it falls out of the window sent
+        # to the model (`window`: what this turn actually sent — 6 for a
+        # technical turn, fewer when the token budget trimmed it), not when
+        # it finally leaves the 20-message history
+        self._summarized = min(self._summarized, len(self.history))
+        out_of_window = len(self.history) - (HISTORY_WINDOW if window is None else window)
+        if self.summarizer is not None and out_of_window > self._summarized:
+            self.summarizer.add(self.history[self._summarized:out_of_window])   # never blocks; folds in the background
+            self._summarized = out_of_window
         # FIX: Safer slice logic avoids mid-conversation breakage
         if len(self.history) > MAX_HISTORY:
+            dropped = len(self.history) - MAX_HISTORY
             self.history = self.history[-MAX_HISTORY:]
+            self._summarized = max(0, self._summarized - dropped)
 
-    def _get_history_slice(self, technical: bool) -> List[Dict]:
-        limit = 6 if technical else 10
-        return self.history[-limit:]
+    def _get_history_slice(self, technical: bool, budget: int = token_budget.HISTORY_TOKENS) -> List[Dict]:
+        """Last 6/10 messages, trimmed further to fit `budget` tokens."""
+        limit = 6 if technical else HISTORY_WINDOW
+        return token_budget.fit_history(self.history[-limit:], min(budget, token_budget.HISTORY_TOKENS))
 
-    def _build_options(self, technical: bool) -> Dict:
+    def _build_options(self, technical: bool, num_ctx: int = token_budget.NUM_CTX_MIN,
+                       num_predict: int = token_budget.NUM_PREDICT) -> Dict:
         return {
-            "num_ctx":        3072,
-            "num_predict":    256,
+            "num_ctx":        num_ctx,
+            "num_predict":    num_predict,
             "temperature":    0.2 if technical else 0.6,
             "top_k":          40,
             "top_p":          0.9,
@@ -676,20 +1076,7 @@ class NeonBrain:
         return "\n\n".join(parts).strip()
 
     def _get_installed_models(self) -> List[str]:
-        try:
-            r = self.session.get(CHECK_URL, timeout=2)
-            if r.status_code != 200:
-                return []
-            data = r.json() or {}
-            models = data.get("models") or []
-            names = []
-            for m in models:
-                name = (m.get("name") or "").strip()
-                if name:
-                    names.append(name)
-            return names
-        except Exception:
-            return []
+        return self.registry.installed(block=True)
 
     def _pick_fallback_model(self) -> str:
         """
@@ -698,16 +1085,30 @@ class NeonBrain:
         2) first installed model
         3) LARGE_MODEL_NAME as last resort
         """
-        installed = self._get_installed_models()
-        if LARGE_MODEL_NAME in installed:
-            return LARGE_MODEL_NAME
-        if installed:
-            return installed[0]
-        return LARGE_MODEL_NAME
-
-    def _post(self, payload: Dict, label: str = "") -> Optional[Dict]:
+        return self.registry.pick_fallback(LARGE_MODEL_NAME)
+
+    def _breaker_allows(self, label: str = "") -> bool:
+        if self.breaker is None or self.breaker.allow():
+            return True
+        print(f"[WARN] [NEON] Ollama circuit open — failing fast ({label or 'request'})")
+        return False
+
+    def _breaker_record(self, exc: Optional[Exception] = None) -> None:
+        """Any answer from Ollama (even a 404) means it's up; outages trip the breaker."""
+        if self.breaker is None:
+            return
+        if exc is not None and _is_outage(exc):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def _post(self, payload: Dict, label: str = "", deadline: Optional[float] = None) -> Optional[Dict]:
+        if deadline is None:
+            deadline = time.time() + TURN_DEADLINE
+        if not self._breaker_allows(label):
+            return None
         try:
-            resp = self.session.post(OLLAMA_URL, json=payload, timeout=TIMEOUT)
+            resp = self.session.post(OLLAMA_URL, json=payload, timeout=_request_timeout(deadline))
 
             # 404 can mean "model not found" (common when SMALL model isn't pulled).
             if resp.status_code == 404:
@@ -717,11 +1118,14 @@ class NeonBrain:
                 except Exception:
                     body = ""
                 if "model" in body.lower() and ("not found" in body.lower() or "does not exist" in body.lower()):
+                    # The cached model list was wrong about this one
+                    self.registry.invalidate()
                     fallback_model = self._pick_fallback_model()
                     retry_payload = dict(payload)
                     retry_payload["model"] = fallback_model
-                    retry = self.session.post(OLLAMA_URL, json=retry_payload, timeout=TIMEOUT)
+                    retry = self.session.post(OLLAMA_URL, json=retry_payload, timeout=_request_timeout(deadline))
                     retry.raise_for_status()
+                    self._breaker_record()
                     return retry.json()
 
                 # Some servers might not expose /api/chat; try /api/generate fallback.
@@ -731,38 +1135,210 @@ class NeonBrain:
                     "prompt": prompt,
                     "stream": False,
                     "options": payload.get("options") or {},
+                    "keep_alive": payload.get("keep_alive", KEEP_ALIVE),
                 }
-                gen = self.session.post(OLLAMA_GENERATE_URL, json=gen_payload, timeout=TIMEOUT)
+                gen = self.session.post(OLLAMA_GENERATE_URL, json=gen_payload, timeout=_request_timeout(deadline))
                 gen.raise_for_status()
+                self._breaker_record()
                 gen_json = gen.json()
-                return {"message": {"role": "assistant", "content": gen_json.get("response", "")}}
+                result = {k: v for k, v in gen_json.items() if k.endswith(("_count", "_duration"))}
+                result["message"] = {"role": "assistant", "content": gen_json.get("response", "")}
+                return result
 
             resp.raise_for_status()
+            self._breaker_record()
             return resp.json()
-        except requests.exceptions.Timeout:
+        except requests.exceptions.Timeout as e:
+            self._breaker_record(e)
             print(f"[WARN] [NEON] Timeout during {label or 'request'}")
             return None
         except Exception as e:
+            self._breaker_record(e)
             print(f"[ERROR] [NEON NET ERROR] {label}: {e}")
             return None
 
-    def _execute_tool_calls(self, tool_calls: List[Dict], context: List[Dict], target: str = "auto") -> str:
-        def _tool_result_to_text(result) -> str:
-            """
-            Tool methods return dicts for structured status.
-            For user-facing speech, prefer the 'message' field.
-            """
-            if isinstance(result, dict):
-                msg = result.get("message")
-                if isinstance(msg, str) and msg.strip():
-                    return msg.strip()
-                # Fall back to a compact representation
-                status = result.get("status")
-                if isinstance(status, str) and status.strip():
-                    return status.strip()
-                return ""
-            return str(result).strip()
+    def _post_stream(self, payload: Dict, label: str = "", deadline: Optional[float] = None) -> Iterator[Dict]:
+        """
+        Streams /api/chat and yields each NDJSON chunk as a dict.
+        If the server answers 404 (model missing / no /api/chat) the blocking
+        _post() fallbacks are used and their response is yielded as one final
+        chunk. Yields nothing when the server can't be reached; stops at the
+        turn deadline.
+        """
+        if deadline is None:
+            deadline = time.time() + TURN_DEADLINE
+        if not self._breaker_allows(label):
+            return
+        stream_payload = dict(payload)
+        stream_payload["stream"] = True
+        try:
+            resp = self.session.post(OLLAMA_URL, json=stream_payload, timeout=_request_timeout(deadline), stream=True)
+        except requests.exceptions.Timeout as e:
+            self._breaker_record(e)
+            print(f"[WARN] [NEON] Timeout during {label or 'request'}")
+            return
+        except Exception as e:
+            self._breaker_record(e)
+            print(f"[ERROR] [NEON NET ERROR] {label}: {e}")
+            return
 
+        with resp:
+            if resp.status_code == 404:
+                resp.close()
+                fallback = self._post(payload, label=label, deadline=deadline)
+                if fallback is not None:
+                    fallback.setdefault("done", True)
+                    yield fallback
+                return
+            try:
+                resp.raise_for_status()
+                # chunk_size=None: hand over each HTTP chunk as soon as it arrives
+                for line in resp.iter_lines(chunk_size=None):
+                    if time.time() > deadline:
+                        raise requests.exceptions.Timeout("turn deadline exceeded")
+                    if not line:
+                        continue
+                    try:
+                        chunk = json.loads(line)
+                    except ValueError:
+                        continue
+                    if chunk.get("error"):
+                        print(f"[ERROR] [NEON NET ERROR] {label}: {chunk.get('error')}")
+                        return
+                    yield chunk
+                    if chunk.get("done"):
+                        self._breaker_record()
+                        return
+            except requests.exceptions.Timeout as e:
+                self._breaker_record(e)
+                print(f"[WARN] [NEON] Timeout during {label or 'request'}")
+            except Exception as e:
+                self._breaker_record(e)
+                print(f"[ERROR] [NEON NET ERROR] {label}: {e}")
+
+    def _record_eval_stats(self, response: Optional[Dict], turn: Dict) -> None:
+        """
+        Keeps Ollama's timings for the turn. prompt_eval_count only counts the
+        prompt tokens that were NOT served from the model's prompt cache, so a
+        low count on a long conversation means the stable prefix was reused.
+        """
+        if not response or not any(k in response for k in ("prompt_eval_count", "eval_count")):
+            return
+        ms = lambda key: round((response.get(key) or 0) / 1e6, 1)   # ns -> ms
+        stats = {
+            "model":             response.get("model") or turn["payload"].get("model"),
+            "prompt_eval_count": int(response.get("prompt_eval_count") or 0),
+            "prompt_eval_ms":    ms("prompt_eval_duration"),
+            "eval_count":        int(response.get("eval_count") or 0),
+            "eval_ms":           ms("eval_duration"),
+            "load_ms":           ms("load_duration"),
+            "total_ms":          ms("total_duration"),
+            "prompt_chars":      sum(len(m.get("content") or "") for m in turn["payload"]["messages"]),
+            "prompt_tokens_est": turn.get("prompt_tokens", 0),
+            "num_ctx":           turn["payload"]["options"].get("num_ctx"),
+            "tools_sent":        len(turn["payload"].get("tools") or []),
+            "tool_tokens_saved": turn.get("tool_tokens_saved", 0),
+        }
+        self.last_eval_stats = stats
+        self._eval_stats.append(stats)
+        for key in ("load_ms", "prompt_eval_ms", "eval_ms", "total_ms"):
+            self._trace.add(f"ollama.{key[:-3]}", stats[key])
+        self._trace.set(
+            model=stats["model"],
+            ollama={k: stats[k] for k in ("load_ms", "prompt_eval_count", "prompt_eval_ms",
+                                          "eval_count", "eval_ms", "total_ms")},
+        )
+        if self.router is not None:
+            self.router.record(stats["model"], stats["total_ms"])
+        print(
+            f"[NEON] prompt_eval {stats['prompt_eval_count']} tok / {stats['prompt_eval_ms']:.0f}ms"
+            f" | gen {stats['eval_count']} tok / {stats['eval_ms']:.0f}ms"
+            + (f" | load {stats['load_ms']:.0f}ms" if stats["load_ms"] >= 50 else "")
+        )
+
+    def eval_stats_summary(self) -> Dict:
+        """Averages over the last EVAL_STATS_WINDOW turns that reached Ollama."""
+        rows = list(self._eval_stats)
+        if not rows:
+            return {"turns": 0}
+        avg = lambda key, subset=rows: round(sum(r[key] for r in subset) / len(subset), 1) if subset else 0.0
+        tool_rows = [r for r in rows if r.get("tools_sent")]
+        return {
+            "turns":             len(rows),
+            "prompt_eval_count": avg("prompt_eval_count"),
+            "prompt_eval_ms":    avg("prompt_eval_ms"),
+            "eval_count":        avg("eval_count"),
+            "eval_ms":           avg("eval_ms"),
+            "load_ms":           avg("load_ms"),
+            "total_ms":          avg("total_ms"),
+            # Command turns: prompt tokens actually evaluated vs. estimated
+            # tool-schema tokens pruning kept out of the prompt
+            "command_turns":             len(tool_rows),
+            "command_prompt_eval_count": avg("prompt_eval_count", tool_rows),
+            "command_tools_sent":        avg("tools_sent", tool_rows),
+            "command_tool_tokens_saved": avg("tool_tokens_saved", tool_rows),
+        }
+
+    def _select_tools(self, user_input: str) -> List[Dict]:
+        if self.tool_selector is None:
+            return TOOLS
+        try:
+            command_stats = dict(self.memory.state.get("command_stats") or {})
+        except (AttributeError, RuntimeError):
+            command_stats = {}   # changed mid-copy by a tool thread; usage is only a tie-breaker
+        return self.tool_selector.select(user_input, command_stats)
+
+    def breaker_state(self) -> Dict:
+        return self.breaker.snapshot() if self.breaker is not None else {"state": "disabled"}
+
+    # ── ASYNC TOOLS ──────────────────────────────────────────────────────────
+
+    def enable_async_tools(self, on_result=None) -> AsyncToolRunner:
+        """
+        Slow tools run in the background from now on; on_result(delivered)
+        is called from the worker thread as each one finishes.
+        """
+        if self.async_tools is None:
+            self.async_tools = AsyncToolRunner(on_result=on_result)
+        elif on_result is not None:
+            self.async_tools.on_result = on_result
+        return self.async_tools
+
+    def poll_tool_results(self, timeout: float = 0.0) -> List[Dict]:
+        """Finished background tools not yet consumed (see brain/async_tools.py)."""
+        return self.async_tools.poll(timeout) if self.async_tools is not None else []
+
+    def _start_async_tool(self, func_name: str, spec, args: Dict) -> Dict:
+        """Hands a slow tool to the background runner; the turn gets the acknowledgement."""
+        status = self.engine.status.copy()
+        handle = self.async_tools.submit(
+            func_name, args,
+            work=functools.partial(self._run_tool, func_name, spec, args, self._trace),
+            finish=functools.partial(self._finish_async_tool, func_name, self._current_user_lower, status),
+        )
+        print(f"[NEON] {func_name} continues in the background ({handle.id}).")
+        return {"status": "pending", "message": acknowledgement(func_name, args), "pending": handle.to_dict()}
+
+    def _finish_async_tool(self, func_name: str, user_input: str, status: Dict, result) -> Dict:
+        raw = _tool_result_to_text(result) or str(result)
+        if isinstance(result, dict):
+            outcome = result.get("status") or "success"
+            action = result.get("action") if isinstance(result.get("action"), dict) else None
+        else:
+            outcome = "error" if raw.startswith("Error") else "success"
+            action = None
+        if outcome != "success":
+            # The success templates would announce a failed send as delivered
+            return {"status": outcome, "reply": postprocess_reply(raw), "action": action}
+        reply = flavor_command_response(
+            action_name=func_name,
+            raw_message=raw,
+            user_input=user_input,
+            emotion_status=status,
+        )
+        return {"status": outcome, "reply": postprocess_reply(reply), "action": action}
+
+    def _execute_tool_calls(self, tool_calls: List[Dict], context: List[Dict], target: str = "auto") -> str:
         # Pre-pass: if user asked for mobile and we have a YouTube search, skip redundant open_app(youtube)
         if tool_calls:
             try:
@@ -775,11 +1351,17 @@ class NeonBrain:
             except Exception:
                 pass
 
-        results = []
+        # Same for every call in this turn (see brain/tool_registry.py)
+        registry = self.system.tool_registry
+        headless = self.system.headless
+        # Use server-provided target; fall back to text detection
+        resolved_target = target if target in {"mobile", "desktop"} else _detect_target(self._current_user_lower or "")
+        prefs: Optional[Dict] = None
+
+        planned = []
         for tool in tool_calls:
             func_name = tool["function"]["name"]
             args      = tool["function"]["arguments"]
-            func = getattr(self.system, func_name, None)
 
             # Ollama tool arguments may arrive as a JSON string.
             if isinstance(args, str):
@@ -796,16 +1378,6 @@ class NeonBrain:
                 if ("open" in ul) and ("whatsapp" in ul or "whatapp" in ul):
                     func_name = "open_app"
                     args = {"app_name": "whatsapp", "target": _detect_target(ul)}
-                    func = getattr(self.system, func_name, None)
-
-            # Preference defaults (do not override explicit args)
-            try:
-                prefs = (self.memory.state.get("prefs") or {}) if getattr(self, "memory", None) else {}
-            except Exception:
-                prefs = {}
-
-            # Use server-provided target; fall back to text detection
-            resolved_target = target if target in {"mobile", "desktop"} else _detect_target(self._current_user_lower or "")
 
             if func_name == "play_music":
                 # If model forgets parameters, infer from user sentence.
@@ -814,31 +1386,26 @@ class NeonBrain:
                     if inferred:
                         args["query"] = inferred
                 if "platform" not in args or not str(args.get("platform") or "").strip():
+                    if prefs is None:
+                        # Preference defaults (do not override explicit args)
+                        try:
+                            prefs = (self.memory.state.get("prefs") or {}) if getattr(self, "memory", None) else {}
+                        except Exception:
+                            prefs = {}
                     args["platform"] = _detect_platform(self._current_user_lower or "") or prefs.get("music_platform", "spotify")
                 if "autoplay" not in args:
                     args["autoplay"] = True
-                if "target" not in args:
-                    args["target"] = resolved_target
-                # If running headless (mobile/backend), prefer mobile unless user explicitly said desktop
-                if os.getenv("NEON_HEADLESS", "0").strip() == "1" and resolved_target != "desktop":
-                    if args.get("target") in {"auto", "desktop", None}:
-                        args["target"] = "mobile"
             if func_name == "open_app":
                 if "app_name" not in args or not str(args.get("app_name") or "").strip():
                     inferred_app = _infer_open_app_name(self._current_user_lower or "")
                     if inferred_app:
                         args["app_name"] = inferred_app
-                if "target" not in args:
-                    args["target"] = resolved_target
-                if os.getenv("NEON_HEADLESS", "0").strip() == "1" and resolved_target != "desktop":
-                    if args.get("target") in {"auto", "desktop", None}:
-                        args["target"] = "mobile"
-            if func_name in {"search_google", "search_youtube"}:
-                if "target" not in args:
-                    args["target"] = resolved_target
-                if os.getenv("NEON_HEADLESS", "0").strip() == "1" and resolved_target != "desktop":
-                    if args.get("target") in {"auto", "desktop", None}:
-                        args["target"] = "mobile"
+
+            # Target policy (headless → mobile unless the user said desktop),
+            # unknown args dropped, levels / flags coerced to their types
+            spec = registry.get(func_name)
+            if spec is not None:
+                args = spec.prepare(args, resolved_target, headless)
 
             print(f"   -> Executing: {func_name}({args})")
 
@@ -854,32 +1421,24 @@ class NeonBrain:
             if recent_same:
                 print(f"[NEON] Cooldown: {func_name} was called recently, running anyway.")
 
-            if func:
-                try:
-                    # Drop unexpected args so tool calls can't crash TTS/voice flows
-                    try:
-                        sig = inspect.signature(func)
-                        params = sig.parameters
-                        accepts_kwargs = any(p.kind == inspect.Parameter.VAR_KEYWORD for p in params.values())
-                        if (not accepts_kwargs) and args:
-                            allowed = {k for k, p in params.items() if p.kind in (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY)}
-                            args = {k: v for k, v in args.items() if k in allowed}
-                    except Exception:
-                        pass
-                    result = func(**args)
-                except Exception as e:
-                    result = f"Error in {func_name}: {e}"
-
-                # BUG FIX: If tool returned 'blocked', make it very clear
-                # to the LLM so it doesn't hallucinate success.
-                if isinstance(result, dict) and result.get("status") == "blocked":
-                    blocked_msg = result.get("message", "Action was blocked.")
-                    result = {"status": "blocked", "message": f"BLOCKED: {blocked_msg} Ask Boss for confirmation before retrying."}
-            else:
-                result = f"Error: Tool '{func_name}' not found in SystemController."
+            # Slow for these args (YouTube lookup, WhatsApp send) → background
+            run = self._run_tool
+            if self.async_tools is not None and spec is not None and is_slow(func_name, args):
+                run = self._start_async_tool
+            planned.append((func_name, args, spec, now, run))
+
+        # Independent calls run side by side; high-risk / conflicting ones
+        # stay serial and results come back in call order (brain/tool_executor.py)
+        outputs = run_tool_calls(
+            [(spec, functools.partial(run, func_name, spec, args)) for func_name, args, spec, _, run in planned],
+            max_workers=TOOL_WORKERS,
+        )
 
+        results = []
+        for (func_name, args, spec, now, _), result in zip(planned, outputs):
             # Feature 5: Record in cooldown history
             self._command_history.append((func_name, now))
+            self.last_tools.append(func_name)
 
             # Feature 6: Record command stats for usage learning
             try:
@@ -908,6 +1467,9 @@ class NeonBrain:
             result_text = _tool_result_to_text(result) or str(result)
             if isinstance(result, dict) and isinstance(result.get("action"), dict):
                 self.last_action = result.get("action")
+            if isinstance(result, dict) and isinstance(result.get("pending"), dict):
+                self.last_pending.append(result["pending"])
+                self._pending_acks.add(result_text)
             context.append({
                 "role":    "tool",
                 "content": result_text,
@@ -923,9 +1485,38 @@ class NeonBrain:
 
         return "\n".join(results)
 
-    def chat(self, user_input: str, target: str = "auto") -> Optional[str]:
+    def _run_tool(self, func_name: str, spec, args: Dict, trace=None):
+        """
+        One tool call; errors come back as the result (may run on a tool
+        worker thread). trace: the turn's trace when running after the turn.
+        """
+        if spec is None:
+            return f"Error: Tool '{func_name}' not found in SystemController."
+        try:
+            with (trace or self._trace).span(f"tool.{func_name}"):
+                result = spec.func(**args)
+        except Exception as e:
+            return f"Error in {func_name}: {e}"
+
+        # BUG FIX: If tool returned 'blocked', make it very clear
+        # to the LLM so it doesn't hallucinate success.
+        if isinstance(result, dict) and result.get("status") == "blocked":
+            blocked_msg = result.get("message", "Action was blocked.")
+            result = {"status": "blocked", "message": f"BLOCKED: {blocked_msg} Ask Boss for confirmation before retrying."}
+        return result
+
+    def _prepare_turn(self, user_input: str, target: str = "auto", dedupe: bool = True):
+        """
+        Front half of a turn, shared by chat() and chat_stream():
+        duplicate gate, intent detection, emotion update and payload build.
+        dedupe=False skips the duplicate gate (chat_many: a batch is built
+        by code, so a repeated prompt is meant to be answered twice).
+
+        Returns (turn, None) when the model must be called, or
+        (None, reply) when the turn is already answered without it.
+        """
         if not user_input or not user_input.strip():
-            return None
+            return None, None
 
         user_input = user_input.strip()
         lower      = user_input.lower()
@@ -937,14 +1528,18 @@ class NeonBrain:
         # BUG FIX: Old duplicate check blocked ANY repeat of the same text
         # even if sent intentionally (e.g. "open chrome" twice in a row).
         # Now only block exact duplicates within a tight 3-second window.
-        if (
-            user_input.strip().lower() == self._last_input.strip().lower()
-            and seconds_since_last is not None
-            and seconds_since_last < 3.0
-        ):
+        with self._trace.span("duplicate_check"):
+            is_duplicate = (
+                dedupe
+                and user_input.strip().lower() == self._last_input.strip().lower()
+                and seconds_since_last is not None
+                and seconds_since_last < 3.0
+            )
+        if is_duplicate:
+            self._trace.set(outcome="duplicate")
             print("[NEON] Duplicate input ignored (within 3s).")
             import random
-            return random.choice([
+            return None, random.choice([
                 "I'm listening, Boss.",
                 "I heard you the first time.",
                 "Still here.",
@@ -956,14 +1551,19 @@ class NeonBrain:
         if any(t in lower for t in identity_triggers):
             user_input = "Introduce yourself briefly."
 
-        technical  = _is_technical(lower)
-        is_command = _is_command(lower)
-        chosen_model = _select_model(technical=technical, is_command=is_command)
+        with self._trace.span("intent"):
+            technical  = _is_technical(lower)
+            is_command = _is_command(lower)
+            chosen_model = _select_model(technical=technical, is_command=is_command)
         # Reset per-turn action
         self.last_action = None
+        self.last_tools = []
+        self.last_pending = []
+        self._pending_acks = set()
 
         if not technical:
-            self.engine.process_input(user_input)
+            with self._trace.span("emotion"):
+                self.engine.process_input(user_input)
 
         status = self.engine.status.copy()
 
@@ -973,47 +1573,73 @@ class NeonBrain:
         
         if status["emotion"] == "mad" and status.get("grudge_score", 0) > 6.0:
             if not is_apology:
-                return "..."
+                self._trace.set(outcome="grudge")
+                return None, "..."
             else:
                 self.engine.status["grudge_score"] = max(0, status.get("grudge_score", 0) - 2.0)
                 status = self.engine.status.copy()
 
-        system_prompt = get_system_prompt(
-            emotion   = status["emotion"],
-            intensity = status["intensity"],
-            affection = status["affection"],
-        ) + _TOOL_RULE
+        # ⚡ Fast path: unambiguous command → direct tool call, no LLM round trip
+        with self._trace.span("fast_path_match"):
+            fast_call = _match_fast_command(lower) if FAST_PATH_ENABLED else None
+        if fast_call is not None:
+            self._trace.set(outcome="fast_path")
+            print(f"[NEON] ⚡ Fast path: {fast_call['name']}({fast_call['arguments']})")
+            return {
+                "user_input":   user_input,
+                "status":       status,
+                "technical":    technical,
+                "is_command":   True,
+                "context":      [],
+                "payload":      None,
+                "fast_message": {"role": "assistant", "content": "", "tool_calls": [{"function": fast_call}]},
+                "cache_key":    None,
+                "hedge_model":  None,
+                "prompt_tokens": 0,
+                "start_t":      time.time(),
+                "deadline":     time.time() + TURN_DEADLINE,
+            }, None
+
+        # ── MODEL CHOICE (the fast path above needs none) ──
+        build_t0 = time.perf_counter()   # "prompt_build" span: routing → payload
+        if self.router is not None:
+            # Large model breaking the SLO → small one (if it can do the job)
+            chosen_model = self.router.route(
+                chosen_model,
+                needs_tools=is_command,
+                supports_tools=self.registry.supports_tools,
+            )
+        # Known-missing model (e.g. SMALL never pulled) → swap before the request
+        # instead of paying a 404 + /api/tags + retry
+        if self.registry.is_installed(chosen_model) is False:
+            chosen_model = self._pick_fallback_model()
 
         # Preference-driven personality mode (persisted)
         try:
             prefs = (self.memory.state.get("prefs") or {}) if getattr(self, "memory", None) else {}
         except Exception:
             prefs = {}
-        banter_mode = (prefs.get("banter_mode") or "balanced").strip().lower()
-        if banter_mode == "roaster":
-            system_prompt += (
-                "\n\nPERSONALITY MODE: ROASTER BESTIE.\n"
-                "- You tease Boss lightly (never cruel, never humiliating).\n"
-                "- Max ONE roast line per reply.\n"
-                "- After teasing, you still help.\n"
-                "- You can flirt a little, but never clingy and never cringe.\n"
-            )
-        elif banter_mode == "curious":
-            system_prompt += (
-                "\n\nPERSONALITY MODE: CURIOUS BESTIE.\n"
-                "- Ask ONE sharp follow-up question when it would clarify what Boss wants.\n"
-                "- Keep it natural and confident.\n"
-                "- You can show that you like Boss, but stay cool.\n"
-            )
-        else:
-            system_prompt += (
-                "\n\nPERSONALITY MODE: BALANCED.\n"
-                "- Light banter is okay when affection allows.\n"
-                "- Ask ONE follow-up question only when it meaningfully helps.\n"
-            )
+
+        # Memoized on bucketed intensity/affection → same object every turn
+        system_prompt = get_cached_system_prompt(
+            emotion     = status["emotion"],
+            intensity   = status["intensity"],
+            affection   = status["affection"],
+            banter_mode = prefs.get("banter_mode") or "balanced",
+            suffix      = _TOOL_RULE,
+        )
+
+        # ── VOLATILE CONTEXT ──
+        # Everything below changes between turns (one-shot memory restore,
+        # minute-resolution clock, platform). It rides on the final user
+        # message instead of the system prompt so that system prompt + history
+        # stay a byte-identical prefix Ollama can serve from its prompt cache.
+        # (A second system message wouldn't work: most chat templates merge
+        # all system messages into the top block.)
+        volatile: List[str] = []
 
         if self._boot_memory:
-            system_prompt += f"\n\n[MEMORY RESTORE: {self._boot_memory}]"
+            volatile.append(f"[MEMORY RESTORE: {self._boot_memory}]")
             self._boot_memory = None
 
         # Feature 3: Proactive time-aware context injection
@@ -1041,8 +1667,8 @@ class NeonBrain:
             if greeting_hint == "late_night" and self.memory.state.get("total_turns", 0) > 5:
                 late_night_note = " It's late — you might gently check if Boss needs sleep."
 
-            system_prompt += (
-                f"\n\n[TIME CONTEXT: {hour:02d}:{local.tm_min:02d} ({greeting_hint})."
+            volatile.append(
+                f"[TIME CONTEXT: {hour:02d}:{local.tm_min:02d} ({greeting_hint})."
                 f"{session_info}{late_night_note}]"
             )
         except Exception:
@@ -1051,51 +1677,196 @@ class NeonBrain:
         # Inject Active Platform Context
         try:
             platform_name = "Mobile App" if target.lower() == "mobile" else "Desktop PC"
-            system_prompt += f"\n\n[USER PLATFORM: Boss is currently using the {platform_name}. If asked about your current mode or capabilities, remember you are controlling the {platform_name}.]"
+            volatile.append(f"[USER PLATFORM: Boss is currently using the {platform_name}. If asked about your current mode or capabilities, remember you are controlling the {platform_name}.]")
         except Exception:
             pass
 
-        context: List[Dict] = [{"role": "system", "content": system_prompt}]
-        context.extend(self._get_history_slice(technical))
-        context.append({"role": "user", "content": user_input})
-
-        payload: Dict = {
-            "model":    chosen_model,
-            "messages": context,
-            "stream":   False,
-            "options":  self._build_options(technical),
-        }
+        # History keeps the clean user_input; only this request sees the context
+        volatile.append(user_input)
+        system_msg = {"role": "system", "content": system_prompt}
+        if self.summarizer is not None and self.summarizer.summary:
+            # Changes once per summary fold, so the prefix stays cacheable in between
+            system_msg["content"] += f"\n\n[EARLIER IN THIS CONVERSATION: {self.summarizer.summary}]"
+        user_msg   = {"role": "user", "content": "\n\n".join(volatile)}
 
-        model_supports_tools = "llama" in chosen_model.lower() or "tool" in chosen_model.lower()
+        # /api/show capabilities (name heuristic only until the registry knows the model)
+        model_supports_tools = self.registry.supports_tools(chosen_model)
         # BUG FIX: Only attach tools when we're confident it's a command.
         # Previously the model would hallucinate tool_calls for
         # borderline inputs like "check this out" or "play it cool".
-        if is_command and model_supports_tools:
-            payload["tools"]       = TOOLS
+        attach_tools = is_command and model_supports_tools
+        tools = self._select_tools(user_input) if attach_tools else None
+
+        # ── TOKEN BUDGET ──
+        # History gets what's left of the largest allowed window after the
+        # system prompt, this message, tool schemas and the reply; num_ctx is
+        # then sized to what is actually sent.
+        model_limit = (self.registry.capabilities(chosen_model) or {}).get("context_length")
+        max_ctx = min(token_budget.NUM_CTX_MAX, model_limit or token_budget.NUM_CTX_MAX)
+        fixed_tokens = (
+            token_budget.message_tokens(system_msg)
+            + token_budget.message_tokens(user_msg)
+            + token_budget.tools_tokens(tools)
+        )
+        history = self._get_history_slice(technical, budget=max_ctx - fixed_tokens - token_budget.NUM_PREDICT)
+        prompt_tokens = fixed_tokens + token_budget.messages_tokens(history)
+        num_ctx = self.sizer.num_ctx(chosen_model, prompt_tokens + token_budget.NUM_PREDICT, model_limit)
+        if self.warmer is not None:
+            self.warmer.touch(chosen_model, {"num_ctx": num_ctx})
+
+        context: List[Dict] = [system_msg] + history + [user_msg]
+
+        payload: Dict = {
+            "model":      chosen_model,
+            "messages":   context,
+            "stream":     False,
+            "options":    self._build_options(
+                technical,
+                num_ctx=num_ctx,
+                num_predict=token_budget.num_predict_for(prompt_tokens, num_ctx),
+            ),
+            "keep_alive": KEEP_ALIVE,
+        }
+
+        if tools:
+            payload["tools"]       = tools
             payload["tool_choice"] = "auto"
         else:
             # Explicitly exclude tools so the model can't hallucinate them
             payload.pop("tools", None)
             payload.pop("tool_choice", None)
 
-        start_t  = time.time()
-        response = self._post(payload, label="primary")
+        turn = {
+            "user_input":   user_input,
+            "status":       status,
+            "technical":    technical,
+            "is_command":   is_command,
+            "context":      context,
+            "payload":      payload,
+            "fast_message": None,
+            "cache_key":    self._response_cache_key(user_input, technical, is_command, system_prompt, payload),
+            "hedge_model":  self._hedge_model_for(payload),
+            "prompt_tokens": prompt_tokens,
+            "history_sent": len(history),
+            "tool_tokens_saved": token_budget.tools_tokens(TOOLS) - token_budget.tools_tokens(tools) if tools else 0,
+            "start_t":      time.time(),
+            "deadline":     time.time() + TURN_DEADLINE,
+        }
+        self._trace.add("prompt_build", (time.perf_counter() - build_t0) * 1000)
+        self._trace.set(model=chosen_model, tools_sent=len(tools or []), prompt_tokens=prompt_tokens)
+        return turn, None
+
+    # ── HEDGED REQUESTS (NEON_HEDGE=1) ────────────────────────────────────────
+
+    def _hedge_model_for(self, payload: Dict) -> Optional[str]:
+        """SMALL may back up a LARGE turn if it's installed and can do what the turn needs."""
+        if not HEDGE_ENABLED or payload["model"] != LARGE_MODEL_NAME or SMALL_MODEL_NAME == LARGE_MODEL_NAME:
+            return None
+        if self.registry.is_installed(SMALL_MODEL_NAME) is False:
+            return None
+        if "tools" in payload and not self.registry.supports_tools(SMALL_MODEL_NAME):
+            return None
+        return SMALL_MODEL_NAME
 
+    def _post_hedged(self, turn: Dict) -> Optional[Dict]:
+        if not self._breaker_allows("hedged request"):
+            return None
+        # SMALL keeps its own num_ctx bucket — borrowing LARGE's would reload it
+        hedge_limit = (self.registry.capabilities(turn["hedge_model"]) or {}).get("context_length")
+        hedge_options = dict(turn["payload"]["options"])
+        hedge_options["num_ctx"] = self.sizer.num_ctx(
+            turn["hedge_model"], turn["prompt_tokens"] + token_budget.NUM_PREDICT, hedge_limit,
+        )
+        t0 = time.time()
+        response = hedged_post(
+            self.session, OLLAMA_URL, turn["payload"], turn["hedge_model"],
+            delay_s=HEDGE_DELAY_MS / 1000.0, deadline_s=turn["deadline"] - t0,
+            hedge_options=hedge_options,
+        )
+        if response is None and time.time() - t0 < 1.0:
+            # Failed fast (404 / refused): the plain path has the model and
+            # /api/generate fallbacks plus the usual error logging
+            return self._post(turn["payload"], label="primary", deadline=turn["deadline"])
         if response is None:
-            return "I can't reach my model server right now. Say 'status' and I'll tell you what's down."
+            self._breaker_record(requests.exceptions.Timeout("hedged request"))
+            print("[WARN] [NEON] Timeout during hedged request")
+        else:
+            self._breaker_record()
+        return response
 
-        message_data = response.get("message", {})
+    def hedge_stats(self) -> Dict:
+        return HEDGE_STATS.snapshot()
+
+    # ── RESPONSE CACHE ────────────────────────────────────────────────────────
+
+    def _response_cache_key(self, user_input: str, technical: bool, is_command: bool,
+                            system_prompt: str, payload: Dict) -> Optional[str]:
+        """Key for self-contained technical Q&A; None for every other turn."""
+        if self.response_cache is None or not technical or is_command or "tools" in payload:
+            return None
+        if not response_cache.is_self_contained(user_input):
+            return None
+        # num_ctx follows the conversation length, not the question
+        options = {k: v for k, v in payload["options"].items() if k != "num_ctx"}
+        return response_cache.make_key(
+            user_input, payload["model"], options,
+            response_cache.prompt_fingerprint(system_prompt),
+        )
+
+    def _cached_message(self, turn: Dict) -> Optional[Dict]:
+        """The cached answer as an assistant message, or None on a miss."""
+        if not turn.get("cache_key"):
+            return None
+        raw = self.response_cache.get(turn["cache_key"])
+        if raw is None:
+            return None
+        self._trace.set(outcome="cache")
+        print("[NEON] 💾 Response cache hit")
+        return {"role": "assistant", "content": raw}
+
+    def _cached_reply(self, turn: Dict) -> Optional[str]:
+        """Finishes the turn from the cache, or returns None on a miss."""
+        message = self._cached_message(turn)
+        return self._complete_turn(turn, message) if message is not None else None
+
+    def _store_cached_reply(self, turn: Dict, message_data: Dict) -> None:
+        content = message_data.get("content") or ""
+        if (
+            not turn.get("cache_key")
+            or not content.strip()
+            or message_data.get("tool_calls")
+            or _looks_like_tool_json(content)
+        ):
+            return
+        threading.Thread(
+            target=self.response_cache.put,
+            args=(turn["cache_key"], content),
+            kwargs={"model": turn["payload"]["model"], "question": turn["user_input"]},
+            daemon=True,
+        ).start()
+
+    def _complete_turn(self, turn: Dict, message_data: Dict) -> Optional[str]:
+        """
+        Back half of a turn, shared by chat() and chat_stream(): hallucination
+        guard, tool execution + flavoring, JSON guard, postprocess and the
+        history / memory update.
+        """
+        user_input = turn["user_input"]
+        status     = turn["status"]
+        context    = turn["context"]
 
         # FIX: Hallucination Guard - Strip tool calls if not a command
-        if not is_command:
+        if not turn["is_command"]:
             message_data.pop("tool_calls", None)
 
         # FIX: Skip Follow-up for latency reduction on simple tools
         if message_data.get("tool_calls"):
             print("🛠️ [NEON] Tool Call Detected!")
+            turn["tool_turn"] = True
             context.append(message_data) 
 
             tool_result = self._execute_tool_calls(message_data["tool_calls"], context, target=self._current_target)
+            flavor_t0 = time.perf_counter()
             
             # 🎀 Flavor the dry tool output with anime girl personality
             # Feature 2: Handle multi-tool chaining
@@ -1110,6 +1881,10 @@ class NeonBrain:
                         act_name = tool_calls_list[i]["function"]["name"]
                     except (KeyError, IndexError):
                         act_name = ""
+                    if part in self._pending_acks:
+                        # Still running in the background: not done yet, say so as-is
+                        flavored_parts.append(part)
+                        continue
                     flavored_parts.append(flavor_command_response(
                         action_name=act_name,
                         raw_message=part,
@@ -1124,59 +1899,361 @@ class NeonBrain:
                     action_name = tool_calls_list[0]["function"]["name"]
                 except (KeyError, IndexError):
                     pass
-                raw_reply = flavor_command_response(
-                    action_name=action_name,
-                    raw_message=tool_result.strip(),
-                    user_input=user_input,
-                    emotion_status=status,
-                )
+                if tool_result.strip() in self._pending_acks:
+                    raw_reply = tool_result.strip()
+                else:
+                    raw_reply = flavor_command_response(
+                        action_name=action_name,
+                        raw_message=tool_result.strip(),
+                        user_input=user_input,
+                        emotion_status=status,
+                    )
+            self._trace.add("flavor", (time.perf_counter() - flavor_t0) * 1000)
             
         else:
             raw_reply = message_data.get("content", "")
 
-        elapsed = time.time() - start_t
+        elapsed = time.time() - turn["start_t"]
         if elapsed > SLOW_WARN:
-            print(f"[WARN] [NEON] Slow response: {elapsed:.2f}s")
+            slowest = self._trace.slowest()
+            where = f" (slowest: {slowest['name']} {slowest['ms'] / 1000:.2f}s)" if slowest else ""
+            print(f"[WARN] [NEON] Slow response: {elapsed:.2f}s{where}")
 
         if not raw_reply:
             return None
 
         # Guard: if LLM emitted raw JSON instead of natural language, don't speak it.
-        # BUG FIX: Old guard only caught '{' and '```json'.  The model can also
-        # emit '[{', '```\n{', or just a dict-like blob.  Catch more patterns.
-        stripped = raw_reply.strip()
-        _looks_like_json = (
-            stripped.startswith("{") or stripped.startswith("[{")
-            or stripped.startswith("```")
-        )
-        _has_tool_markers = (
-            '"name"' in stripped or '"function"' in stripped
-            or '"tool_call"' in stripped or '"action"' in stripped
-        )
-        _has_arg_markers = (
-            '"arguments"' in stripped or '"parameters"' in stripped
-            or '"type"' in stripped
-        )
-        if _looks_like_json and _has_tool_markers and _has_arg_markers:
-            print(f"[WARN] [NEON] Raw JSON reply intercepted: {stripped[:120]}")
+        if _looks_like_tool_json(raw_reply):
+            print(f"[WARN] [NEON] Raw JSON reply intercepted: {raw_reply.strip()[:120]}")
             raw_reply = "Sorry Boss, I didn't quite catch that. Could you repeat?"
 
-        final_reply = postprocess_reply(raw_reply)
-
-
+        with self._trace.span("postprocess"):
+            final_reply = postprocess_reply(raw_reply)
 
         self.history.append({"role": "user",      "content": user_input})
         self.history.append({"role": "assistant",  "content": final_reply})
-        self._trim_history()
+        self._trim_history(turn.get("history_sent"))
+
+        trace = self._trace
+
+        def _save(state: Dict) -> None:
+            # Lands in the trace after the turn returned (see brain/tracing.py)
+            with trace.span("memory_save"):
+                self.memory.save(state)
 
         threading.Thread(
-            target=self.memory.save,
+            target=_save,
             args=(self.engine.get_state(),),
             daemon=True,
         ).start()
 
         return final_reply
 
+    # ── TRACING ───────────────────────────────────────────────────────────────
+
+    def _begin_trace(self) -> None:
+        self._trace = TurnTrace(self._trace_stats) if TRACE_ENABLED else NULL_TRACE
+
+    def _end_trace(self) -> None:
+        trace, self._trace = self._trace, NULL_TRACE
+        if trace is not NULL_TRACE:
+            trace.finish()
+            self._last_trace = trace
+
+    @property
+    def last_trace(self) -> Optional[Dict]:
+        """Spans + Ollama timings of the last finished turn."""
+        return self._last_trace.to_dict() if self._last_trace is not None else None
+
+    def trace_stats(self) -> Dict[str, Dict]:
+        """Rolling p50 / p95 / max and histogram per stage, across all brains."""
+        return self._trace_stats.summary()
+
+    def chat(self, user_input: str, target: str = "auto") -> Optional[str]:
+        self._begin_trace()
+        try:
+            return self._chat_turn(user_input, target)
+        finally:
+            self._end_trace()
+
+    def _chat_turn(self, user_input: str, target: str) -> Optional[str]:
+        turn, early_reply = self._prepare_turn(user_input, target)
+        if turn is None:
+            return early_reply
+        if turn["fast_message"] is not None:
+            return self._complete_turn(turn, turn["fast_message"])
+        cached = self._cached_reply(turn)
+        if cached is not None:
+            return cached
+
+        with self._trace.span("http"):
+            if turn["hedge_model"]:
+                response = self._post_hedged(turn)
+            else:
+                response = self._post(turn["payload"], label="primary", deadline=turn["deadline"])
+
+        if response is None:
+            self._trace.set(outcome="offline")
+            return OFFLINE_REPLY
+
+        self._record_eval_stats(response, turn)
+        message_data = response.get("message", {})
+        self._store_cached_reply(turn, message_data)
+        return self._complete_turn(turn, message_data)
+
+    def chat_stream(self, user_input: str, target: str = "auto") -> Iterator[str]:
+        """
+        Streaming variant of chat(): yields reply text as Ollama generates it.
+
+        Plain conversation is yielded a sentence at a time, already through
+        postprocess_reply (emoji, slang, *actions* and labels cleaned), so the
+        yielded pieces join up to exactly what chat() returns and what goes
+        into history. Replies that open like a JSON blob are held back until
+        the stream ends so the hallucination guard can still intercept them,
+        and command turns are held entirely because a tool call replaces the
+        model's wording. Tool execution, flavoring, history and memory run when
+        the stream ends; the cleaned final reply is left on `self.last_reply`.
+        """
+        self._begin_trace()
+        try:
+            yield from self._chat_stream_turn(user_input, target)
+        finally:
+            self._end_trace()
+
+    def _chat_stream_turn(self, user_input: str, target: str) -> Iterator[str]:
+        self.last_reply = None
+        self.last_ttft = None
+        turn, early_reply = self._prepare_turn(user_input, target)
+        if turn is None:
+            self.last_reply = early_reply
+            if early_reply:
+                yield early_reply
+            return
+        if turn["fast_message"] is not None:
+            self.last_reply = self._complete_turn(turn, turn["fast_message"])
+            self.last_ttft = time.time() - turn["start_t"]
+            if self.last_reply:
+                yield self.last_reply
+            return
+        cached = self._cached_reply(turn)
+        if cached is not None:
+            self.last_reply = cached
+            self.last_ttft = time.time() - turn["start_t"]
+            yield cached
+            return
+
+        content_parts: List[str] = []
+        tool_calls: List[Dict] = []
+        got_response = False
+        holding = True
+        emitted = ""   # cleaned text yielded so far (always a prefix of the final reply)
+
+        http_t0 = time.perf_counter()
+        for chunk in self._post_stream(turn["payload"], label="stream", deadline=turn["deadline"]):
+            if not got_response:
+                self._trace.add("http.first_chunk", (time.perf_counter() - http_t0) * 1000)
+            got_response = True
+            if chunk.get("done"):
+                self._record_eval_stats(chunk, turn)
+            msg = chunk.get("message") or {}
+            if msg.get("tool_calls"):
+                tool_calls.extend(msg["tool_calls"])
+            delta = msg.get("content") or ""
+            if not delta:
+                continue
+            content_parts.append(delta)
+            if turn["is_command"]:
+                continue
+            raw = "".join(content_parts)
+            if holding:
+                head = raw.lstrip()
+                if not head or head.startswith(("{", "[", "`")):
+                    continue
+                holding = False
+            cleaned = _cleaned_stream_prefix(raw)
+            if cleaned is None or len(cleaned) <= len(emitted) or not cleaned.startswith(emitted):
+                continue
+            if self.last_ttft is None:
+                self.last_ttft = time.time() - turn["start_t"]
+            piece, emitted = cleaned[len(emitted):], cleaned
+            yield piece
+
+        # Includes the time the consumer (TTS) spent between chunks
+        self._trace.add("http", (time.perf_counter() - http_t0) * 1000)
+        if not got_response:
+            self._trace.set(outcome="offline")
+            self.last_reply = OFFLINE_REPLY
+            yield self.last_reply
+            return
+
+        message_data: Dict = {"role": "assistant", "content": "".join(content_parts)}
+        if tool_calls:
+            message_data["tool_calls"] = tool_calls
+        self._store_cached_reply(turn, message_data)
+
+        final_reply = self._complete_turn(turn, message_data)
+        self.last_reply = final_reply
+        if not final_reply:
+            return
+        if emitted and not final_reply.startswith(emitted):
+            # Cleanup of the whole reply disagreed with the sentence-wise one
+            # (e.g. JSON after plain text); last_reply still has the final text
+            print(f"[WARN] [NEON] Streamed text diverged from the final reply: {emitted[:60]!r}")
+            return
+        rest = final_reply[len(emitted):]
+        if rest:
+            if self.last_ttft is None:
+                self.last_ttft = time.time() - turn["start_t"]
+            yield rest
+
+    # ── BATCH ─────────────────────────────────────────────────────────────────
+
+    def chat_many(self, prompts: List[str], max_parallel: Optional[int] = None,
+                  target: str = "auto", stateless: bool = False) -> List[Optional[str]]:
+        """
+        Answers independent prompts with up to `max_parallel` Ollama requests
+        in flight (default NEON_MAX_PARALLEL; more than the server's
+        OLLAMA_NUM_PARALLEL just queue there). Replies come back in input order.
+
+        Every prompt is a full turn (intent, emotion, tools, memory) that sees
+        the history as it was before the batch; the turns are appended to it
+        in input order. With stateless=True nothing about the conversation is
+        read or written: each prompt goes out with the persona system prompt
+        alone, no tools, and history / emotion / memory stay untouched.
+        """
+        prompts = list(prompts or [])
+        if not prompts:
+            return []
+        workers = max(1, int(max_parallel or MAX_PARALLEL))
+        if stateless:
+            return self._chat_many_stateless(prompts, workers, target)
+
+        # Front halves in order: the emotion engine sees the prompts one after
+        # another, exactly like consecutive turns (no duplicate gate: a batch
+        # repeating a prompt wants both answers)
+        items: List[Dict] = []
+        for prompt in prompts:
+            self._begin_trace()
+            item: Dict = {"turn": None, "early": None, "message": None, "response": None}
+            try:
+                item["turn"], item["early"] = self._prepare_turn(prompt, target, dedupe=False)
+                if item["turn"] is not None:
+                    item["message"] = item["turn"]["fast_message"] or self._cached_message(item["turn"])
+            finally:
+                item["trace"], self._trace = self._trace, NULL_TRACE
+            item["user_lower"], item["target"] = self._current_user_lower, self._current_target
+            items.append(item)
+
+        self._post_many([i for i in items if i["turn"] is not None and i["message"] is None], workers)
+
+        # Back halves in order: tools, history and memory as if sequential
+        replies: List[Optional[str]] = []
+        for item in items:
+            self._trace = item["trace"]
+            self._current_user_lower, self._current_target = item["user_lower"], item["target"]
+            turn = item["turn"]
+            try:
+                if turn is None:
+                    replies.append(item["early"])
+                elif item["message"] is not None:
+                    replies.append(self._complete_turn(turn, item["message"]))
+                elif item["response"] is None:
+                    self._trace.set(outcome="offline")
+                    replies.append(OFFLINE_REPLY)
+                else:
+                    self._record_eval_stats(item["response"], turn)
+                    message_data = item["response"].get("message", {})
+                    self._store_cached_reply(turn, message_data)
+                    replies.append(self._complete_turn(turn, message_data))
+            finally:
+                self._end_trace()
+        return replies
+
+    def _post_many(self, items: List[Dict], workers: int) -> None:
+        """POSTs each item's payload (no hedging: the batch already fills the server)."""
+        def fetch(item: Dict) -> None:
+            turn = item["turn"]
+            # The turn's budget starts when its request does, not while it queues
+            turn["start_t"] = time.time()
+            turn["deadline"] = turn["start_t"] + TURN_DEADLINE
+            http_t0 = time.perf_counter()
+            item["response"] = self._post(turn["payload"], label="batch", deadline=turn["deadline"])
+            item["trace"].add("http", (time.perf_counter() - http_t0) * 1000)
+
+        if len(items) <= 1 or workers <= 1:
+            for item in items:
+                fetch(item)
+            return
+        with ThreadPoolExecutor(max_workers=min(workers, len(items)), thread_name_prefix="neon-batch") as pool:
+            list(pool.map(fetch, items))
+
+    def _chat_many_stateless(self, prompts: List[str], workers: int, target: str) -> List[Optional[str]]:
+        status = self.engine.status.copy()
+        try:
+            prefs = (self.memory.state.get("prefs") or {}) if getattr(self, "memory", None) else {}
+        except Exception:
+            prefs = {}
+        system_prompt = get_cached_system_prompt(
+            emotion     = status["emotion"],
+            intensity   = status["intensity"],
+            affection   = status["affection"],
+            banter_mode = prefs.get("banter_mode") or "balanced",
+            suffix      = _TOOL_RULE,
+        )
+        platform_name = "Mobile App" if (target or "").lower() == "mobile" else "Desktop PC"
+
+        items: List[Dict] = []
+        for prompt in prompts:
+            if not prompt or not prompt.strip():
+                items.append({"turn": None})
+                continue
+            lower = prompt.strip().lower()
+            technical = _is_technical(lower)
+            model = _select_model(technical=technical, is_command=_is_command(lower))
+            if self.router is not None:
+                model = self.router.route(model)
+            if self.registry.is_installed(model) is False:
+                model = self._pick_fallback_model()
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": f"[USER PLATFORM: Boss is currently using the {platform_name}.]\n\n{prompt.strip()}"},
+            ]
+            prompt_tokens = token_budget.messages_tokens(messages)
+            model_limit = (self.registry.capabilities(model) or {}).get("context_length")
+            num_ctx = self.sizer.num_ctx(model, prompt_tokens + token_budget.NUM_PREDICT, model_limit)
+            payload = {
+                "model":      model,
+                "messages":   messages,
+                "stream":     False,
+                "options":    self._build_options(technical, num_ctx=num_ctx,
+                                                  num_predict=token_budget.num_predict_for(prompt_tokens, num_ctx)),
+                "keep_alive": KEEP_ALIVE,
+            }
+            items.append({"turn": {"payload": payload, "prompt_tokens": prompt_tokens},
+                          "trace": NULL_TRACE, "response": None})
+
+        self._post_many([i for i in items if i["turn"] is not None], workers)
+
+        replies: List[Optional[str]] = []
+        for item in items:
+            response = item.get("response")
+            if item["turn"] is None:
+                replies.append(None)
+                continue
+            if response is None:
+                replies.append(OFFLINE_REPLY)
+                continue
+            self._record_eval_stats(response, item["turn"])
+            content = ((response.get("message") or {}).get("content") or "").strip()
+            if not content or _looks_like_tool_json(content):
+                replies.append(None)
+                continue
+            replies.append(postprocess_reply(content))
+        return replies
+
     def reset_history(self) -> None:
         self.history = []
+        self._summarized = 0
+        if self.summarizer is not None:
+            self.summarizer.clear()
         print("[MEMORY] Short-term history cleared.")
\ No newline at end of file
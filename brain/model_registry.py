@@ -0,0 +1,225 @@
+"""
+Neon Model Registry — what Ollama has installed, and what each model can do.
+
+Replaces two per-turn guesses in NeonBrain:
+  - the /api/tags round trip on every 404 (_pick_fallback_model)
+  - the `"llama" in model_name` tool-support heuristic
+
+Installed models are cached for NEON_MODEL_REGISTRY_TTL seconds and refreshed
+in a background thread once stale (the stale list keeps being served in the
+meantime). Capabilities come from /api/show and are cached per model:
+
+    {"tools": True, "context_length": 131072, "parameter_size": "3.2B",
+     "capabilities": ["completion", "tools"]}
+
+Hot-path lookups never block: an unknown model falls back to the old name
+heuristic while its /api/show runs in the background.
+
+One registry per process is shared by every brain (get_shared_registry).
+"""
+
+import os
+import time
+import threading
+from typing import Dict, List, Optional
+
+import requests
+
+REGISTRY_TTL = float(os.getenv("NEON_MODEL_REGISTRY_TTL", "300"))   # seconds
+
+
+def _normalize(name: str) -> str:
+    """'llama3.2' and 'llama3.2:latest' are the same model to Ollama."""
+    name = (name or "").strip()
+    return name if ":" in name else f"{name}:latest"
+
+
+def _guess_tool_support(model: str) -> bool:
+    """Pre-registry heuristic, used until /api/show has answered."""
+    lower = (model or "").lower()
+    return "llama" in lower or "tool" in lower
+
+
+class ModelRegistry:
+    def __init__(self, session: requests.Session, tags_url: str, show_url: str, ttl: float = REGISTRY_TTL):
+        self.session  = session
+        self.tags_url = tags_url
+        self.show_url = show_url
+        self.ttl      = float(ttl)
+
+        self._installed: List[str] = []
+        self._loaded_at: float = 0.0
+        self._caps: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._pending_show: set = set()
+        self._show_failed: Dict[str, float] = {}   # model -> time of last failed /api/show
+
+    # ── INSTALLED MODELS ──────────────────────────────────────────────────────
+
+    def refresh(self) -> List[str]:
+        """Blocking /api/tags fetch. Keeps the old list if Ollama is unreachable."""
+        try:
+            r = self.session.get(self.tags_url, timeout=2)
+            if r.status_code != 200:
+                return list(self._installed)
+            models = (r.json() or {}).get("models") or []
+            names = [(m.get("name") or "").strip() for m in models]
+            names = [n for n in names if n]
+        except Exception:
+            return list(self._installed)
+
+        with self._lock:
+            self._installed = names
+            self._loaded_at = time.time()
+            known = set(map(_normalize, names))
+            # Forget capabilities of models that were removed
+            for model in list(self._caps):
+                if _normalize(model) not in known:
+                    del self._caps[model]
+        return list(names)
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def _run():
+            try:
+                for model in self.refresh():
+                    if model not in self._caps:
+                        self._fetch_capabilities(model)
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=_run, name="neon-model-registry", daemon=True).start()
+
+    def installed(self, block: bool = False) -> List[str]:
+        """
+        Cached installed-model list. Stale → background refresh (stale list is
+        returned). block=True waits for a fetch when nothing is cached yet.
+        """
+        if not self._loaded_at and block:
+            self.refresh()
+            return list(self._installed)
+        if time.time() - self._loaded_at > self.ttl:
+            self._refresh_in_background()
+        return list(self._installed)
+
+    def is_installed(self, model: str) -> Optional[bool]:
+        """True / False, or None while the registry hasn't loaded yet."""
+        names = self.installed()
+        if not self._loaded_at:
+            return None
+        return _normalize(model) in set(map(_normalize, names))
+
+    def invalidate(self) -> None:
+        """Ollama disagreed with the cache (e.g. a 404) — next lookup refetches."""
+        with self._lock:
+            self._loaded_at = 0.0
+
+    def pick_fallback(self, preferred: str) -> str:
+        """
+        Model to use when `preferred` isn't available:
+        1) `preferred` if installed
+        2) first installed model
+        3) `preferred` as last resort
+        """
+        installed = self.installed(block=True)
+        normalized = {_normalize(n): n for n in installed}
+        if _normalize(preferred) in normalized:
+            return normalized[_normalize(preferred)]
+        if installed:
+            return installed[0]
+        return preferred
+
+    # ── CAPABILITIES ──────────────────────────────────────────────────────────
+
+    def _fetch_capabilities(self, model: str) -> Optional[Dict]:
+        data = None
+        try:
+            r = self.session.post(self.show_url, json={"model": model}, timeout=5)
+            if r.status_code == 200:
+                data = r.json() or {}
+        except Exception:
+            data = None
+        finally:
+            with self._lock:
+                self._pending_show.discard(model)
+                if data is None:
+                    self._show_failed[model] = time.time()
+        if data is None:
+            return None
+
+        capabilities = list(data.get("capabilities") or [])
+        if capabilities:
+            tools = "tools" in capabilities
+        else:
+            # Older Ollama: no capabilities list, but tool-capable templates use .Tools
+            tools = ".Tools" in (data.get("template") or "")
+
+        context_length = None
+        for key, value in (data.get("model_info") or {}).items():
+            if key.endswith(".context_length"):
+                try:
+                    context_length = int(value)
+                except (TypeError, ValueError):
+                    pass
+                break
+
+        caps = {
+            "tools":          tools,
+            "context_length": context_length,
+            "parameter_size": (data.get("details") or {}).get("parameter_size"),
+            "capabilities":   capabilities,
+        }
+        with self._lock:
+            self._caps[model] = caps
+        return caps
+
+    def capabilities(self, model: str, block: bool = False) -> Optional[Dict]:
+        """Cached /api/show summary; None if not known yet (fetch is scheduled)."""
+        caps = self._caps.get(model)
+        if caps is not None or not model:
+            return caps
+        if block:
+            return self._fetch_capabilities(model)
+        with self._lock:
+            if model in self._pending_show:
+                return None
+            if time.time() - self._show_failed.get(model, 0) < self.ttl:
+                return None   # don't hammer a server that just failed
+            self._pending_show.add(model)
+        threading.Thread(target=self._fetch_capabilities, args=(model,), daemon=True).start()
+        return None
+
+    def supports_tools(self, model: str) -> bool:
+        caps = self.capabilities(model)
+        if caps is None:
+            return _guess_tool_support(model)
+        return bool(caps["tools"])
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "installed":    list(self._installed),
+                "age_s":        round(time.time() - self._loaded_at, 1) if self._loaded_at else None,
+                "capabilities": {m: dict(c) for m, c in self._caps.items()},
+            }
+
+
+# One registry per process: every brain talks to the same Ollama
+_SHARED_REGISTRY: Optional[ModelRegistry] = None
+_SHARED_REGISTRY_LOCK = threading.Lock()
+
+
+def get_shared_registry(**kwargs) -> ModelRegistry:
+    """Returns the process-wide registry, creating it on first call."""
+    global _SHARED_REGISTRY
+    if _SHARED_REGISTRY is None:
+        with _SHARED_REGISTRY_LOCK:
+            if _SHARED_REGISTRY is None:
+                _SHARED_REGISTRY = ModelRegistry(**kwargs)
+    return _SHARED_REGISTRY
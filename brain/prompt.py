@@ -1,5 +1,8 @@
+from functools import lru_cache
 from textwrap import dedent
 
+PROMPT_CACHE_SIZE = 128   # distinct (emotion, buckets, banter mode) prompts kept
+
 
 def get_system_prompt(
     emotion: str = "calm",
@@ -189,4 +192,94 @@ def get_system_prompt(
     ✗ Never says "Great question!" or any sycophantic opener
     ✗ Never breaks character to describe her own personality
     ✗ Never repeats the user's words back at them as filler
-    """).strip()
\ No newline at end of file
+    """).strip()
+
+
+# ── BANTER MODE BLOCKS (persisted pref: balanced | roaster | curious) ────────
+BANTER_BLOCKS = {
+    "roaster": (
+        "\n\nPERSONALITY MODE: ROASTER BESTIE.\n"
+        "- You tease Boss lightly (never cruel, never humiliating).\n"
+        "- Max ONE roast line per reply.\n"
+        "- After teasing, you still help.\n"
+        "- You can flirt a little, but never clingy and never cringe.\n"
+    ),
+    "curious": (
+        "\n\nPERSONALITY MODE: CURIOUS BESTIE.\n"
+        "- Ask ONE sharp follow-up question when it would clarify what Boss wants.\n"
+        "- Keep it natural and confident.\n"
+        "- You can show that you like Boss, but stay cool.\n"
+    ),
+    "balanced": (
+        "\n\nPERSONALITY MODE: BALANCED.\n"
+        "- Light banter is okay when affection allows.\n"
+        "- Ask ONE follow-up question only when it meaningfully helps.\n"
+    ),
+}
+
+
+# ── QUANTIZATION ─────────────────────────────────────────────────────────────
+# get_system_prompt only branches on these thresholds, so every value inside
+# a bucket renders the same text once the printed intensity is the bucket's.
+def quantize_intensity(intensity: float) -> float:
+    """Buckets: < 0.3 | 0.3–0.6 | 0.6–0.8 | > 0.8 (same rounding as get_system_prompt)."""
+    try:
+        i = round(max(0.0, min(1.0, float(intensity))), 2)
+    except (ValueError, TypeError):
+        i = 0.5
+    if i < 0.3:
+        return 0.2
+    if i <= 0.6:
+        return 0.5
+    if i <= 0.8:
+        return 0.7
+    return 0.9
+
+
+def quantize_affection(affection: float) -> float:
+    """Buckets: < 35 | 35–60 | 60–85 | >= 85 (the relationship tiers)."""
+    try:
+        a = round(max(0.0, min(100.0, float(affection))), 1)
+    except (ValueError, TypeError):
+        a = 50.0
+    if a < 35:
+        return 20.0
+    if a < 60:
+        return 50.0
+    if a < 85:
+        return 70.0
+    return 90.0
+
+
+@lru_cache(maxsize=PROMPT_CACHE_SIZE)
+def _build_cached_prompt(emotion: str, intensity: float, affection: float, banter_mode: str, suffix: str) -> str:
+    return (
+        get_system_prompt(emotion=emotion, intensity=intensity, affection=affection)
+        + suffix
+        + BANTER_BLOCKS[banter_mode]
+    )
+
+
+def get_cached_system_prompt(
+    emotion: str = "calm",
+    intensity: float = 0.5,
+    affection: float = 50,
+    banter_mode: str = "balanced",
+    suffix: str = "",
+) -> str:
+    """
+    Full system message for a turn: persona prompt + suffix (tool rule) +
+    banter-mode block. Memoized on the quantized state, so the same mood
+    returns the very same string object turn after turn — no dedent work and
+    a byte-identical prefix for the Ollama prompt cache.
+    """
+    e = emotion.strip().lower() if emotion else "calm"
+    mode = (banter_mode or "balanced").strip().lower()
+    if mode not in BANTER_BLOCKS:
+        mode = "balanced"
+    return _build_cached_prompt(e, quantize_intensity(intensity), quantize_affection(affection), mode, suffix)
+
+
+def prompt_cache_info():
+    """functools cache stats (hits / misses / currsize) for the prompt LRU."""
+    return _build_cached_prompt.cache_info()
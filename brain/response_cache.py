@@ -0,0 +1,186 @@
+"""
+Neon Response Cache — opt-in disk cache for repeated technical questions.
+
+"what is a python decorator" asked on Monday and again on Friday gets the same
+large-model answer at temperature 0.2, so the second time can skip Ollama.
+
+Only self-contained technical Q&A is cached (see NeonBrain._response_cache_key):
+no commands / tool turns, no casual chat (its reply depends on mood and
+history), nothing that points back at earlier context ("explain this").
+
+Key   = sha256(normalized input, model, options, system-prompt fingerprint)
+Value = raw model text (postprocess + history still run on a hit)
+
+Entries are evicted LRU-first past NEON_RESPONSE_CACHE_SIZE and expire after
+NEON_RESPONSE_CACHE_TTL seconds. The cache is saved atomically to
+memory/state/response_cache.json after every store, so it survives restarts.
+
+Enable with NEON_RESPONSE_CACHE=1.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+CACHE_ENABLED = os.getenv("NEON_RESPONSE_CACHE", "0").strip() == "1"
+CACHE_SIZE    = int(os.getenv("NEON_RESPONSE_CACHE_SIZE", "256"))
+CACHE_TTL     = float(os.getenv("NEON_RESPONSE_CACHE_TTL", str(7 * 24 * 3600)))   # seconds
+
+_PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+CACHE_FILE    = os.path.join(_PROJECT_ROOT, "memory", "state", "response_cache.json")
+
+
+# Follow-ups that lean on earlier context can't be answered from a cache
+_REFERENTIAL_RE = re.compile(r"\b(?:it|this|that|these|those|above|previous|again|same|my|our)\b")
+
+
+def is_self_contained(text: str) -> bool:
+    return not _REFERENTIAL_RE.search(normalize_question(text))
+
+
+def normalize_question(text: str) -> str:
+    """Case, spacing and trailing punctuation don't change the question."""
+    t = " ".join((text or "").lower().split())
+    return t.strip(" ?.!,")
+
+
+def prompt_fingerprint(system_prompt: str) -> str:
+    return hashlib.sha256((system_prompt or "").encode("utf-8")).hexdigest()[:16]
+
+
+def make_key(question: str, model: str, options: Dict, fingerprint: str) -> str:
+    raw = json.dumps(
+        [normalize_question(question), model, options or {}, fingerprint],
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path: str = CACHE_FILE, max_entries: int = CACHE_SIZE, ttl_seconds: float = CACHE_TTL):
+        self.path        = path
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()   # oldest use first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._load()
+
+    # ── DISK ──────────────────────────────────────────────────────────────────
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"[WARN] [NEON] Corrupted response cache ({e}). Starting empty.")
+            return
+        now = time.time()
+        rows = [
+            (k, v) for k, v in (raw.get("entries") or {}).items()
+            if isinstance(v, dict) and isinstance(v.get("reply"), str)
+            and now - float(v.get("created", 0)) <= self.ttl_seconds
+        ]
+        rows.sort(key=lambda kv: float(kv[1].get("last_used", 0)))
+        for key, entry in rows[-self.max_entries:]:
+            self._entries[key] = entry
+
+    def _save_locked(self) -> None:
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_file = self.path + ".tmp"
+        try:
+            with open(temp_file, "w", encoding="utf-8") as f:
+                json.dump({"entries": dict(self._entries)}, f, ensure_ascii=False)
+            os.replace(temp_file, self.path)
+        except Exception as e:
+            print(f"[ERROR] [NEON] Response cache save failed: {e}")
+            if os.path.exists(temp_file):
+                try:
+                    os.remove(temp_file)
+                except OSError:
+                    pass
+
+    # ── LOOKUP / STORE ────────────────────────────────────────────────────────
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry["created"] > self.ttl_seconds:
+                del self._entries[key]
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            entry["last_used"] = time.time()
+            entry["hits"] = entry.get("hits", 0) + 1
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["reply"]
+
+    def put(self, key: str, reply: str, model: str = "", question: str = "") -> None:
+        if not reply or not reply.strip():
+            return
+        now = time.time()
+        with self._lock:
+            self._entries[key] = {
+                "reply":     reply,
+                "model":     model,
+                "question":  normalize_question(question)[:200],
+                "created":   now,
+                "last_used": now,
+                "hits":      0,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self.stores += 1
+            self._save_locked()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._save_locked()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries":   len(self._entries),
+                "hits":      self.hits,
+                "misses":    self.misses,
+                "hit_rate":  round(self.hits / lookups, 3) if lookups else 0.0,
+                "stores":    self.stores,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# One cache (and one file) per process
+_SHARED_CACHE: Optional[ResponseCache] = None
+_SHARED_CACHE_LOCK = threading.Lock()
+
+
+def get_shared_response_cache() -> ResponseCache:
+    global _SHARED_CACHE
+    if _SHARED_CACHE is None:
+        with _SHARED_CACHE_LOCK:
+            if _SHARED_CACHE is None:
+                _SHARED_CACHE = ResponseCache()
+    return _SHARED_CACHE
@@ -0,0 +1,177 @@
+"""
+Neon Model Router — latency-aware choice between LARGE and SMALL.
+
+_select_model() says what a turn *should* use (large for commands and tech,
+small for chat). The router checks that against what the hardware is doing:
+it keeps a rolling window of Ollama's total_duration per model and, when the
+large model's p95 breaks NEON_ROUTER_SLO_MS, sends the turn to the small
+model instead (only if that one can handle tools when the turn needs them).
+Routing only ever degrades large → small: a slow small model is not a reason
+to hand a chat turn to the even slower large one, so turns that prefer the
+small model always keep it.
+
+A degraded model isn't abandoned: once every NEON_ROUTER_PROBE_S seconds one
+turn is routed back to it as a probe. A probe that meets the SLO resets its
+window and it is preferred again — the SLO is the only way back.
+
+Every decision — "ok" turns included — is kept in `decisions` and appended
+to the audit log next to the memory state (memory/state/router.log,
+NEON_ROUTER_LOG="" disables the file). The log is bounded: at
+NEON_ROUTER_LOG_MAX_KB it rolls over to <path>.1, so at most two files:
+
+    Sat Oct 18 14:02:11 2026 | [ROUTE] | llama3.2:3b -> llama3.2:1b | slo: p95 9120ms > 8000ms | n=12
+
+One router per process is shared by every brain (get_shared_router).
+"""
+
+import os
+import math
+import time
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+ROUTER_ENABLED     = os.getenv("NEON_ROUTER", "1").strip() != "0"
+ROUTER_SLO_MS      = float(os.getenv("NEON_ROUTER_SLO_MS", "8000"))
+ROUTER_WINDOW      = int(os.getenv("NEON_ROUTER_WINDOW", "50"))
+ROUTER_MIN_SAMPLES = int(os.getenv("NEON_ROUTER_MIN_SAMPLES", "5"))
+ROUTER_PROBE_S     = float(os.getenv("NEON_ROUTER_PROBE_S", "60"))
+
+_PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+ROUTER_LOG         = os.getenv("NEON_ROUTER_LOG", os.path.join(_PROJECT_ROOT, "memory", "state", "router.log")).strip()
+ROUTER_LOG_MAX_KB  = int(os.getenv("NEON_ROUTER_LOG_MAX_KB", "256"))
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (pct in 0–100); 0.0 for no data."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class ModelRouter:
+    def __init__(
+        self,
+        large: str,
+        small: str,
+        slo_ms: float = ROUTER_SLO_MS,
+        window: int = ROUTER_WINDOW,
+        min_samples: int = ROUTER_MIN_SAMPLES,
+        probe_interval: float = ROUTER_PROBE_S,
+        log_path: Optional[str] = ROUTER_LOG,
+        log_max_bytes: int = ROUTER_LOG_MAX_KB * 1024,
+    ):
+        self.large          = large
+        self.small          = small
+        self.slo_ms         = float(slo_ms)
+        self.window         = max(1, int(window))
+        self.min_samples    = max(1, int(min_samples))
+        self.probe_interval = float(probe_interval)
+        self.log_path       = log_path or None
+        self.log_max_bytes  = max(1024, int(log_max_bytes))
+
+        self._samples: Dict[str, deque] = {}
+        self._last_probe: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.decisions: deque = deque(maxlen=200)
+        if self.log_path:
+            try:
+                os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+            except OSError:
+                self.log_path = None
+
+    # ── LATENCY SAMPLES ───────────────────────────────────────────────────────
+
+    def record(self, model: str, total_ms: float) -> None:
+        """One finished request; total_ms is Ollama's total_duration (ms)."""
+        if not model or not total_ms or total_ms <= 0:
+            return
+        with self._lock:
+            samples = self._samples.setdefault(model, deque(maxlen=self.window))
+            was_slow = self._over_slo_locked(model)
+            samples.append(float(total_ms))
+            if was_slow and total_ms <= self.slo_ms:
+                # A probe came back within SLO: forget the slow history
+                samples.clear()
+                samples.append(float(total_ms))
+                self._last_probe.pop(model, None)
+                recovered = True
+            else:
+                recovered = False
+        if recovered:
+            self._audit(f"{model} recovered | probe {total_ms:.0f}ms <= {self.slo_ms:.0f}ms")
+
+    def stats(self, model: str) -> Dict:
+        with self._lock:
+            values = list(self._samples.get(model) or [])
+        return {
+            "samples": len(values),
+            "p50_ms":  round(percentile(values, 50), 1),
+            "p95_ms":  round(percentile(values, 95), 1),
+        }
+
+    def _over_slo_locked(self, model: str) -> bool:
+        values = list(self._samples.get(model) or [])
+        return len(values) >= self.min_samples and percentile(values, 95) > self.slo_ms
+
+    # ── ROUTING ───────────────────────────────────────────────────────────────
+
+    def route(self, preferred: str, needs_tools: bool = False,
+              supports_tools: Optional[Callable[[str], bool]] = None) -> str:
+        """Returns the model for this turn and logs why."""
+        alternative = self.small
+        now = time.time()
+        with self._lock:
+            slow = self._over_slo_locked(preferred)
+            p95 = percentile(list(self._samples.get(preferred) or []), 95)
+            n = len(self._samples.get(preferred) or [])
+            if not slow:
+                chosen, reason = preferred, "ok"
+            elif preferred != self.large:
+                # Only large degrades to small; small has nothing faster to go to
+                chosen, reason = preferred, f"slo: p95 {p95:.0f}ms, already the small model"
+            elif alternative == preferred or self._over_slo_locked(alternative):
+                chosen, reason = preferred, f"slo: p95 {p95:.0f}ms but no faster model"
+            elif now - self._last_probe.setdefault(preferred, now) >= self.probe_interval:
+                self._last_probe[preferred] = now
+                chosen, reason = preferred, f"probe: p95 {p95:.0f}ms > {self.slo_ms:.0f}ms"
+            else:
+                chosen, reason = alternative, f"slo: p95 {p95:.0f}ms > {self.slo_ms:.0f}ms"
+
+        if chosen != preferred and needs_tools and supports_tools is not None and not supports_tools(chosen):
+            chosen, reason = preferred, f"slo: p95 {p95:.0f}ms but {alternative} has no tools"
+
+        decision = {"ts": now, "preferred": preferred, "chosen": chosen, "reason": reason, "samples": n}
+        self.decisions.append(decision)
+        if chosen != preferred:
+            print(f"[NEON] Router: {preferred} p95 {p95 / 1000:.1f}s > SLO {self.slo_ms / 1000:.1f}s -> {chosen}")
+        self._audit(f"{preferred} -> {chosen} | {reason} | n={n}")
+        return chosen
+
+    def _audit(self, msg: str) -> None:
+        if not self.log_path:
+            return
+        try:
+            if os.path.exists(self.log_path) and os.path.getsize(self.log_path) >= self.log_max_bytes:
+                os.replace(self.log_path, self.log_path + ".1")
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(f"{time.ctime()} | [ROUTE] | {msg}\n")
+        except Exception as e:
+            print(f"[WARN] [LOGGING ERROR] Could not write to router log: {e}")
+            self.log_path = None   # don't retry on every turn
+
+
+# One router per process: latency is a property of the shared Ollama server
+_SHARED_ROUTER: Optional[ModelRouter] = None
+_SHARED_ROUTER_LOCK = threading.Lock()
+
+
+def get_shared_router(**kwargs) -> ModelRouter:
+    global _SHARED_ROUTER
+    if _SHARED_ROUTER is None:
+        with _SHARED_ROUTER_LOCK:
+            if _SHARED_ROUTER is None:
+                _SHARED_ROUTER = ModelRouter(**kwargs)
+    return _SHARED_ROUTER
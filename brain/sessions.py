@@ -0,0 +1,228 @@
+"""
+Neon Session Manager — one brain per backend session, bounded memory.
+
+A single shared NeonBrain mixes every phone's history, emotion state and
+per-turn fields (_current_user_lower, _current_target, last_action).
+SessionManager keeps one lightweight brain per session id and shares the
+expensive, immutable parts between them:
+
+  - SystemController (tools), MemoryManager (persistent prefs/stats)
+  - the requests connection pool (and the async pool in brain/async_llm.py)
+  - the VADER analyzer (core/emotion.get_shared_analyzer)
+  - TOOLS / compiled regexes (module-level in brain/llm.py)
+
+Sessions are evicted LRU-first once NEON_MAX_SESSIONS is reached, and after
+NEON_SESSION_TTL seconds of inactivity. Pinned sessions are never evicted.
+
+A brain is built outside the manager lock (a placeholder entry holds its
+slot meanwhile), so a new session never stalls lookups for the others. One
+lock per session serializes its turns, sync and async alike: a chat() and
+an achat() on the same session id never run on one brain at once.
+
+Emotion (affection, grudge, mood) is per conversation: only pinned sessions
+wake up with the state persisted in the shared MemoryManager, every other
+session starts fresh, so one phone's grudge never carries into the next new
+session. Every turn still saves to that memory (stats, prefs, last state).
+
+Usage:
+    sessions = SessionManager(brain_cls=AsyncNeonBrain, pinned=("default",))
+    with sessions.turn(session_id) as brain:          # sync
+        reply = brain.chat(text)
+    async with sessions.aturn(session_id) as brain:   # async
+        reply = await brain.achat(text)
+"""
+
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager, asynccontextmanager
+from typing import Dict, Iterable
+
+try:
+    from brain.llm import NeonBrain, build_http_session
+    from brain.system_controller import SystemController
+except ImportError:
+    from llm import NeonBrain, build_http_session
+    from system_controller import SystemController
+
+from memory.memory import MemoryManager
+
+MAX_SESSIONS = int(os.getenv("NEON_MAX_SESSIONS", "64"))
+SESSION_TTL  = float(os.getenv("NEON_SESSION_TTL", "1800"))   # seconds idle
+
+
+class SessionManager:
+    def __init__(
+        self,
+        brain_cls=NeonBrain,
+        max_sessions: int = MAX_SESSIONS,
+        ttl_seconds: float = SESSION_TTL,
+        pinned: Iterable[str] = (),
+    ):
+        self.brain_cls    = brain_cls
+        self.max_sessions = max(1, int(max_sessions))
+        self.ttl_seconds  = float(ttl_seconds)
+        self.pinned       = set(pinned)
+
+        # Shared, created once
+        self.system       = SystemController(require_confirmation=False)
+        self.memory       = MemoryManager()
+        self.http_session = build_http_session()
+
+        self._sessions: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._checked_connection = False
+        self.evictions = 0
+
+    # ── LOOKUP ────────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _sid(session_id: str) -> str:
+        return (session_id or "default").strip() or "default"
+
+    @staticmethod
+    def _new_entry() -> Dict:
+        return {
+            "brain":     None,               # set once built (outside the manager lock)
+            "ready":     threading.Event(),
+            "error":     None,
+            "lock":      threading.Lock(),   # serializes every turn of one session, sync or async
+            "last_used": time.time(),
+        }
+
+    def _build(self, sid: str, entry: Dict, check_connection: bool) -> None:
+        try:
+            entry["brain"] = self.brain_cls(
+                system=self.system,
+                memory=self.memory,
+                http_session=self.http_session,
+                check_connection=check_connection,
+                restore_emotion=sid in self.pinned,
+            )
+        except Exception as e:
+            entry["error"] = e
+            with self._lock:
+                if self._sessions.get(sid) is entry:
+                    del self._sessions[sid]
+        finally:
+            entry["ready"].set()
+
+    def _entry(self, session_id: str) -> Dict:
+        sid = self._sid(session_id)
+        with self._lock:
+            self._evict_expired_locked()
+            entry = self._sessions.get(sid)
+            builder = entry is None
+            if builder:
+                self._evict_lru_locked()
+                entry = self._new_entry()
+                self._sessions[sid] = entry
+                # Only the very first brain pings Ollama
+                check_connection = not self._checked_connection
+                self._checked_connection = True
+            self._sessions.move_to_end(sid)
+            entry["last_used"] = time.time()
+        if builder:
+            self._build(sid, entry, check_connection)
+        else:
+            entry["ready"].wait()
+        if entry["error"] is not None:
+            raise entry["error"]
+        return entry
+
+    def _ready_entry(self, session_id: str):
+        """The entry if its brain is already built (no lock wait, no build)."""
+        sid = self._sid(session_id)
+        with self._lock:
+            entry = self._sessions.get(sid)
+            if entry is None or not entry["ready"].is_set() or entry["error"] is not None:
+                return None
+            self._sessions.move_to_end(sid)
+            entry["last_used"] = time.time()
+            return entry
+
+    def get(self, session_id: str = "default"):
+        """Returns the brain for a session, creating it on first use."""
+        return self._entry(session_id)["brain"]
+
+    # ── TURN SCOPES (one turn at a time per session) ──────────────────────────
+
+    @contextmanager
+    def turn(self, session_id: str = "default"):
+        entry = self._entry(session_id)
+        with entry["lock"]:
+            yield entry["brain"]
+        entry["last_used"] = time.time()
+
+    @asynccontextmanager
+    async def aturn(self, session_id: str = "default"):
+        # Building a brain blocks: do it off the event loop
+        entry = self._ready_entry(session_id) or await asyncio.to_thread(self._entry, session_id)
+        lock = entry["lock"]
+        # The same lock as turn(); polled so the loop never blocks on it and a
+        # cancelled waiter can't leave it held
+        while not lock.acquire(blocking=False):
+            await asyncio.sleep(0.01)
+        try:
+            yield entry["brain"]
+        finally:
+            lock.release()
+        entry["last_used"] = time.time()
+
+    # ── EVICTION ──────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _busy(entry: Dict) -> bool:
+        if not entry["ready"].is_set():
+            return True   # still being built
+        # A tool still running in the background has a result to deliver
+        runner = getattr(entry["brain"], "async_tools", None)
+        return entry["lock"].locked() or (runner is not None and bool(runner.pending()))
+
+    def _evict_expired_locked(self) -> None:
+        """TTL: drop idle sessions (oldest first, stop at the first fresh one)."""
+        now = time.time()
+        for sid in list(self._sessions.keys()):
+            entry = self._sessions[sid]
+            if sid in self.pinned:
+                continue
+            if now - entry["last_used"] <= self.ttl_seconds:
+                break
+            if self._busy(entry):
+                continue
+            del self._sessions[sid]
+            self.evictions += 1
+
+    def _evict_lru_locked(self) -> None:
+        """LRU: make room for one more session (busy and pinned ones are skipped)."""
+        while len(self._sessions) >= self.max_sessions:
+            victim = next(
+                (sid for sid, e in self._sessions.items()
+                 if sid not in self.pinned and not self._busy(e)),
+                None,
+            )
+            if victim is None:
+                break
+            del self._sessions[victim]
+            self.evictions += 1
+
+    def drop(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(self._sid(session_id), None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "sessions":     len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "ttl_seconds":  self.ttl_seconds,
+                "evictions":    self.evictions,
+            }
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return self._sid(session_id) in self._sessions
@@ -0,0 +1,126 @@
+"""
+Neon Single-Flight — one answer for a request and its retries.
+
+The mobile app retries on flaky networks, so the backend often sees the same
+prompt twice while the first copy is still being answered. Before, the retry
+queued behind the session lock and then either ran again (a command could
+execute twice) or hit the 3 s duplicate check and got "I heard you the first
+time" — a different answer from the one the first copy got.
+
+SingleFlight coalesces calls by key. The first caller (the leader) runs the
+work; identical calls that arrive while it is running wait for it and get the
+very same result (reply *and* action payload). A finished result is kept for
+NEON_SINGLEFLIGHT_GRACE_S seconds (the duplicate-check window) so a retry that
+lands just after the answer went out gets it again instead of the canned
+reply. Failures are never kept (nor results `keep` rejects): the next call
+runs fresh. neon_brain's `keep` rejects turns that ran a tool or returned an
+action, so only overlapping copies of a command share one execution — the
+same command sent again after it finished runs again.
+
+    flight = SingleFlight()
+    result = flight.do(("session", "open youtube", "mobile"), lambda: brain.chat(...))
+    result = await flight.ado(key, lambda: brain.achat(...))
+
+Sync and async callers share the same in-flight table. Disable with
+NEON_SINGLEFLIGHT=0.
+"""
+
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+SINGLEFLIGHT_ENABLED = os.getenv("NEON_SINGLEFLIGHT", "1").strip() != "0"
+SINGLEFLIGHT_GRACE_S = float(os.getenv("NEON_SINGLEFLIGHT_GRACE_S", "3"))
+
+
+def flight_key(session_id: str, prompt: str, target: str) -> Tuple[str, str, str]:
+    """Retries differ at most in case and spacing."""
+    return (session_id, " ".join((prompt or "").lower().split()), target or "auto")
+
+
+class _Call:
+    __slots__ = ("future", "done_at")
+
+    def __init__(self):
+        self.future: Future = Future()
+        self.done_at: Optional[float] = None
+
+
+class SingleFlight:
+    def __init__(self, grace_s: float = SINGLEFLIGHT_GRACE_S, keep: Optional[Callable[[Any], bool]] = None):
+        self.grace_s = max(0.0, float(grace_s))
+        self.keep    = keep or (lambda result: True)
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0    # joined a call still in flight
+        self.replayed = 0     # got a result finished within the grace window
+
+    # ── TABLE ─────────────────────────────────────────────────────────────────
+
+    def _join(self, key: Hashable) -> Tuple[_Call, bool]:
+        """(call, is_leader)"""
+        now = time.time()
+        with self._lock:
+            for stale in [k for k, c in self._calls.items()
+                          if c.done_at is not None and now - c.done_at > self.grace_s]:
+                del self._calls[stale]
+            call = self._calls.get(key)
+            if call is not None:
+                if call.done_at is None:
+                    self.coalesced += 1
+                else:
+                    self.replayed += 1
+                return call, False
+            call = self._calls[key] = _Call()
+            self.leaders += 1
+            return call, True
+
+    def _settle(self, key: Hashable, call: _Call, result: Any = None, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            if error is None and self.grace_s > 0 and self.keep(result):
+                call.done_at = time.time()
+            elif self._calls.get(key) is call:
+                del self._calls[key]
+        if error is None:
+            call.future.set_result(result)
+        else:
+            call.future.set_exception(error)
+
+    # ── CALLS ─────────────────────────────────────────────────────────────────
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        call, leader = self._join(key)
+        if not leader:
+            return call.future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self._settle(key, call, error=e)
+            raise
+        self._settle(key, call, result)
+        return result
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(call.future)
+        try:
+            result = await fn()
+        except BaseException as e:
+            self._settle(key, call, error=e)
+            raise
+        self._settle(key, call, result)
+        return result
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "leaders":   self.leaders,
+                "coalesced": self.coalesced,
+                "replayed":  self.replayed,
+                "in_flight": sum(1 for c in self._calls.values() if c.done_at is None),
+            }
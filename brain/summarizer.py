@@ -0,0 +1,177 @@
+"""
+Neon Rolling Summarizer — old turns become a short running summary.
+
+A chat turn only sends the last HISTORY_WINDOW (10) messages, a technical
+turn the last 6, so anything older used to be invisible to the model.
+_trim_history() now hands every message to a RollingSummarizer as soon as
+it falls out of the window the turn actually sent, and
+the summarizer folds them into `summary` with the small model on a
+background thread:
+
+    previous summary + evicted turns  →  SMALL  →  new summary (≤ ~120 words)
+
+The brain appends the summary to the system prompt, so a long session keeps
+names, preferences and open tasks without replaying raw turns. The summary
+only changes once per batch (NEON_SUMMARY_BATCH evicted messages), so the
+prompt prefix stays cacheable in between.
+
+Nothing here ever blocks a turn: add() only queues, and a failed request
+puts the turns back in the queue for the next attempt (the oldest are
+dropped past four batches so a dead server can't grow the queue forever).
+A fold takes the whole queue under the lock, so turns added while it runs
+are never lost or folded twice.
+
+One summarizer per brain — the summary belongs to one conversation.
+Disable with NEON_SUMMARY=0.
+"""
+
+import os
+import time
+import threading
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+SUMMARY_ENABLED     = os.getenv("NEON_SUMMARY", "1").strip() != "0"
+SUMMARY_BATCH       = int(os.getenv("NEON_SUMMARY_BATCH", "4"))     # messages per fold
+SUMMARY_MAX_CHARS   = 800
+SUMMARY_TIMEOUT     = 60
+SUMMARY_TURN_CHARS  = 600   # each evicted message is clipped to this
+
+_SUMMARY_INSTRUCTIONS = (
+    "You keep a running summary of a conversation between Boss (the user) and Neon "
+    "(the assistant). Merge the new messages into the summary. Keep names, facts about "
+    "Boss, preferences, decisions and unfinished tasks; drop greetings and small talk. "
+    "Write at most 120 words in plain third person. Reply with the summary only."
+)
+
+
+class RollingSummarizer:
+    def __init__(
+        self,
+        session: requests.Session,
+        chat_url: str,
+        model: str,
+        keep_alive="30m",
+        options: Optional[Callable[[], Dict]] = None,
+        batch: int = SUMMARY_BATCH,
+    ):
+        self.session    = session
+        self.chat_url   = chat_url
+        self.model      = model
+        self.keep_alive = keep_alive
+        self.options    = options or (lambda: {})
+        self.batch      = max(1, int(batch))
+
+        self.summary: str = ""
+        self._pending: List[Dict] = []
+        self._lock = threading.Lock()
+        self._running = False
+        self._generation = 0          # bumped by clear() so stale results are dropped
+        self.folds = 0
+        self.failures = 0
+        self.last_fold_ms: Optional[float] = None
+
+    # ── QUEUE ─────────────────────────────────────────────────────────────────
+
+    def add(self, messages: List[Dict]) -> None:
+        """Queue evicted messages; a fold starts in the background once a batch is ready."""
+        messages = [m for m in messages if m.get("role") in ("user", "assistant") and m.get("content")]
+        if not messages:
+            return
+        with self._lock:
+            self._pending.extend(messages)
+            if len(self._pending) > 4 * self.batch:
+                self._pending = self._pending[-4 * self.batch:]
+            if self._running or len(self._pending) < self.batch:
+                return
+            self._running = True
+        threading.Thread(target=self._run, name="neon-summarizer", daemon=True).start()
+
+    def clear(self) -> None:
+        with self._lock:
+            self.summary = ""
+            self._pending = []
+            self._generation += 1
+
+    def wait(self, timeout: float = 5.0) -> bool:
+        """Blocks until no fold is running (tests / shutdown only)."""
+        end = time.time() + timeout
+        while time.time() < end:
+            with self._lock:
+                if not self._running:
+                    return True
+            time.sleep(0.01)
+        return False
+
+    # ── FOLD ──────────────────────────────────────────────────────────────────
+
+    def _run(self) -> None:
+        try:
+            while True:
+                with self._lock:
+                    if len(self._pending) < self.batch:
+                        return
+                    # Take the queue; add() keeps appending to the fresh list
+                    batch, self._pending = self._pending, []
+                    previous, generation = self.summary, self._generation
+                updated = self._fold(previous, batch)
+                with self._lock:
+                    if generation != self._generation:
+                        return   # cleared while folding
+                    if updated is None:
+                        self.failures += 1
+                        self._pending = (batch + self._pending)[-4 * self.batch:]
+                        return
+                    self.summary = updated
+                    self.folds += 1
+        finally:
+            with self._lock:
+                self._running = False
+
+    def _fold(self, previous: str, messages: List[Dict]) -> Optional[str]:
+        lines = []
+        for m in messages:
+            speaker = "Boss" if m["role"] == "user" else "Neon"
+            text = " ".join(m["content"].split())
+            if len(text) > SUMMARY_TURN_CHARS:
+                text = text[:SUMMARY_TURN_CHARS] + "…"
+            lines.append(f"{speaker}: {text}")
+        prompt = (
+            f"Current summary:\n{previous or '(empty)'}\n\n"
+            "New messages:\n" + "\n".join(lines)
+        )
+        payload = {
+            "model":      self.model,
+            "messages":   [
+                {"role": "system", "content": _SUMMARY_INSTRUCTIONS},
+                {"role": "user",   "content": prompt},
+            ],
+            "stream":     False,
+            "keep_alive": self.keep_alive,
+            "options":    {**self.options(), "temperature": 0.2, "num_predict": 200},
+        }
+        t0 = time.time()
+        try:
+            resp = self.session.post(self.chat_url, json=payload, timeout=SUMMARY_TIMEOUT)
+            resp.raise_for_status()
+            text = ((resp.json() or {}).get("message") or {}).get("content") or ""
+        except Exception as e:
+            if self.failures == 0:
+                print(f"[WARN] [NEON] Summary update failed: {e}")
+            return None
+        text = " ".join(text.split())
+        if not text:
+            return None
+        self.last_fold_ms = round((time.time() - t0) * 1000, 1)
+        return text[:SUMMARY_MAX_CHARS]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "summary_chars": len(self.summary),
+                "pending":       len(self._pending),
+                "folds":         self.folds,
+                "failures":      self.failures,
+                "last_fold_ms":  self.last_fold_ms,
+            }
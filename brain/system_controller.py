@@ -12,6 +12,9 @@ import requests
 
 # 🚀 Import your new Smart App Opener
 from brain.smart_open_app import open_app as smart_launcher 
+from brain.tool_registry import build_tool_registry
+from brain.youtube_cache import get_shared_youtube_cache, YT_CACHE_ENABLED
+from brain.yt_resolver import get_shared_yt_resolver
 
 # Selenium & Webdriver Manager imports
 try:
@@ -30,6 +33,59 @@ except ImportError:
     By = Keys = Options = Service = ChromeDriverManager = WebDriverWait = EC = None
     _SELENIUM_OK = False
 
+
+def _yt_dlp_first_video_id(search_query: str) -> str | None:
+    """
+    Returns the videoId of the top YouTube search result
+    if yt-dlp is installed, otherwise None.
+    """
+    if not search_query:
+        return None
+    if shutil.which("yt-dlp") is None:
+        return None
+    try:
+        # ytsearch1: returns the first result id without scraping ourselves
+        completed = subprocess.run(
+            ["yt-dlp", "--get-id", f"ytsearch1:{search_query}"],
+            capture_output=True,
+            text=True,
+            timeout=15,
+        )
+        video_id = (completed.stdout or "").strip().splitlines()[0].strip() if completed.returncode == 0 else ""
+        return video_id or None
+    except Exception:
+        return None
+
+
+def _youtube_html_first_video_id(search_query: str) -> str | None:
+    """
+    Lightweight fallback: fetch YouTube search HTML and extract the first videoId.
+    This avoids extra dependencies, and works on most networks.
+    """
+    if not search_query:
+        return None
+    try:
+        url = "https://www.youtube.com/results?search_query=" + quote_plus(search_query)
+        r = requests.get(
+            url,
+            timeout=10,
+            headers={
+                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                              "AppleWebKit/537.36 (KHTML, like Gecko) "
+                              "Chrome/122.0.0.0 Safari/537.36",
+                "Accept-Language": "en-US,en;q=0.9",
+            },
+        )
+        if r.status_code != 200:
+            return None
+
+        # YouTube embeds JSON blobs containing "videoId":"<id>"
+        m = re.search(r'"videoId":"([a-zA-Z0-9_-]{11})"', r.text)
+        return m.group(1) if m else None
+    except Exception:
+        return None
+
+
 class SystemController:
     # 1️⃣ Risk Classification Map
     RISK_LEVELS = {
@@ -58,6 +114,20 @@ class SystemController:
         
         # 2️⃣ WhatsApp Session Optimization (Persistent Driver)
         self.driver = None 
+
+        # Tool dispatch table, built once (see brain/tool_registry.py)
+        self.headless = os.getenv("NEON_HEADLESS", "0").strip() == "1"
+        self.tool_registry = build_tool_registry(self)
+
+        # YouTube top-result lookup for play_music: tried in order behind a
+        # persistent query → videoId cache (see brain/youtube_cache.py).
+        # A warm in-process yt-dlp (brain/yt_resolver.py) when the library is
+        # importable, the yt-dlp subprocess otherwise.
+        self.youtube_resolvers = [
+            get_shared_yt_resolver() or _yt_dlp_first_video_id,
+            _youtube_html_first_video_id,
+        ]
+        self.youtube_cache = get_shared_youtube_cache() if YT_CACHE_ENABLED else None
         
         self._log("SYSTEM_START", f"Controller initialized. Safe root: {self.safe_root}")
         try:
@@ -269,6 +339,15 @@ class SystemController:
             return resp
         return {"status": "error", "message": "Search query was empty.", "risk": self.RISK_LEVELS[action]}
 
+    def _youtube_top_video_id(self, search_query: str) -> str | None:
+        if self.youtube_cache is not None:
+            return self.youtube_cache.resolve(search_query, self.youtube_resolvers)
+        for resolver in self.youtube_resolvers:
+            video_id = resolver(search_query)
+            if video_id:
+                return video_id
+        return None
+
     def play_music(self, query: str = "", platform: str = "spotify", autoplay: bool = True, target: str = "auto") -> dict:
         action = "play_music"
         self._log(action, f"Query: '{query}' | Platform: {platform} | Autoplay: {autoplay} | Target: {target}")
@@ -287,82 +366,15 @@ class SystemController:
                 "risk": self.RISK_LEVELS[action],
             }
 
-        def _yt_dlp_first_watch_url(search_query: str) -> str | None:
-            """
-            Returns a https://www.youtube.com/watch?v=... URL for the top search result
-            if yt-dlp is installed, otherwise None.
-            """
-            if not search_query:
-                return None
-            if shutil.which("yt-dlp") is None:
-                return None
-            try:
-                # ytsearch1: returns the first result id without scraping ourselves
-                completed = subprocess.run(
-                    ["yt-dlp", "--get-id", f"ytsearch1:{search_query}"],
-                    capture_output=True,
-                    text=True,
-                    timeout=15,
-                )
-                video_id = (completed.stdout or "").strip().splitlines()[0].strip() if completed.returncode == 0 else ""
-                if not video_id:
-                    return None
-                return f"https://www.youtube.com/watch?v={video_id}&autoplay=1"
-            except Exception:
-                return None
-
-        def _youtube_first_watch_url(search_query: str) -> str | None:
-            """
-            Lightweight fallback: fetch YouTube search HTML and extract the first videoId.
-            This avoids extra dependencies, and works on most networks.
-            """
-            if not search_query:
-                return None
-            try:
-                url = "https://www.youtube.com/results?search_query=" + quote_plus(search_query)
-                r = requests.get(
-                    url,
-                    timeout=10,
-                    headers={
-                        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                                      "AppleWebKit/537.36 (KHTML, like Gecko) "
-                                      "Chrome/122.0.0.0 Safari/537.36",
-                        "Accept-Language": "en-US,en;q=0.9",
-                    },
-                )
-                if r.status_code != 200:
-                    return None
-
-                # YouTube embeds JSON blobs containing "videoId":"<id>"
-                m = re.search(r'"videoId":"([a-zA-Z0-9_-]{11})"', r.text)
-                if not m:
-                    return None
-                video_id = m.group(1)
-                return f"https://www.youtube.com/watch?v={video_id}&autoplay=1"
-            except Exception:
-                return None
-
         # If no query, just open the platform home.
         if platform in {"youtube", "yt", "youtube music", "youtubemusic"}:
             if q:
                 # If possible, resolve and open the TOP result directly.
                 if autoplay:
-                    top_url = _yt_dlp_first_watch_url(q)
-                    if top_url:
-                        resp = {
-                            "status": "success",
-                            "message": f"Playing top YouTube result for '{q}'.",
-                            "risk": self.RISK_LEVELS[action],
-                        }
-                        if headless or mobile_target:
-                            resp["action"] = {"type": "open_url", "url": top_url}
-                        else:
-                            webbrowser.open(top_url)
-                        return resp
-
-                    # No yt-dlp: try simple HTML extraction.
-                    top_url = _youtube_first_watch_url(q)
-                    if top_url:
+                    # Cached, else yt-dlp, else simple HTML extraction
+                    video_id = self._youtube_top_video_id(q)
+                    if video_id:
+                        top_url = f"https://www.youtube.com/watch?v={video_id}&autoplay=1"
                         resp = {
                             "status": "success",
                             "message": f"Playing top YouTube result for '{q}'.",
@@ -422,7 +434,7 @@ class SystemController:
                 return {"ok": False, "error": str(e)}
 
         # Ollama
-        ollama = _check("ollama", "http://localhost:11434/api/tags", timeout=1.5)
+        ollama = _check("ollama", os.getenv("NEON_OLLAMA_URL", "http://localhost:11434").rstrip("/") + "/api/tags", timeout=1.5)
 
         # TTS (GPT-SoVITS) — no universal health endpoint; try docs and root.
         tts_docs = _check("tts_docs", "http://127.0.0.1:9880/docs", timeout=1.5)
@@ -0,0 +1,165 @@
+"""
+Neon Token Budget — approximate token counts, history trimming, num_ctx sizing.
+
+The old request shape was fixed: last 6/10 history messages whatever their
+length, num_ctx 3072, num_predict 256. One pasted log could overflow the
+window (Ollama silently drops the oldest tokens — usually the system prompt),
+while a "hi" still made Ollama hold a 3k KV cache.
+
+Token counts are estimated from characters (no tokenizer dependency): about
+3.5 chars per token for English/code, rounded up, plus a few tokens of chat
+template per message. Counts are memoized per message text, so history
+entries are only measured once.
+
+num_ctx is picked from power-of-two buckets between NEON_NUM_CTX_MIN and
+NEON_NUM_CTX_MAX (capped by the model's own context length). A different
+num_ctx makes Ollama reload the model, so ContextSizer keeps a model at its
+current bucket: it grows as soon as a prompt needs more, and only shrinks
+after NEON_NUM_CTX_SHRINK_AFTER turns in a row that would fit a smaller one.
+
+One sizer per process is shared by every brain (get_shared_sizer) — the
+loaded model, and therefore its num_ctx, is a property of the Ollama server.
+"""
+
+import os
+import json
+import math
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+CHARS_PER_TOKEN  = 3.5
+MESSAGE_OVERHEAD = 4      # role markers / template tokens per chat message
+
+NUM_CTX_MIN      = int(os.getenv("NEON_NUM_CTX_MIN", "2048"))
+NUM_CTX_MAX      = int(os.getenv("NEON_NUM_CTX_MAX", "8192"))
+NUM_PREDICT      = int(os.getenv("NEON_NUM_PREDICT", "256"))
+NUM_PREDICT_MIN  = 64
+HISTORY_TOKENS   = int(os.getenv("NEON_HISTORY_TOKENS", "1536"))
+CTX_SHRINK_AFTER = int(os.getenv("NEON_NUM_CTX_SHRINK_AFTER", "20"))
+
+
+# ── COUNTING ─────────────────────────────────────────────────────────────────
+
+@lru_cache(maxsize=2048)
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def message_tokens(message: Dict) -> int:
+    tokens = MESSAGE_OVERHEAD + estimate_tokens(message.get("content") or "")
+    if message.get("tool_calls"):
+        tokens += estimate_tokens(json.dumps(message["tool_calls"], sort_keys=True))
+    return tokens
+
+
+def messages_tokens(messages: List[Dict]) -> int:
+    return sum(message_tokens(m) for m in messages or [])
+
+
+def tools_tokens(tools: Optional[List[Dict]]) -> int:
+    """Tool schemas are rendered into the prompt by the chat template."""
+    if not tools:
+        return 0
+    return _tools_tokens_cached(json.dumps(tools, sort_keys=True))
+
+
+@lru_cache(maxsize=16)
+def _tools_tokens_cached(raw: str) -> int:
+    return estimate_tokens(raw)
+
+
+# ── HISTORY ──────────────────────────────────────────────────────────────────
+
+def fit_history(history: List[Dict], budget: int) -> List[Dict]:
+    """
+    Newest messages that fit in `budget` tokens, oldest first. Stops at the
+    first message that doesn't fit (no gaps in the conversation) and never
+    starts on an assistant reply whose question was dropped.
+    """
+    kept: List[Dict] = []
+    used = 0
+    for message in reversed(history):
+        cost = message_tokens(message)
+        if used + cost > budget:
+            break
+        kept.append(message)
+        used += cost
+    kept.reverse()
+    while kept and kept[0].get("role") == "assistant":
+        kept.pop(0)
+    return kept
+
+
+# ── CONTEXT SIZE ─────────────────────────────────────────────────────────────
+
+def ctx_bucket(tokens: int, floor: int = NUM_CTX_MIN, ceiling: int = NUM_CTX_MAX) -> int:
+    """Smallest power-of-two multiple of `floor` that holds `tokens`, capped at `ceiling`."""
+    size = max(1, floor)
+    while size < tokens and size < ceiling:
+        size *= 2
+    return min(size, ceiling)
+
+
+def num_predict_for(prompt_tokens: int, num_ctx: int, wanted: int = NUM_PREDICT) -> int:
+    """Generation budget that still fits next to the prompt."""
+    return max(NUM_PREDICT_MIN, min(wanted, num_ctx - prompt_tokens))
+
+
+class ContextSizer:
+    def __init__(self, floor: int = NUM_CTX_MIN, ceiling: int = NUM_CTX_MAX,
+                 shrink_after: int = CTX_SHRINK_AFTER):
+        self.floor        = max(256, int(floor))
+        self.ceiling      = max(self.floor, int(ceiling))
+        self.shrink_after = max(1, int(shrink_after))
+
+        self._current: Dict[str, int] = {}
+        self._small_streak: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.reloads = 0   # bucket changes after the first turn (each costs Ollama a reload)
+
+    def num_ctx(self, model: str, needed_tokens: int, model_limit: Optional[int] = None) -> int:
+        """num_ctx for a request on `model` that needs `needed_tokens` (prompt + generation)."""
+        ceiling = min(self.ceiling, model_limit) if model_limit else self.ceiling
+        wanted = ctx_bucket(needed_tokens, self.floor, max(self.floor, ceiling))
+        with self._lock:
+            current = self._current.get(model, self.floor)
+            if wanted > current or current > ceiling:
+                chosen = wanted
+                self._small_streak[model] = 0
+            elif wanted < current:
+                streak = self._small_streak.get(model, 0) + 1
+                self._small_streak[model] = streak
+                chosen = wanted if streak >= self.shrink_after else current
+            else:
+                self._small_streak[model] = 0
+                chosen = current
+            if chosen != current:
+                self.reloads += 1
+                self._small_streak[model] = 0
+            self._current[model] = chosen
+        return chosen
+
+    def current(self, model: str) -> int:
+        with self._lock:
+            return self._current.get(model, self.floor)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {"num_ctx": dict(self._current), "reloads": self.reloads}
+
+
+# One sizer per process: the loaded model's num_ctx is server-side state
+_SHARED_SIZER: Optional[ContextSizer] = None
+_SHARED_SIZER_LOCK = threading.Lock()
+
+
+def get_shared_sizer(**kwargs) -> ContextSizer:
+    global _SHARED_SIZER
+    if _SHARED_SIZER is None:
+        with _SHARED_SIZER_LOCK:
+            if _SHARED_SIZER is None:
+                _SHARED_SIZER = ContextSizer(**kwargs)
+    return _SHARED_SIZER
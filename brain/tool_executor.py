@@ -0,0 +1,69 @@
+"""
+Neon Tool Executor — independent tool calls of one turn run side by side.
+
+"open spotify and search google for lo-fi" comes back from the model as two
+tool_calls; run one after the other the turn pays the sum of their latencies.
+run_tool_calls() runs them in a bounded thread pool (NEON_TOOL_WORKERS) and
+hands the results back in call order, so the `context` tool messages and
+flavor_multi_results read exactly as before.
+
+What stays serial:
+  - high-risk tools (power_control, delete_file, send_whatsapp_message) and
+    unknown tools are barriers: everything before them finishes first, they
+    run alone, and only then does the rest start
+  - calls in the same conflict group (ToolSpec.group — the device-state
+    tools volume / brightness / power / lock / connectivity / screenshot
+    share one, any other tool conflicts with itself) run in call order, one
+    at a time
+
+A turn with a single call (or nothing that can overlap) never touches the pool.
+Disable with NEON_TOOL_WORKERS=1.
+"""
+
+import os
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+TOOL_WORKERS = int(os.getenv("NEON_TOOL_WORKERS", "4"))
+
+
+def _serial(spec: Any) -> bool:
+    return spec is None or getattr(spec, "risk", "low") == "high"
+
+
+def _after(dependency: Optional[Future], call: Callable[[], Any]) -> Any:
+    if dependency is not None:
+        wait([dependency])
+    return call()
+
+
+def run_tool_calls(calls: List[Tuple[Any, Callable[[], Any]]], max_workers: int = TOOL_WORKERS) -> List[Any]:
+    """
+    calls: (ToolSpec or None, zero-arg callable) per tool call, in call order.
+    The callables must not raise (the brain turns tool errors into text).
+    Returns their results in the same order.
+    """
+    overlapping = [spec for spec, _ in calls if not _serial(spec)]
+    if max_workers <= 1 or len(overlapping) < 2:
+        return [call() for _, call in calls]
+
+    results: List[Any] = [None] * len(calls)
+    futures: Dict[int, Future] = {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(overlapping)),
+                            thread_name_prefix="neon-tool") as pool:
+        pending: List[Future] = []
+        last_in_group: Dict[str, Future] = {}
+        for i, (spec, call) in enumerate(calls):
+            if _serial(spec):
+                wait(pending)
+                pending, last_in_group = [], {}
+                results[i] = call()
+                continue
+            # Submitted in call order, so a dependency is always picked up first
+            future = pool.submit(_after, last_in_group.get(spec.group), call)
+            last_in_group[spec.group] = future
+            pending.append(future)
+            futures[i] = future
+    for i, future in futures.items():
+        results[i] = future.result()
+    return results
@@ -0,0 +1,145 @@
+"""
+Neon Tool Registry — tool dispatch precompiled once per SystemController.
+
+_execute_tool_calls used to do, for every tool call: getattr() on the
+controller, inspect.signature(), build the allowed-parameter set, then read
+prefs and os.getenv("NEON_HEADLESS") again for each target rule. None of that
+changes while the process runs, so SystemController builds a ToolSpec per tool
+at init and dispatch becomes a dict lookup plus a validated call:
+
+    spec = system.tool_registry["volume_control"]
+    args = spec.prepare({"action": "set", "level": "40"}, target="mobile")
+    # {"action": "set", "level": 40}
+    result = spec.func(**args)
+
+Each spec holds:
+  func       the bound controller method
+  params     accepted argument names → coercer from the annotation
+             (int for volume / brightness levels, bool for autoplay, str);
+             a value that can't be coerced is dropped so the default applies
+  risk       SystemController.RISK_LEVELS entry
+  target     target-resolution policy: "device" tools (open / search / play)
+             get the resolved target, forced to mobile when headless unless
+             the user asked for the desktop; "none" leaves args alone
+  group      conflict group for brain/tool_executor.py: calls in the same
+             group never run at the same time
+
+Only the tools in RISK_LEVELS are registered, so the model can no longer
+reach arbitrary controller methods (close_whatsapp_session, _log) by name.
+"""
+
+import inspect
+from typing import Any, Callable, Dict, Optional
+
+# Tools whose `target` argument is a device (mobile / desktop)
+DEVICE_TARGET_TOOLS = frozenset({"open_app", "search_google", "search_youtube", "play_music"})
+
+# Tools that change the same machine state; any other tool only conflicts with itself
+CONFLICT_GROUPS: Dict[str, str] = {
+    "volume_control":      "device",
+    "brightness_control":  "device",
+    "power_control":       "device",
+    "lock_screen":         "device",
+    "toggle_connectivity": "device",
+    "take_screenshot":     "device",
+}
+
+_TRUE  = frozenset({"true", "yes", "1", "on"})
+_FALSE = frozenset({"false", "no", "0", "off"})
+_DROP  = object()
+
+
+def _to_int(value: Any) -> Any:
+    if value is None:
+        return _DROP
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        try:
+            return int(float(value))
+        except (TypeError, ValueError):
+            return _DROP
+
+
+def _to_bool(value: Any) -> Any:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return bool(value)
+    text = str(value).strip().lower()
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    return _DROP
+
+
+def _to_str(value: Any) -> Any:
+    if value is None:
+        return _DROP
+    return value if isinstance(value, str) else str(value)
+
+
+def _keep(value: Any) -> Any:
+    return value
+
+
+_COERCERS: Dict[Any, Callable[[Any], Any]] = {
+    int: _to_int, "int": _to_int,
+    bool: _to_bool, "bool": _to_bool,
+    str: _to_str, "str": _to_str,
+}
+
+
+class ToolSpec:
+    __slots__ = ("name", "func", "params", "accepts_kwargs", "risk", "target", "group")
+
+    def __init__(self, name: str, func: Callable, risk: str = "low", target: str = "none"):
+        self.name   = name
+        self.func   = func
+        self.risk   = risk
+        self.target = target
+        self.group  = CONFLICT_GROUPS.get(name, name)
+
+        params = inspect.signature(func).parameters.values()
+        self.accepts_kwargs = any(p.kind == inspect.Parameter.VAR_KEYWORD for p in params)
+        self.params: Dict[str, Callable[[Any], Any]] = {
+            p.name: _COERCERS.get(p.annotation, _keep)
+            for p in params
+            if p.kind in (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY)
+        }
+
+    def prepare(self, args: Dict, target: str = "auto", headless: bool = False) -> Dict:
+        """Target policy, then only known params, each coerced to its annotated type."""
+        if self.target == "device":
+            if "target" not in args:
+                args["target"] = target
+            if headless and target != "desktop" and args.get("target") in {"auto", "desktop", None}:
+                args["target"] = "mobile"
+        if self.accepts_kwargs:
+            return dict(args)
+        prepared = {}
+        for key, value in args.items():
+            coerce = self.params.get(key)
+            if coerce is None:
+                continue
+            value = coerce(value)
+            if value is not _DROP:
+                prepared[key] = value
+        return prepared
+
+
+def build_tool_registry(controller: Any, names=None) -> Dict[str, ToolSpec]:
+    """One ToolSpec per tool name (default: the controller's RISK_LEVELS)."""
+    risk_levels: Dict[str, str] = getattr(controller, "RISK_LEVELS", {}) or {}
+    registry: Dict[str, ToolSpec] = {}
+    for name in (names if names is not None else risk_levels):
+        func: Optional[Callable] = getattr(controller, name, None)
+        if not callable(func):
+            continue
+        registry[name] = ToolSpec(
+            name, func,
+            risk=risk_levels.get(name, "low"),
+            target="device" if name in DEVICE_TARGET_TOOLS else "none",
+        )
+    return registry
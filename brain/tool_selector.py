@@ -0,0 +1,150 @@
+"""
+Neon Tool Selector — send only the tool schemas a command turn can use.
+
+All 15 TOOLS schemas are ~7 KB of JSON (~2k tokens) that the model has to
+prompt-eval on every command turn, even for "mute". ToolSelector scores each
+tool against the user input and keeps the best few:
+
+  +3  per _COMMAND_RE hit that maps to the tool ("mute" → volume_control)
+  +1  per input word found in the tool's own examples (the quoted phrases in
+      its description, e.g. 'dim the screen') or name
+  +0…0.5  how often Boss has used the tool (MemoryManager command_stats),
+      a tie-breaker only
+
+Tools that score on the input are ranked and the top NEON_TOOL_TOP_K are sent,
+always together with a safe fallback set (open_app + search_google, which the
+tool rules point the model at when nothing else fits). Order follows TOOLS so
+the same selection renders the same prompt.
+
+Disable with NEON_TOOL_PRUNING=0 (every schema is sent, as before).
+"""
+
+import os
+import re
+import math
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Pattern
+
+TOOL_PRUNING_ENABLED = os.getenv("NEON_TOOL_PRUNING", "1").strip() != "0"
+TOOL_TOP_K           = int(os.getenv("NEON_TOOL_TOP_K", "4"))
+FALLBACK_TOOLS       = ("open_app", "search_google")
+
+# _COMMAND_RE keyword → tools it asks for
+COMMAND_WORD_TOOLS: Dict[str, tuple] = {
+    "open": ("open_app",), "launch": ("open_app",), "start": ("open_app",),
+    "run": ("open_app",), "execute": ("open_app",),
+    "delete": ("delete_file",), "remove": ("delete_file",),
+    "create": ("create_file",), "make": ("create_file",),
+    "send": ("send_whatsapp_message",),
+    "search": ("search_google", "search_youtube"), "find": ("search_google",),
+    "lookup": ("search_google",),
+    "play": ("play_music", "search_youtube"),
+    "status": ("system_status",), "check": ("system_status",), "system": ("system_status",),
+    "cpu": ("system_status",), "ram": ("system_status",), "memory": ("system_status",),
+    "disk": ("system_status",), "gpu": ("system_status",), "battery": ("system_status",),
+    "uptime": ("system_status",),
+    "personality": ("set_personality",), "mode": ("set_personality",),
+    "volume": ("volume_control",), "mute": ("volume_control",), "unmute": ("volume_control",),
+    "loud": ("volume_control",), "quiet": ("volume_control",),
+    "brightness": ("brightness_control",), "bright": ("brightness_control",), "dim": ("brightness_control",),
+    "screenshot": ("take_screenshot",),
+    "lock": ("lock_screen",),
+    "shutdown": ("power_control",), "shut down": ("power_control",), "restart": ("power_control",),
+    "reboot": ("power_control",), "sleep": ("power_control",), "hibernate": ("power_control",),
+    "wifi": ("toggle_connectivity",), "bluetooth": ("toggle_connectivity",),
+    "connect": ("toggle_connectivity",),
+    "turn off": ("toggle_connectivity",), "turn on": ("toggle_connectivity",),
+}
+
+_WORD_RE    = re.compile(r"[a-z0-9]+")
+_EXAMPLE_RE = re.compile(r"(?<!\w)'([^']+)'(?!\w)")   # 'quoted example', not Neon's
+_STOPWORDS  = frozenset({
+    "the", "a", "an", "to", "my", "me", "it", "of", "for", "on", "in", "and", "or",
+    "up", "be", "is", "this", "that", "say", "says", "boss", "set", "more", "new",
+    "how", "what", "when", "use", "like", "things", "called",
+})
+
+
+def _words(text: str) -> List[str]:
+    return [w for w in _WORD_RE.findall((text or "").lower()) if len(w) > 1 and w not in _STOPWORDS]
+
+
+class ToolSelector:
+    def __init__(self, tools: List[Dict], command_re: Optional[Pattern] = None,
+                 top_k: int = TOOL_TOP_K, fallback: Iterable[str] = FALLBACK_TOOLS):
+        self.tools      = list(tools)
+        self.command_re = command_re
+        self.top_k      = max(1, int(top_k))
+        self.names      = [t["function"]["name"] for t in self.tools]
+        self.fallback   = [n for n in fallback if n in self.names]
+
+        # Example words per tool; words shared by many tools ("open", "file")
+        # don't tell them apart and are dropped
+        raw: Dict[str, set] = {}
+        for tool in self.tools:
+            fn = tool["function"]
+            examples = " ".join(_EXAMPLE_RE.findall(fn.get("description") or ""))
+            raw[fn["name"]] = set(_words(examples)) | set(_words(fn["name"].replace("_", " ")))
+        df = Counter(w for words in raw.values() for w in words)
+        self._keywords = {name: {w for w in words if df[w] <= 2} for name, words in raw.items()}
+
+        self._lock = threading.Lock()
+        self.turns = 0
+        self.tools_sent = 0
+
+    def scores(self, text: str, command_stats: Optional[Dict] = None) -> Dict[str, float]:
+        lower = (text or "").lower()
+        scores: Dict[str, float] = {name: 0.0 for name in self.names}
+        if self.command_re is not None:
+            for match in self.command_re.finditer(lower):
+                for name in COMMAND_WORD_TOOLS.get(" ".join(match.group(0).lower().split()), ()):
+                    if name in scores:
+                        scores[name] += 3.0
+        words = set(_words(lower))
+        for name, keywords in self._keywords.items():
+            scores[name] += len(words & keywords)
+
+        counts = {}
+        for name, entry in (command_stats or {}).items():
+            if isinstance(entry, dict):
+                counts[name] = entry.get("count", 0) or 0
+        top = max(counts.values(), default=0)
+        if top > 0:
+            for name, count in counts.items():
+                if name in scores and scores[name] > 0:
+                    scores[name] += 0.5 * math.log1p(count) / math.log1p(top)
+        return scores
+
+    def select(self, text: str, command_stats: Optional[Dict] = None) -> List[Dict]:
+        """Top-k matching tools + the fallback set, in TOOLS order."""
+        scores = self.scores(text, command_stats)
+        ranked = sorted((n for n in self.names if scores[n] > 0), key=lambda n: -scores[n])
+        keep = set(ranked[:self.top_k]) | set(self.fallback)
+        selected = [t for t in self.tools if t["function"]["name"] in keep]
+        with self._lock:
+            self.turns += 1
+            self.tools_sent += len(selected)
+        return selected
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "turns":          self.turns,
+                "avg_tools_sent": round(self.tools_sent / self.turns, 2) if self.turns else 0.0,
+                "tools_total":    len(self.tools),
+            }
+
+
+# One selector per process: the tool list is a module constant
+_SHARED_SELECTOR: Optional[ToolSelector] = None
+_SHARED_SELECTOR_LOCK = threading.Lock()
+
+
+def get_shared_selector(**kwargs) -> ToolSelector:
+    global _SHARED_SELECTOR
+    if _SHARED_SELECTOR is None:
+        with _SHARED_SELECTOR_LOCK:
+            if _SHARED_SELECTOR is None:
+                _SHARED_SELECTOR = ToolSelector(**kwargs)
+    return _SHARED_SELECTOR
@@ -0,0 +1,193 @@
+"""
+Neon Tracing — where did this turn's time go?
+
+Each chat turn gets a TurnTrace: named spans around every stage (duplicate
+check, intent detection, emotion, prompt build, HTTP, each tool call,
+flavoring, postprocess, memory save) plus the durations Ollama reported for
+the request (load / prompt_eval / eval / total, as "ollama.*" spans).
+
+    brain.last_trace
+    {"outcome": "llm", "total_ms": 812.4, "model": "llama3.2:3b",
+     "spans": [{"name": "intent", "start_ms": 0.1, "ms": 0.2}, ...],
+     "ollama": {"load_ms": 0.0, "prompt_eval_ms": 95.0, ...}}
+
+Finished traces feed process-wide rolling histograms (the last
+NEON_TRACE_WINDOW samples per span name), so brain.trace_stats() shows
+p50 / p95 / max and bucketed counts for every stage in production.
+
+The memory save runs on a background thread; its span is added to the
+trace (and the histograms) when it finishes, after the turn has returned.
+
+Disable with NEON_TRACE=0 (spans become no-ops).
+"""
+
+import os
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+try:
+    from brain.router import percentile
+except ImportError:
+    from router import percentile
+
+TRACE_ENABLED = os.getenv("NEON_TRACE", "1").strip() != "0"
+TRACE_WINDOW  = int(os.getenv("NEON_TRACE_WINDOW", "200"))
+
+# Histogram bucket upper bounds (ms); the last bucket is open-ended
+HISTOGRAM_BOUNDS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class TurnTrace:
+    def __init__(self, stats: Optional["TraceStats"] = None):
+        self.stats = stats
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self.spans: List[Dict] = []
+        self.attrs: Dict = {"outcome": "llm"}
+        self.total_ms: Optional[float] = None
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(name, start, time.perf_counter())
+
+    def add(self, name: str, ms: float) -> None:
+        """A span measured elsewhere (e.g. a duration Ollama reported)."""
+        now = time.perf_counter()
+        self._add(name, now - ms / 1000.0, now)
+
+    def _add(self, name: str, start: float, end: float) -> None:
+        span = {
+            "name":     name,
+            "start_ms": round((start - self._t0) * 1000, 2),
+            "ms":       round((end - start) * 1000, 2),
+        }
+        with self._lock:
+            self.spans.append(span)
+            finished = self.total_ms is not None
+        if finished and self.stats is not None:
+            # Late span (background work): the turn was already recorded
+            self.stats.record({name: span["ms"]})
+
+    def set(self, **attrs) -> None:
+        with self._lock:
+            self.attrs.update(attrs)
+
+    def finish(self) -> Dict:
+        with self._lock:
+            self.total_ms = round((time.perf_counter() - self._t0) * 1000, 2)
+            durations: Dict[str, float] = {"turn": self.total_ms}
+            for span in self.spans:
+                durations[span["name"]] = durations.get(span["name"], 0.0) + span["ms"]
+        if self.stats is not None:
+            self.stats.record(durations)
+        return self.to_dict()
+
+    def slowest(self) -> Optional[Dict]:
+        with self._lock:
+            local = [s for s in self.spans if not s["name"].startswith("ollama.")]
+        return max(local, key=lambda s: s["ms"]) if local else None
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            data = dict(self.attrs)
+            data["total_ms"] = self.total_ms
+            data["spans"] = [dict(s) for s in self.spans]
+        return data
+
+
+class _NullTrace:
+    """Stand-in while tracing is off or outside a turn."""
+    spans: List[Dict] = []
+    total_ms = None
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        yield
+
+    def add(self, name: str, ms: float) -> None:
+        pass
+
+    def set(self, **attrs) -> None:
+        pass
+
+    def finish(self) -> Dict:
+        return {}
+
+    def slowest(self) -> Optional[Dict]:
+        return None
+
+    def to_dict(self) -> Dict:
+        return {}
+
+
+NULL_TRACE = _NullTrace()
+
+
+class TraceStats:
+    def __init__(self, window: int = TRACE_WINDOW):
+        self.window = max(1, int(window))
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, durations: Dict[str, float]) -> None:
+        with self._lock:
+            for name, ms in durations.items():
+                self._samples.setdefault(name, deque(maxlen=self.window)).append(float(ms))
+
+    def histogram(self, name: str) -> Dict[str, int]:
+        with self._lock:
+            values = list(self._samples.get(name) or [])
+        buckets: Dict[str, int] = {}
+        for bound in HISTOGRAM_BOUNDS_MS:
+            buckets[f"<={bound}ms"] = 0
+        buckets[f">{HISTOGRAM_BOUNDS_MS[-1]}ms"] = 0
+        for ms in values:
+            for bound in HISTOGRAM_BOUNDS_MS:
+                if ms <= bound:
+                    buckets[f"<={bound}ms"] += 1
+                    break
+            else:
+                buckets[f">{HISTOGRAM_BOUNDS_MS[-1]}ms"] += 1
+        return buckets
+
+    def summary(self) -> Dict[str, Dict]:
+        """Per span name: samples, p50 / p95 / max (ms) and histogram over the window."""
+        with self._lock:
+            names = list(self._samples)
+        out = {}
+        for name in names:
+            with self._lock:
+                values = list(self._samples[name])
+            out[name] = {
+                "samples":   len(values),
+                "p50_ms":    round(percentile(values, 50), 2),
+                "p95_ms":    round(percentile(values, 95), 2),
+                "max_ms":    round(max(values), 2) if values else 0.0,
+                "histogram": {k: v for k, v in self.histogram(name).items() if v},
+            }
+        return out
+
+    def clear(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+
+# One set of histograms per process, fed by every brain
+_SHARED_TRACE_STATS: Optional[TraceStats] = None
+_SHARED_TRACE_STATS_LOCK = threading.Lock()
+
+
+def get_shared_trace_stats() -> TraceStats:
+    global _SHARED_TRACE_STATS
+    if _SHARED_TRACE_STATS is None:
+        with _SHARED_TRACE_STATS_LOCK:
+            if _SHARED_TRACE_STATS is None:
+                _SHARED_TRACE_STATS = TraceStats()
+    return _SHARED_TRACE_STATS
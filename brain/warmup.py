@@ -0,0 +1,155 @@
+"""
+Neon Model Warmer — keeps LARGE and SMALL resident in Ollama.
+
+_select_model() flips between two models per turn. If Ollama evicted one of
+them (keep_alive expired, or the other model pushed it out), the next turn
+pays the whole cold load inside its request. ModelWarmer:
+
+  - preloads every model in the background at startup with an empty-prompt
+    /api/generate (loads the weights, generates nothing)
+  - re-sends keep_alive for models that have been idle for `interval`
+    seconds, so the first turn after a quiet period finds them loaded
+  - records the load time Ollama reports for every warm-up (stats())
+
+The warm-up must use the same num_ctx as real turns — a different context
+size makes Ollama reload the model on the next request. Turns report the
+num_ctx they used through touch(), and refreshes reuse it.
+
+One warmer per process is shared by every brain (get_shared_warmer).
+"""
+
+import os
+import time
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import requests
+
+WARMUP_ENABLED  = os.getenv("NEON_WARMUP", "1").strip() != "0"
+WARMUP_INTERVAL = float(os.getenv("NEON_WARMUP_INTERVAL", "600"))   # seconds idle before a refresh
+WARMUP_TIMEOUT  = 120   # a cold 3B load on CPU can take a while
+
+
+class ModelWarmer:
+    def __init__(
+        self,
+        session: requests.Session,
+        models: Iterable[str],
+        generate_url: str,
+        keep_alive="30m",
+        options: Optional[Dict] = None,
+        interval: float = WARMUP_INTERVAL,
+    ):
+        self.session      = session
+        self.models       = list(dict.fromkeys(m for m in models if m))   # dedupe, keep order
+        self.generate_url = generate_url
+        self.keep_alive   = keep_alive
+        self.options      = dict(options or {})
+        self.interval     = max(5.0, float(interval))
+
+        self._last_used: Dict[str, float] = {}
+        self._options: Dict[str, Dict] = {}   # per-model options of the latest real turn
+        self._stats: Dict[str, Dict] = {m: {"warmups": 0, "failures": 0} for m in self.models}
+        self._lock   = threading.Lock()
+        self._stop   = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ── WARM-UP ───────────────────────────────────────────────────────────────
+
+    def warm(self, model: str) -> bool:
+        """Loads `model` (or just refreshes its keep_alive if already loaded)."""
+        payload = {
+            "model":      model,
+            "prompt":     "",
+            "stream":     False,
+            "keep_alive": self.keep_alive,
+            "options":    self._options.get(model, self.options),
+        }
+        t0 = time.time()
+        try:
+            resp = self.session.post(self.generate_url, json=payload, timeout=WARMUP_TIMEOUT)
+            resp.raise_for_status()
+            data = resp.json() or {}
+        except Exception as e:
+            with self._lock:
+                stats = self._stats.setdefault(model, {"warmups": 0, "failures": 0})
+                stats["failures"] += 1
+                first_failure = stats["failures"] == 1
+            if first_failure:
+                print(f"[WARN] [NEON] Warm-up failed for {model}: {e}")
+            return False
+
+        wall_ms = (time.time() - t0) * 1000
+        load_ms = (data.get("load_duration") or 0) / 1e6
+        with self._lock:
+            stats = self._stats.setdefault(model, {"warmups": 0, "failures": 0})
+            stats["warmups"]  += 1
+            stats["load_ms"]   = round(load_ms, 1)
+            stats["wall_ms"]   = round(wall_ms, 1)
+            stats["warmed_at"] = time.time()
+            if load_ms >= 500:
+                # Only a real (cold) load is worth remembering as "the" load time
+                stats["cold_load_ms"] = round(load_ms, 1)
+            self._last_used[model] = time.time()
+        if load_ms >= 500:
+            print(f"[NEON] Warmed {model} in {wall_ms / 1000:.2f}s (load {load_ms / 1000:.2f}s)")
+        return True
+
+    def warm_all(self) -> None:
+        for model in self.models:
+            if self._stop.is_set():
+                return
+            self.warm(model)
+
+    def touch(self, model: str, options: Optional[Dict] = None) -> None:
+        """A real turn just used `model` (with `options`) — its keep_alive timer was reset."""
+        with self._lock:
+            self._last_used[model] = time.time()
+            if options:
+                self._options[model] = {**self.options, **options}
+
+    # ── BACKGROUND LOOP ───────────────────────────────────────────────────────
+
+    def idle_models(self) -> List[str]:
+        """Models whose keep_alive hasn't been refreshed for `interval` seconds."""
+        now = time.time()
+        with self._lock:
+            return [m for m in self.models if now - self._last_used.get(m, 0) >= self.interval]
+
+    def _run(self) -> None:
+        self.warm_all()
+        while not self._stop.wait(self.interval / 2):
+            for model in self.idle_models():
+                if self._stop.is_set():
+                    return
+                self.warm(model)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="neon-warmup", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {m: dict(s) for m, s in self._stats.items()}
+
+
+# One warmer per process: every brain talks to the same Ollama and models
+_SHARED_WARMER: Optional[ModelWarmer] = None
+_SHARED_WARMER_LOCK = threading.Lock()
+
+
+def get_shared_warmer(**kwargs) -> ModelWarmer:
+    """Returns the process-wide warmer, creating (not starting) it on first call."""
+    global _SHARED_WARMER
+    if _SHARED_WARMER is None:
+        with _SHARED_WARMER_LOCK:
+            if _SHARED_WARMER is None:
+                _SHARED_WARMER = ModelWarmer(**kwargs)
+    return _SHARED_WARMER
@@ -0,0 +1,207 @@
+"""
+Neon YouTube Cache — "play X on youtube" resolves the top result once.
+
+play_music turns a query into the top video by running `yt-dlp --get-id
+ytsearch1:<query>` (a fresh interpreter per call, up to 15 s) or, without
+yt-dlp, by scraping the search HTML (up to 10 s), even for songs played every
+day. VideoIdCache sits in front of those resolvers:
+
+    cache.resolve("Lofi  Beats!", [yt_dlp_lookup, html_lookup])
+    # hit  → "jfKfPfyJRdk" straight from memory
+    # miss → first resolver that finds an id, stored for next time
+
+Key   = normalized query (case, spacing and trailing punctuation ignored)
+Value = 11-char videoId, or None when every resolver failed (negative entry)
+
+Found ids expire after NEON_YT_CACHE_TTL seconds, failed lookups after
+NEON_YT_CACHE_NEGATIVE_TTL (so a network blip isn't remembered for long).
+Entries are evicted LRU-first past NEON_YT_CACHE_SIZE and saved atomically to
+memory/state/youtube_cache.json after every store, so they survive restarts.
+
+Disable with NEON_YT_CACHE=0.
+"""
+
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+YT_CACHE_ENABLED      = os.getenv("NEON_YT_CACHE", "1").strip() != "0"
+YT_CACHE_SIZE         = int(os.getenv("NEON_YT_CACHE_SIZE", "512"))
+YT_CACHE_TTL          = float(os.getenv("NEON_YT_CACHE_TTL", str(30 * 24 * 3600)))   # seconds
+YT_CACHE_NEGATIVE_TTL = float(os.getenv("NEON_YT_CACHE_NEGATIVE_TTL", "600"))
+
+_PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+CACHE_FILE    = os.path.join(_PROJECT_ROOT, "memory", "state", "youtube_cache.json")
+
+Resolver = Callable[[str], Optional[str]]
+
+
+def normalize_query(text: str) -> str:
+    """Case, spacing and trailing punctuation don't change the search."""
+    t = " ".join((text or "").lower().split())
+    return t.strip(" ?.!,'\"")
+
+
+class VideoIdCache:
+    def __init__(self, path: str = CACHE_FILE, max_entries: int = YT_CACHE_SIZE,
+                 ttl_seconds: float = YT_CACHE_TTL, negative_ttl_seconds: float = YT_CACHE_NEGATIVE_TTL):
+        self.path         = path
+        self.max_entries  = max(1, int(max_entries))
+        self.ttl_seconds  = float(ttl_seconds)
+        self.negative_ttl = float(negative_ttl_seconds)
+
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()   # oldest use first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._load()
+
+    # ── DISK ──────────────────────────────────────────────────────────────────
+
+    def _expired(self, entry: Dict, now: float) -> bool:
+        ttl = self.ttl_seconds if entry.get("video_id") else self.negative_ttl
+        return now - float(entry.get("created", 0)) > ttl
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"[WARN] [NEON] Corrupted YouTube cache ({e}). Starting empty.")
+            return
+        now = time.time()
+        rows = [
+            (k, v) for k, v in (raw.get("entries") or {}).items()
+            if isinstance(v, dict) and (v.get("video_id") is None or isinstance(v.get("video_id"), str))
+            and not self._expired(v, now)
+        ]
+        rows.sort(key=lambda kv: float(kv[1].get("last_used", 0)))
+        for key, entry in rows[-self.max_entries:]:
+            self._entries[key] = entry
+
+    def _save_locked(self) -> None:
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_file = self.path + ".tmp"
+        try:
+            with open(temp_file, "w", encoding="utf-8") as f:
+                json.dump({"entries": dict(self._entries)}, f, ensure_ascii=False)
+            os.replace(temp_file, self.path)
+        except Exception as e:
+            print(f"[ERROR] [NEON] YouTube cache save failed: {e}")
+            if os.path.exists(temp_file):
+                try:
+                    os.remove(temp_file)
+                except OSError:
+                    pass
+
+    # ── LOOKUP / STORE ────────────────────────────────────────────────────────
+
+    def get(self, query: str) -> Tuple[bool, Optional[str]]:
+        """(found, video_id); found with video_id None is a cached failure."""
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry, time.time()):
+                del self._entries[key]
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return False, None
+            entry["last_used"] = time.time()
+            entry["hits"] = entry.get("hits", 0) + 1
+            self._entries.move_to_end(key)
+            if entry.get("video_id"):
+                self.hits += 1
+            else:
+                self.negative_hits += 1
+            return True, entry.get("video_id")
+
+    def __contains__(self, query: str) -> bool:
+        """Fresh entry (found or failed) without touching stats or LRU order."""
+        with self._lock:
+            entry = self._entries.get(normalize_query(query))
+            return entry is not None and not self._expired(entry, time.time())
+
+    def put(self, query: str, video_id: Optional[str], source: str = "") -> None:
+        key = normalize_query(query)
+        if not key:
+            return
+        now = time.time()
+        with self._lock:
+            self._entries[key] = {
+                "video_id":  video_id or None,
+                "source":    source,
+                "created":   now,
+                "last_used": now,
+                "hits":      0,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self.stores += 1
+            self._save_locked()
+
+    def resolve(self, query: str, resolvers: Iterable[Resolver]) -> Optional[str]:
+        """Cached videoId, else the first resolver's answer (a miss everywhere is cached too)."""
+        if not normalize_query(query):
+            return None
+        found, video_id = self.get(query)
+        if found:
+            return video_id
+        for resolver in resolvers:
+            try:
+                video_id = resolver(query)
+            except Exception:
+                video_id = None
+            if video_id:
+                self.put(query, video_id, source=getattr(resolver, "__name__", ""))
+                return video_id
+        self.put(query, None)
+        return None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._save_locked()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                "entries":       len(self._entries),
+                "hits":          self.hits,
+                "negative_hits": self.negative_hits,
+                "misses":        self.misses,
+                "hit_rate":      round((self.hits + self.negative_hits) / lookups, 3) if lookups else 0.0,
+                "stores":        self.stores,
+                "evictions":     self.evictions,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# One cache (and one file) per process
+_SHARED_CACHE: Optional[VideoIdCache] = None
+_SHARED_CACHE_LOCK = threading.Lock()
+
+
+def get_shared_youtube_cache() -> VideoIdCache:
+    global _SHARED_CACHE
+    if _SHARED_CACHE is None:
+        with _SHARED_CACHE_LOCK:
+            if _SHARED_CACHE is None:
+                _SHARED_CACHE = VideoIdCache()
+    return _SHARED_CACHE
@@ -0,0 +1,195 @@
+"""
+Neon yt-dlp Resolver — one warm yt-dlp for every YouTube lookup.
+
+play_music found the top result with `yt-dlp --get-id ytsearch1:<query>`:
+shutil.which() plus a new Python interpreter per play, each paying yt-dlp's
+import and extractor setup before the search even starts. When the yt_dlp
+package is importable, YtDlpResolver keeps a single yt_dlp.YoutubeDL on a
+worker thread instead and takes lookups through a queue:
+
+    resolver = get_shared_yt_resolver()       # None without the library
+    resolver("lofi beats")                    # → "jfKfPfyJRdk" or None
+
+  - the YoutubeDL instance is built once, on the worker (start() does it
+    up front so the first play is warm too)
+  - every network read gives up after NEON_YT_SOCKET_TIMEOUT seconds
+    (yt-dlp's socket_timeout), so a dead connection fails the lookup
+  - each lookup waits at most `timeout` seconds (NEON_YT_RESOLVER_TIMEOUT);
+    if its extraction is still running then, the worker is stuck on it: it
+    is abandoned (its late answer is dropped) and a fresh worker with a new
+    YoutubeDL takes over the queued lookups, so one hung search can't block
+    every play after it
+  - a lookup that raises returns None, like the subprocess did
+
+It is a drop-in resolver for SystemController.youtube_resolvers, behind the
+query → videoId cache (brain/youtube_cache.py). Without the library (or with
+NEON_YT_RESOLVER=0) the subprocess path is used as before.
+"""
+
+import os
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import yt_dlp
+    _YTDLP_OK = True
+except ImportError:
+    yt_dlp = None
+    _YTDLP_OK = False
+
+YT_RESOLVER_ENABLED = os.getenv("NEON_YT_RESOLVER", "1").strip() != "0"
+YT_RESOLVER_TIMEOUT = float(os.getenv("NEON_YT_RESOLVER_TIMEOUT", "15"))
+YT_SOCKET_TIMEOUT   = float(os.getenv("NEON_YT_SOCKET_TIMEOUT", "10"))
+
+# Search only: no formats, no download, flat result list
+YDL_OPTIONS: Dict[str, Any] = {
+    "quiet":         True,
+    "no_warnings":   True,
+    "skip_download": True,
+    "extract_flat":  True,
+    "noplaylist":    True,
+    "socket_timeout": YT_SOCKET_TIMEOUT,
+}
+
+_STOP = object()
+
+
+def _default_factory():
+    return yt_dlp.YoutubeDL(dict(YDL_OPTIONS))
+
+
+def _first_video_id(info: Any) -> Optional[str]:
+    entries = (info or {}).get("entries") or []
+    for entry in entries:
+        video_id = (entry or {}).get("id")
+        if isinstance(video_id, str) and video_id:
+            return video_id
+    return None
+
+
+class YtDlpResolver:
+    def __init__(self, factory: Optional[Callable[[], Any]] = None, timeout: float = YT_RESOLVER_TIMEOUT):
+        """factory builds the YoutubeDL-like object (default: yt_dlp.YoutubeDL)."""
+        self.__name__ = "yt_dlp_warm"   # recorded as the cache entry's source
+        self.factory = factory or _default_factory
+        self.timeout = float(timeout)
+        self._requests: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._generation = 0          # bumped by _recycle(); an older worker exits
+        self.lookups = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.instances = 0
+        self.recycles = 0
+
+    # ── WORKER ────────────────────────────────────────────────────────────────
+
+    def start(self) -> "YtDlpResolver":
+        """Starts the worker (idempotent); it builds the YoutubeDL right away."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._requests, self._generation),
+                    name="neon-yt-resolver", daemon=True,
+                )
+                self._thread.start()
+        return self
+
+    def _run(self, requests_q: "queue.Queue", generation: int) -> None:
+        ydl = None
+        try:
+            ydl = self._new_instance()
+        except Exception as e:
+            print(f"[WARN] [NEON] yt-dlp init failed: {e}")
+        while generation == self._generation:
+            item = requests_q.get()
+            if item is _STOP:
+                return
+            query, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if ydl is None:
+                    ydl = self._new_instance()
+                info = ydl.extract_info(f"ytsearch1:{query}", download=False)
+                future.set_result(_first_video_id(info))
+            except Exception as e:
+                future.set_exception(e)
+
+    def _new_instance(self):
+        ydl = self.factory()
+        self.instances += 1
+        return ydl
+
+    def _recycle(self) -> None:
+        """Abandons a worker stuck in extract_info; a new one takes over its queue."""
+        with self._lock:
+            self._generation += 1
+            stuck_q, self._requests = self._requests, queue.Queue()
+            self._thread = None
+            self.recycles += 1
+            while True:
+                try:
+                    self._requests.put(stuck_q.get_nowait())
+                except queue.Empty:
+                    break
+        print("[WARN] [NEON] yt-dlp worker hung, starting a fresh one")
+        self.start()
+
+    # ── LOOKUP ────────────────────────────────────────────────────────────────
+
+    def lookup(self, search_query: str, timeout: Optional[float] = None) -> Optional[str]:
+        """videoId of the top search result, or None (no result, error or timeout)."""
+        if not search_query:
+            return None
+        self.start()
+        future: Future = Future()
+        self._requests.put((search_query, future))
+        self.lookups += 1
+        try:
+            return future.result(timeout=self.timeout if timeout is None else timeout)
+        except FutureTimeout:
+            self.timeouts += 1
+            print(f"[WARN] [NEON] yt-dlp lookup timed out: '{search_query}'")
+            if not future.cancel():
+                # Still extracting: the worker is stuck on this lookup
+                self._recycle()
+            return None
+        except Exception:
+            self.errors += 1
+            return None
+
+    __call__ = lookup
+
+    def stop(self) -> None:
+        self._requests.put(_STOP)
+
+    def stats(self) -> Dict:
+        return {
+            "lookups":   self.lookups,
+            "timeouts":  self.timeouts,
+            "errors":    self.errors,
+            "instances": self.instances,
+            "recycles":  self.recycles,
+            "queued":    self._requests.qsize(),
+        }
+
+
+# One warm yt-dlp per process
+_SHARED_RESOLVER: Optional[YtDlpResolver] = None
+_SHARED_RESOLVER_LOCK = threading.Lock()
+
+
+def get_shared_yt_resolver() -> Optional[YtDlpResolver]:
+    """The started shared resolver, or None when yt_dlp isn't importable (or NEON_YT_RESOLVER=0)."""
+    global _SHARED_RESOLVER
+    if not (_YTDLP_OK and YT_RESOLVER_ENABLED):
+        return None
+    if _SHARED_RESOLVER is None:
+        with _SHARED_RESOLVER_LOCK:
+            if _SHARED_RESOLVER is None:
+                _SHARED_RESOLVER = YtDlpResolver().start()
+    return _SHARED_RESOLVER
@@ -1,6 +1,7 @@
 import time
 import copy
 import random
+import threading
 import nltk
 from nltk.sentiment import SentimentIntensityAnalyzer
 
@@ -10,6 +11,20 @@ try:
 except LookupError:
     nltk.download("vader_lexicon", quiet=True)
 
+# One VADER analyzer per process: loading the lexicon is the expensive part
+# and polarity_scores() is read-only, so every EmotionEngine can share it.
+_SHARED_SIA = None
+_SHARED_SIA_LOCK = threading.Lock()
+
+
+def get_shared_analyzer() -> SentimentIntensityAnalyzer:
+    global _SHARED_SIA
+    if _SHARED_SIA is None:
+        with _SHARED_SIA_LOCK:
+            if _SHARED_SIA is None:
+                _SHARED_SIA = SentimentIntensityAnalyzer()
+    return _SHARED_SIA
+
 
 class EmotionEngine:
     """
@@ -64,7 +79,7 @@ class EmotionEngine:
     _FILLER_TOKENS = {"k", "ok", "okay", "acha", "thik", "oh", "han", "yup", "hmm", "hm", "yeah", "sure"}
 
     def __init__(self, debug_mode: bool = False):
-        self.sia   = SentimentIntensityAnalyzer()
+        self.sia   = get_shared_analyzer()
         self.debug = debug_mode
 
         self.status = {
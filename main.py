@@ -3,6 +3,7 @@ import time
 import os
 import colorama
 import itertools
+import queue
 from colorama import Fore, Style
 from concurrent.futures import ThreadPoolExecutor
 
@@ -13,7 +14,7 @@ try:
     from brain.llm import NeonBrain
     from voice.set_model import set_models
     from voice.set_reference import set_reference
-    from voice.speak import speak, configure_voice_style
+    from voice.speak import speak, configure_voice_style, SpeechPipeline
     from voice.hear import listen
 except ImportError as e:
     print(f"[ERROR] Import Error: {e}")
@@ -25,18 +26,25 @@ colorama.init(autoreset=True)
 # GLOBAL SETTINGS
 TYPING_ENABLED = True
 VOICE_ENABLED = True
+PIPELINE_ENABLED = True   # Stream tokens + speak sentence-by-sentence while generating
 STOP_REQUESTED = False
+# Placeholder replies (grudge silence, confusion) are printed but never spoken
+SILENT_REPLIES = ("...", "Hmm.")
 
 # --- HELPER FUNCTIONS ---
 
+def should_speak(text: str) -> bool:
+    return bool(text and text.strip()) and text.strip() not in SILENT_REPLIES
+
 def status(msg: str, color=Fore.YELLOW):
     """Prints a clear, standardized status update."""
     print(f"{color}[STATUS] {msg}{Style.RESET_ALL}")
 
-def animated_thinking(future, msg="Thinking"):
-    """Non-blocking spinner that keeps UI alive while brain computes."""
+def animated_thinking(future, msg="Thinking", ready=None):
+    """Non-blocking spinner that keeps UI alive while brain computes.
+    Stops early once `ready()` returns True (e.g. first streamed token)."""
     spinner = itertools.cycle(['|', '/', '-', '\\'])
-    while not future.done():
+    while not future.done() and not (ready and ready()):
         sys.stdout.write(f'\r{Fore.CYAN}[STATUS] {msg} {next(spinner)}{Style.RESET_ALL}')
         sys.stdout.flush()
         time.sleep(0.1)
@@ -52,6 +60,7 @@ def print_commands():
     ║  [Enter]  → Speak (Voice Input)    ║
     ║  v        → Toggle Voice ON/OFF    ║
     ║  t        → Toggle Typing Effect   ║
+    ║  p        → Toggle Stream Pipeline ║
     ║  cls      → Clear Screen           ║
     ║  stop     → Stop / Cancel Output   ║
     ║  help     → Show This Menu         ║
@@ -77,16 +86,76 @@ def type_effect(text: str, delay: float = 0.02):
         time.sleep(delay)
     print()
 
+def stream_reply(brain, executor, user_input: str):
+    """
+    Pipeline mode: prints the reply as it streams in and hands every finished
+    sentence to TTS while the rest of the reply is still being generated.
+    chat_stream yields postprocessed sentences, so what is printed and spoken
+    is the text chat() returns and history stores.
+    Returns the cleaned final reply (what chat() would have returned).
+    """
+    chunks = queue.Queue()
+
+    def _produce():
+        try:
+            for delta in brain.chat_stream(user_input):
+                chunks.put(delta)
+        finally:
+            chunks.put(None)
+
+    future = executor.submit(_produce)
+    animated_thinking(future, "Thinking", ready=lambda: not chunks.empty())
+
+    pipeline = SpeechPipeline(stop_check=lambda: STOP_REQUESTED) if VOICE_ENABLED else None
+    printed = False
+    while True:
+        delta = chunks.get()
+        if delta is None:
+            break
+        if STOP_REQUESTED:
+            continue
+        if not printed:
+            print(f"{Fore.MAGENTA}Neon: {Fore.WHITE}", end="")
+            printed = True
+        sys.stdout.write(delta)
+        sys.stdout.flush()
+        if pipeline and should_speak(delta):
+            pipeline.feed(delta)
+    if printed:
+        print()
+
+    if pipeline:
+        pipeline.finish()
+        pipeline.wait()
+    future.result()
+    return getattr(brain, "last_reply", None)
+
+def announce_tool_result(result):
+    """
+    A slow tool finished in the background (brain/async_tools.py): show it at
+    the prompt. Runs on the tool worker; speak() waits for any reply still
+    playing (voice/speak.py serializes playback).
+    """
+    reply = (result or {}).get("reply")
+    if not reply:
+        return
+    print(f"\r{Fore.MAGENTA}Neon: {Fore.WHITE}{reply}")
+    print(f"\n{Fore.CYAN}You > {Style.RESET_ALL}", end="", flush=True)
+    if VOICE_ENABLED and not STOP_REQUESTED:
+        speak(reply)
+
 # --- MAIN LOOP ---
 
 def main():
-    global TYPING_ENABLED, VOICE_ENABLED, STOP_REQUESTED
+    global TYPING_ENABLED, VOICE_ENABLED, PIPELINE_ENABLED, STOP_REQUESTED
 
     print(f"{Fore.CYAN}Initializing Neon Neural Core...")
 
     # 1️⃣ INIT SYSTEM
     try:
         brain = NeonBrain()
+        # YouTube lookups / WhatsApp sends acknowledge now, report when done
+        brain.enable_async_tools(on_result=announce_tool_result)
         status("Brain Online", Fore.GREEN)
     except Exception as e:
         status(f"Brain Init Failed: {e}", Fore.RED)
@@ -188,11 +257,21 @@ def main():
                 status(f"Typing Effect {'ENABLED' if TYPING_ENABLED else 'DISABLED'}", Fore.CYAN)
                 continue
             
+            elif cmd == "p":
+                PIPELINE_ENABLED = not PIPELINE_ENABLED
+                status(f"Stream Pipeline {'ENABLED' if PIPELINE_ENABLED else 'DISABLED'}", Fore.CYAN)
+                continue
+            
             elif cmd == "stop":
                 STOP_REQUESTED = True
                 status("Output flagged to stop.", Fore.RED)
                 continue
 
+            # --- PIPELINE PHASE (Stream → sentence TTS overlap) ---
+            if PIPELINE_ENABLED and hasattr(brain, "chat_stream"):
+                stream_reply(brain, executor, user_input)
+                continue
+
             # --- THINKING PHASE (Background Threaded) ---
             future = executor.submit(brain.chat, user_input)
             animated_thinking(future, "Thinking")
@@ -205,7 +284,7 @@ def main():
 
                 if VOICE_ENABLED and not STOP_REQUESTED:
                     status("Speaking...", Fore.BLUE)
-                    if reply.strip() and reply.strip() not in ["...", "Hmm."]:
+                    if should_speak(reply):
                         speak(reply) # Needs internal STOP_REQUESTED check to cancel mid-sentence
                     # Clear speaking status safely
                     sys.stdout.write(f'\r{" " * 30}\r')
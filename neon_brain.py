@@ -1,24 +1,100 @@
-from brain.llm import NeonBrain
+from brain.async_llm import AsyncNeonBrain
+from brain.sessions import SessionManager
+from brain.singleflight import SingleFlight, SINGLEFLIGHT_ENABLED, flight_key
 
-brain = NeonBrain()  # single persistent brain
+DEFAULT_SESSION = "default"
 
-def think_and_reply(prompt: str, target: str = "auto"):
+# One brain per session (history + emotion), shared tools / memory / HTTP pool
+sessions = SessionManager(brain_cls=AsyncNeonBrain, pinned=(DEFAULT_SESSION,))
+brain = sessions.get(DEFAULT_SESSION)  # kept for callers that used the old global
+
+# A retried request joins the one still running (same reply + action, one execution).
+# Only plain replies are replayed after they finish: a command repeated on
+# purpose ("volume up" twice) has to run again.
+inflight = SingleFlight(keep=lambda outcome: outcome[1])
+
+def _mood(session_id: str) -> str:
+    # Reading the mood must not create (or evict for) a session
+    if session_id not in sessions:
+        return "calm"
+    return sessions.get(session_id).engine.status.get("emotion", "calm")
+
+def _replayable(session_brain, result) -> bool:
+    return (
+        result.get("mode") != "error"
+        and not result.get("action")
+        and not getattr(session_brain, "last_tools", None)
+    )
+
+def _result(session_brain, reply):
+    result = {
+        "reply": reply or "",
+        "mode": session_brain.engine.status.get("emotion", "calm"),
+        "action": getattr(session_brain, "last_action", None),
+    }
+    # Slow tools still running (NEON_ASYNC_TOOLS=1): poll_tool_results delivers them
+    pending = getattr(session_brain, "last_pending", None)
+    if pending:
+        result["pending"] = list(pending)
+    return result
+
+def poll_tool_results(session_id: str = DEFAULT_SESSION, timeout: float = 0.0):
+    """
+    Finished background tools of a session, oldest first:
+    [{"id", "tool", "status", "reply", "action", "elapsed_ms"}, ...]
+    The backend forwards `reply` / `action` to the app like a normal turn.
+    """
+    if session_id not in sessions:
+        return []
+    return sessions.get(session_id).poll_tool_results(timeout)
+
+def think_and_reply(prompt: str, target: str = "auto", session_id: str = DEFAULT_SESSION):
     if not prompt or not prompt.strip():
-        return {
-            "reply": "",
-            "mode": brain.engine.status.get("emotion", "calm")
-        }
+        return {"reply": "", "mode": _mood(session_id)}
+    if not SINGLEFLIGHT_ENABLED:
+        return _think_and_reply(prompt, target, session_id)[0]
+    result, _ = inflight.do(
+        flight_key(session_id, prompt, target),
+        lambda: _think_and_reply(prompt, target, session_id),
+    )
+    return dict(result)
 
+def _think_and_reply(prompt: str, target: str, session_id: str):
+    """(result, replayable)"""
     try:
-        reply = brain.chat(prompt, target=target)
+        with sessions.turn(session_id) as session_brain:
+            reply = session_brain.chat(prompt, target=target)
+            result = _result(session_brain, reply)
+            return result, _replayable(session_brain, result)
+    except Exception:
         return {
-            "reply": reply or "",
-            "mode": brain.engine.status.get("emotion", "calm"),
-            "action": getattr(brain, "last_action", None),
-        }
+            "reply": "Something went wrong. Give me a second, Boss.",
+            "mode": "error",
+            "action": None,
+        }, False
+
+async def think_and_reply_async(prompt: str, target: str = "auto", session_id: str = DEFAULT_SESSION):
+    """Async version for FastAPI: `return await think_and_reply_async(text, target, session_id)`."""
+    if not prompt or not prompt.strip():
+        return {"reply": "", "mode": _mood(session_id)}
+    if not SINGLEFLIGHT_ENABLED:
+        return (await _think_and_reply_async(prompt, target, session_id))[0]
+    result, _ = await inflight.ado(
+        flight_key(session_id, prompt, target),
+        lambda: _think_and_reply_async(prompt, target, session_id),
+    )
+    return dict(result)
+
+async def _think_and_reply_async(prompt: str, target: str, session_id: str):
+    """(result, replayable)"""
+    try:
+        async with sessions.aturn(session_id) as session_brain:
+            reply = await session_brain.achat(prompt, target=target)
+            result = _result(session_brain, reply)
+            return result, _replayable(session_brain, result)
     except Exception:
         return {
             "reply": "Something went wrong. Give me a second, Boss.",
             "mode": "error",
             "action": None,
-        }
+        }, False
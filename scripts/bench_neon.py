@@ -0,0 +1,271 @@
+"""
+⏱  Neon load / latency benchmark — offline, against the mock Ollama server.
+
+Drives real turns through NeonBrain.chat (--mode brain) or the server entry
+point neon_brain.think_and_reply (--mode server) with a mixed workload:
+
+    command    "open spotify", "check system status", ...   (fast path / tools)
+    chat       "hey neon how was your day", ...              (small model)
+    technical  "explain what a python decorator is", ...     (large model)
+
+--concurrency workers run at once, each with its own conversation (a brain
+or a session id), so the shared pieces (HTTP pool, router, breaker, sizer,
+tool selector, memory) are exercised the way the server uses them.
+
+Reports throughput and p50 / p95 / p99 turn latency per turn type, how the
+turns ended (fast_path / llm / cache / offline ...) and the slowest stages
+from the trace histograms.
+
+    python scripts/bench_neon.py --turns 200 --concurrency 8 --token-ms 10
+    python scripts/bench_neon.py --mode server --error-500 0.05
+    python scripts/bench_neon.py --ollama-url http://localhost:11434   # a real server
+
+Memory state is written to a temporary directory, never memory/state.
+Tools run headless with target="mobile", so nothing launches on this machine.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+_REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if _REPO not in sys.path:
+    sys.path.insert(0, _REPO)
+
+WORKLOADS: Dict[str, List[str]] = {
+    "command": [
+        "open spotify",
+        "launch telegram please",
+        "search google for cheap flights to goa",
+        "check system status",
+        "how is my battery doing",
+        "open whatsapp on my phone",
+    ],
+    "chat": [
+        "hey neon how was your day",
+        "tell me something fun",
+        "i'm bored, talk to me",
+        "what do you think about rainy days",
+        "good morning neon",
+    ],
+    "technical": [
+        "explain what a python decorator is",
+        "how do i fix a null pointer error in java",
+        "what is the difference between a list and a tuple in python",
+        "explain sql joins with an example",
+        "write a regex for email addresses",
+    ],
+}
+
+
+def _parse_mix(raw: str) -> Dict[str, float]:
+    mix = {}
+    for part in (raw or "").split(","):
+        if "=" not in part:
+            continue
+        name, weight = part.split("=", 1)
+        name = name.strip()
+        if name in WORKLOADS and float(weight) > 0:
+            mix[name] = float(weight)
+    return mix or {name: 1.0 for name in WORKLOADS}
+
+
+def build_plan(turns: int, concurrency: int, mix: Dict[str, float], seed: int = 7) -> List[List[Tuple[str, str]]]:
+    """(turn type, prompt) per worker; a worker never sends the same prompt twice in a row."""
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    plans: List[List[Tuple[str, str]]] = [[] for _ in range(max(1, concurrency))]
+    for i in range(max(0, turns)):
+        plan = plans[i % len(plans)]
+        while True:
+            kind = rng.choices(names, weights)[0]
+            prompt = rng.choice(WORKLOADS[kind])
+            if not plan or plan[-1][1] != prompt:
+                break
+        plan.append((kind, prompt))
+    return plans
+
+
+def _use_temp_memory(path: str) -> None:
+    # MemoryManager reads these module globals when it loads / saves
+    import memory.memory as memory_module
+    memory_module.MEMORY_DIR = path
+    memory_module.MEMORY_FILE = os.path.join(path, "state.json")
+
+
+def run_bench(
+    turns: int = 60,
+    concurrency: int = 4,
+    mode: str = "brain",
+    mix: Optional[Dict[str, float]] = None,
+    seed: int = 7,
+) -> Dict:
+    """
+    Runs the workload against whatever NEON_OLLAMA_URL points at (set it
+    before the first brain import). Returns the report dict.
+    """
+    from brain.router import percentile
+    from brain.llm import OFFLINE_REPLY
+    from brain.tracing import get_shared_trace_stats
+
+    plans = build_plan(turns, concurrency, mix or {name: 1.0 for name in WORKLOADS}, seed)
+
+    if mode == "server":
+        import neon_brain
+
+        def run_turn(worker: int, prompt: str) -> Tuple[str, Dict]:
+            session_id = f"bench-{worker}"
+            result = neon_brain.think_and_reply(prompt, target="mobile", session_id=session_id)
+            return result.get("reply") or "", neon_brain.sessions.get(session_id).last_trace
+    else:
+        from brain.llm import NeonBrain
+        from brain.sessions import SessionManager
+        manager = SessionManager(brain_cls=NeonBrain)
+
+        def run_turn(worker: int, prompt: str) -> Tuple[str, Dict]:
+            brain = manager.get(f"bench-{worker}")
+            return brain.chat(prompt, target="mobile") or "", brain.last_trace
+
+    samples: List[Dict] = []
+    lock = threading.Lock()
+
+    def worker_loop(worker: int) -> None:
+        for kind, prompt in plans[worker]:
+            t0 = time.perf_counter()
+            try:
+                reply, trace = run_turn(worker, prompt)
+                error = None
+            except Exception as e:
+                reply, trace, error = "", {}, f"{type(e).__name__}: {e}"
+            ms = (time.perf_counter() - t0) * 1000
+            failed = bool(error) or reply == OFFLINE_REPLY or reply.startswith("Something went wrong")
+            with lock:
+                samples.append({
+                    "type":    kind,
+                    "ms":      ms,
+                    "outcome": (trace or {}).get("outcome") or ("error" if failed else "unknown"),
+                    "failed":  failed,
+                    "error":   error,
+                })
+
+    threads = [threading.Thread(target=worker_loop, args=(w,), name=f"bench-{w}") for w in range(len(plans))]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall_s = max(1e-9, time.perf_counter() - t0)
+
+    report: Dict = {
+        "mode":         mode,
+        "turns":        len(samples),
+        "concurrency":  len(plans),
+        "wall_s":       round(wall_s, 3),
+        "throughput":   round(len(samples) / wall_s, 2),   # turns / s
+        "types":        {},
+        "stages":       {},
+    }
+    for kind in sorted({s["type"] for s in samples}):
+        rows = [s for s in samples if s["type"] == kind]
+        values = [s["ms"] for s in rows]
+        outcomes: Dict[str, int] = {}
+        for s in rows:
+            outcomes[s["outcome"]] = outcomes.get(s["outcome"], 0) + 1
+        report["types"][kind] = {
+            "turns":      len(rows),
+            "errors":     sum(1 for s in rows if s["failed"]),
+            "throughput": round(len(rows) / wall_s, 2),
+            "p50_ms":     round(percentile(values, 50), 1),
+            "p95_ms":     round(percentile(values, 95), 1),
+            "p99_ms":     round(percentile(values, 99), 1),
+            "max_ms":     round(max(values), 1),
+            "outcomes":   outcomes,
+        }
+    errors = [s["error"] for s in samples if s["error"]]
+    if errors:
+        report["first_error"] = errors[0]
+
+    summary = get_shared_trace_stats().summary()
+    stages = {name: stats for name, stats in summary.items() if name != "turn"}
+    for name in sorted(stages, key=lambda n: -stages[n]["p95_ms"])[:8]:
+        report["stages"][name] = {k: stages[name][k] for k in ("samples", "p50_ms", "p95_ms", "max_ms")}
+    return report
+
+
+def print_report(report: Dict) -> None:
+    print(f"\n{'='*78}")
+    print(f"  ⏱  NEON BENCH — mode={report['mode']}  turns={report['turns']}  "
+          f"concurrency={report['concurrency']}  wall={report['wall_s']}s  "
+          f"throughput={report['throughput']} turns/s")
+    print(f"{'='*78}")
+    print(f"  {'type':<10} {'turns':>6} {'err':>4} {'t/s':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}  outcomes")
+    for kind, row in report["types"].items():
+        outcomes = ", ".join(f"{k}={v}" for k, v in sorted(row["outcomes"].items()))
+        print(f"  {kind:<10} {row['turns']:>6} {row['errors']:>4} {row['throughput']:>7} "
+              f"{row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9} {row['max_ms']:>9}  {outcomes}")
+    if report["stages"]:
+        print("\n  Slowest stages (trace histograms, p95 first):")
+        for name, row in report["stages"].items():
+            print(f"    {name:<28} p50 {row['p50_ms']:>8} ms   p95 {row['p95_ms']:>8} ms   n={row['samples']}")
+    if report.get("first_error"):
+        print(f"\n  First error: {report['first_error']}")
+    if report.get("mock"):
+        print(f"\n  Mock Ollama requests: {report['mock']}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline load / latency benchmark for Neon")
+    parser.add_argument("--mode", choices=("brain", "server"), default="brain",
+                        help="brain: NeonBrain.chat; server: neon_brain.think_and_reply")
+    parser.add_argument("--turns", type=int, default=120)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--mix", default="command=1,chat=1,technical=1", help="turn type weights")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--ollama-url", help="benchmark a running server instead of the mock")
+    parser.add_argument("--token-ms", type=float, default=10.0)
+    parser.add_argument("--prompt-ms", type=float, default=50.0)
+    parser.add_argument("--load-ms", type=float, default=0.0)
+    parser.add_argument("--error-404", type=float, default=0.0)
+    parser.add_argument("--error-500", type=float, default=0.0)
+    parser.add_argument("--json", dest="json_path", help="also write the report here")
+    args = parser.parse_args()
+
+    server = None
+    if args.ollama_url:
+        os.environ["NEON_OLLAMA_URL"] = args.ollama_url
+    else:
+        from scripts.mock_ollama import MockOllama
+        server = MockOllama(
+            token_ms=args.token_ms, prompt_ms=args.prompt_ms, load_ms=args.load_ms,
+            error_404=args.error_404, error_500=args.error_500, seed=args.seed,
+        ).start()
+        os.environ["NEON_OLLAMA_URL"] = server.url
+    os.environ["NEON_HEADLESS"] = "1"
+    os.environ.setdefault("NEON_ROUTER_LOG", "")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _use_temp_memory(tmp)
+        try:
+            report = run_bench(args.turns, args.concurrency, args.mode, _parse_mix(args.mix), args.seed)
+        finally:
+            if server is not None:
+                server.stop()
+    if server is not None:
+        report["mock"] = dict(server.counts)
+
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,120 @@
+"""
+⏱  Tool dispatch micro-benchmark — per-call overhead before / after the registry.
+
+Measures only the work _execute_tool_calls does around a tool (lookup,
+argument validation, target resolution, prefs / env reads), not the tool
+itself, for a mix of typical calls:
+
+    legacy    getattr() + inspect.signature() + allowed-param set per call,
+              prefs and NEON_HEADLESS re-read for each target rule
+    registry  SystemController.tool_registry[name].prepare(...)
+
+    python scripts/bench_tool_dispatch.py --iterations 20000
+"""
+
+import os
+import sys
+import time
+import inspect
+import argparse
+from typing import Dict, List, Tuple
+
+_REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if _REPO not in sys.path:
+    sys.path.insert(0, _REPO)
+
+os.environ.setdefault("NEON_HEADLESS", "1")
+
+CALLS: List[Tuple[str, Dict]] = [
+    ("volume_control",     {"action": "set", "level": "40"}),
+    ("brightness_control", {"action": "set", "level": 70.0}),
+    ("open_app",           {"app_name": "spotify"}),
+    ("search_google",      {"query": "cheap flights to goa", "target": "auto"}),
+    ("play_music",         {"query": "lofi beats", "platform": "youtube", "autoplay": "true", "extra": 1}),
+    ("system_status",      {}),
+]
+
+
+def _legacy_prepare(system, memory_state: Dict, func_name: str, args: Dict, target: str) -> Dict:
+    """The per-call path _execute_tool_calls took before the registry."""
+    func = getattr(system, func_name, None)
+    try:
+        prefs = memory_state.get("prefs") or {}
+    except Exception:
+        prefs = {}
+    resolved_target = target if target in {"mobile", "desktop"} else "auto"
+    if func_name == "play_music":
+        if "platform" not in args:
+            args["platform"] = prefs.get("music_platform", "spotify")
+        if "target" not in args:
+            args["target"] = resolved_target
+        if os.getenv("NEON_HEADLESS", "0").strip() == "1" and resolved_target != "desktop":
+            if args.get("target") in {"auto", "desktop", None}:
+                args["target"] = "mobile"
+    if func_name == "open_app":
+        if "target" not in args:
+            args["target"] = resolved_target
+        if os.getenv("NEON_HEADLESS", "0").strip() == "1" and resolved_target != "desktop":
+            if args.get("target") in {"auto", "desktop", None}:
+                args["target"] = "mobile"
+    if func_name in {"search_google", "search_youtube"}:
+        if "target" not in args:
+            args["target"] = resolved_target
+        if os.getenv("NEON_HEADLESS", "0").strip() == "1" and resolved_target != "desktop":
+            if args.get("target") in {"auto", "desktop", None}:
+                args["target"] = "mobile"
+    if func:
+        try:
+            sig = inspect.signature(func)
+            params = sig.parameters
+            accepts_kwargs = any(p.kind == inspect.Parameter.VAR_KEYWORD for p in params.values())
+            if (not accepts_kwargs) and args:
+                allowed = {k for k, p in params.items() if p.kind in (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY)}
+                args = {k: v for k, v in args.items() if k in allowed}
+        except Exception:
+            pass
+    return args
+
+
+def _registry_prepare(system, memory_state: Dict, func_name: str, args: Dict, target: str) -> Dict:
+    spec = system.tool_registry.get(func_name)
+    if func_name == "play_music" and "platform" not in args:
+        args["platform"] = (memory_state.get("prefs") or {}).get("music_platform", "spotify")
+    return spec.prepare(args, target, system.headless) if spec is not None else args
+
+
+def run(iterations: int = 20000) -> Dict[str, float]:
+    """µs per call for each dispatch path over CALLS."""
+    from brain.system_controller import SystemController
+
+    system = SystemController(require_confirmation=False)
+    memory_state = {"prefs": {"music_platform": "spotify"}}
+    results = {}
+    for label, prepare in (("legacy", _legacy_prepare), ("registry", _registry_prepare)):
+        for name, args in CALLS:            # warm-up
+            prepare(system, memory_state, name, dict(args), "auto")
+        t0 = time.perf_counter()
+        for _ in range(iterations):
+            for name, args in CALLS:
+                prepare(system, memory_state, name, dict(args), "auto")
+        elapsed = time.perf_counter() - t0
+        results[label] = round(elapsed / (iterations * len(CALLS)) * 1e6, 3)
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Per-call tool dispatch overhead, legacy vs registry")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    results = run(args.iterations)
+    print(f"\n  Tool dispatch overhead ({len(CALLS)} calls × {args.iterations} iterations)")
+    print(f"    legacy   : {results['legacy']:>8.3f} µs / call")
+    print(f"    registry : {results['registry']:>8.3f} µs / call")
+    if results["registry"]:
+        print(f"    speedup  : {results['legacy'] / results['registry']:.1f}×")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,351 @@
+"""
+Mock Ollama server — an offline stand-in for load and latency benchmarks.
+
+Speaks the parts of the Ollama HTTP API Neon uses:
+
+    GET  /api/tags       installed models
+    POST /api/show       capabilities + context length
+    POST /api/generate   preload (empty prompt) or a plain completion
+    POST /api/chat       streamed NDJSON or one JSON body, with tool_calls
+
+Latency is synthetic but shaped like the real thing: a one-off load per
+model (--load-ms), prompt evaluation proportional to the prompt size
+(--prompt-ms per 1k estimated tokens) and generation at --token-ms per
+output token (streamed chunk by chunk when the request asks for it). The
+durations are reported back in Ollama's ns fields, so eval stats, the router
+and the traces see realistic numbers.
+
+Tool calls are scripted: when a request carries tool schemas, the last user
+message is matched against TOOL_SCRIPT (regex → tool call; "{1}" in an
+argument is replaced by the first capture group). A JSON file with the same
+shape can be passed with --tool-script.
+
+Faults: --error-404 / --error-500 inject those statuses on a fraction of
+chat/generate requests, and a model missing from --models always gets
+Ollama's 404 "model not found".
+
+    python scripts/mock_ollama.py --port 11500 --token-ms 15
+    NEON_OLLAMA_URL=http://127.0.0.1:11500 python main.py
+
+In process (what scripts/bench_neon.py does):
+
+    server = MockOllama(port=0, token_ms=5).start()
+    os.environ["NEON_OLLAMA_URL"] = server.url
+    ...
+    server.stop()
+"""
+
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+DEFAULT_MODELS = ("llama3.2:3b", "llama3.2:1b")
+
+# regex on the last user message → tool call ("{1}" = first capture group)
+TOOL_SCRIPT: List[Dict] = [
+    {"match": r"\b(?:open|launch|start)\s+(\w+)",             "name": "open_app",
+     "arguments": {"app_name": "{1}"}},
+    {"match": r"\bsearch\s+(?:google\s+)?for\s+(.+)",         "name": "search_google",
+     "arguments": {"query": "{1}"}},
+    {"match": r"\b(?:system|status|battery|cpu|ram)\b",        "name": "system_status",
+     "arguments": {}},
+    {"match": r"\bplay\s+(.+)",                                 "name": "play_music",
+     "arguments": {"query": "{1}"}},
+]
+
+_CHAT_REPLY = (
+    "Sure thing, Boss. I was just thinking about that, actually. "
+    "Give me a second and I will walk you through it properly."
+)
+_TECH_REPLY = (
+    "A decorator is a function that takes another function and returns a new one. "
+    "It wraps the original call, so you can add logging, caching or checks without "
+    "touching the function body. The @name syntax is just shorthand for f = name(f)."
+)
+_TECH_RE = re.compile(r"\b(code|python|function|decorator|api|error|bug|class|sql|regex|explain)\b", re.I)
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text or "") // 4)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+
+    def log_message(self, *args) -> None:
+        pass
+
+    # ── IO ────────────────────────────────────────────────────────────────────
+
+    def _send_json(self, status: int, body: Dict) -> None:
+        raw = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _chunk(self, body: Dict) -> None:
+        raw = (json.dumps(body) + "\n").encode("utf-8")
+        self.wfile.write(b"%x\r\n" % len(raw) + raw + b"\r\n")
+        self.wfile.flush()
+
+    def _read_json(self) -> Dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            return json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return {}
+
+    # ── ROUTES ────────────────────────────────────────────────────────────────
+
+    def do_GET(self) -> None:
+        mock = self.server.mock
+        mock._count("tags")
+        if self.path.rstrip("/") != "/api/tags":
+            return self._send_json(404, {"error": "not found"})
+        self._send_json(200, {"models": [{"name": m, "model": m} for m in mock.models]})
+
+    def do_POST(self) -> None:
+        mock = self.server.mock
+        body = self._read_json()
+        path = self.path.rstrip("/")
+        mock._count(path.rsplit("/", 1)[-1])
+
+        if path == "/api/show":
+            name = body.get("model") or body.get("name")
+            if name not in mock.models:
+                return self._send_json(404, {"error": f"model '{name}' not found"})
+            return self._send_json(200, {
+                "capabilities": ["completion", "tools"],
+                "details":      {"parameter_size": "3.2B" if "3b" in str(name) else "1.2B"},
+                "model_info":   {"llama.context_length": 131072},
+            })
+        if path not in ("/api/chat", "/api/generate"):
+            return self._send_json(404, {"error": "not found"})
+
+        model = body.get("model")
+        if model not in mock.models:
+            mock._count("error_404")
+            return self._send_json(404, {"error": f"model '{model}' not found, try pulling it first"})
+        fault = mock._fault()
+        if fault:
+            mock._count(f"error_{fault}")
+            return self._send_json(fault, {"error": "injected failure"})
+
+        if path == "/api/generate":
+            return self._generate(model, body)
+        return self._chat(model, body)
+
+    def _generate(self, model: str, body: Dict) -> None:
+        load_ns = self.server.mock._load(model)
+        prompt = body.get("prompt") or ""
+        if not prompt:
+            # Preload / keep_alive refresh
+            return self._send_json(200, {"model": model, "response": "", "done": True,
+                                         "load_duration": load_ns, "total_duration": load_ns})
+        words = _CHAT_REPLY.split(" ")
+        timings = self.server.mock._evaluate(prompt, len(words))
+        time.sleep(timings["eval_duration"] / 1e9)
+        self._send_json(200, {"model": model, "response": " ".join(words), "done": True,
+                              "load_duration": load_ns, **timings})
+
+    def _chat(self, model: str, body: Dict) -> None:
+        mock = self.server.mock
+        messages = body.get("messages") or []
+        user = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+        prompt_text = "".join(m.get("content") or "" for m in messages)
+        if body.get("tools"):
+            prompt_text += json.dumps(body["tools"])
+
+        tool_calls = mock.tool_calls_for(user, body.get("tools"))
+        reply = "" if tool_calls else (_TECH_REPLY if _TECH_RE.search(user) else _CHAT_REPLY)
+        words = [w + " " for w in reply.split(" ")] if reply else []
+
+        load_ns = mock._load(model)
+        timings = mock._evaluate(prompt_text, max(1, len(words)))
+        time.sleep(timings["prompt_eval_duration"] / 1e9)
+        final = {"model": model, "done": True, "load_duration": load_ns, **timings}
+
+        if not body.get("stream"):
+            time.sleep(timings["eval_duration"] / 1e9)
+            message = {"role": "assistant", "content": reply.strip()}
+            if tool_calls:
+                message["tool_calls"] = tool_calls
+            return self._send_json(200, {**final, "message": message})
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            if tool_calls:
+                time.sleep(timings["eval_duration"] / 1e9)
+                self._chunk({"model": model, "done": False,
+                             "message": {"role": "assistant", "content": "", "tool_calls": tool_calls}})
+            for word in words:
+                time.sleep(mock.token_ms / 1000.0)
+                self._chunk({"model": model, "done": False, "message": {"role": "assistant", "content": word}})
+            self._chunk({**final, "message": {"role": "assistant", "content": ""}})
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass   # client gave up (deadline / hedge loser)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    mock: "MockOllama"
+
+
+class MockOllama:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        models=DEFAULT_MODELS,
+        token_ms: float = 10.0,
+        prompt_ms: float = 50.0,
+        load_ms: float = 0.0,
+        error_404: float = 0.0,
+        error_500: float = 0.0,
+        tool_script: Optional[List[Dict]] = None,
+        seed: Optional[int] = None,
+    ):
+        self.host        = host
+        self.port        = port
+        self.models      = list(models)
+        self.token_ms    = max(0.0, float(token_ms))    # per generated token
+        self.prompt_ms   = max(0.0, float(prompt_ms))   # per 1k prompt tokens
+        self.load_ms     = max(0.0, float(load_ms))     # first request per model
+        self.error_404   = max(0.0, float(error_404))
+        self.error_500   = max(0.0, float(error_500))
+        self.tool_script = [dict(rule, _re=re.compile(rule["match"], re.I)) for rule in (tool_script or TOOL_SCRIPT)]
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._loaded = set()
+        self.counts: Dict[str, int] = {}
+        self._server: Optional[_Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    # ── LIFECYCLE ─────────────────────────────────────────────────────────────
+
+    def start(self) -> "MockOllama":
+        self._server = _Server((self.host, self.port), _Handler)
+        self._server.mock = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    # ── BEHAVIOUR ─────────────────────────────────────────────────────────────
+
+    def tool_calls_for(self, text: str, tools: Optional[List[Dict]]) -> List[Dict]:
+        if not tools:
+            return []
+        offered = {t.get("function", {}).get("name") for t in tools}
+        for rule in self.tool_script:
+            match = rule["_re"].search(text or "")
+            if not match or rule["name"] not in offered:
+                continue
+            group = (match.group(1) if match.groups() else "") or ""
+            arguments = {
+                k: v.replace("{1}", group.strip()) if isinstance(v, str) else v
+                for k, v in (rule.get("arguments") or {}).items()
+            }
+            return [{"function": {"name": rule["name"], "arguments": arguments}}]
+        return []
+
+    def _fault(self) -> Optional[int]:
+        with self._lock:
+            roll = self._random.random()
+        if roll < self.error_404:
+            return 404
+        if roll < self.error_404 + self.error_500:
+            return 500
+        return None
+
+    def _load(self, model: str) -> int:
+        """Load duration (ns); only the first request per model pays it."""
+        with self._lock:
+            cold = model not in self._loaded
+            self._loaded.add(model)
+        if not cold or not self.load_ms:
+            return 0
+        time.sleep(self.load_ms / 1000.0)
+        return int(self.load_ms * 1e6)
+
+    def _evaluate(self, prompt: str, output_tokens: int) -> Dict:
+        prompt_tokens = _estimate_tokens(prompt)
+        prompt_ns = int(self.prompt_ms * prompt_tokens / 1000.0 * 1e6)
+        eval_ns = int(self.token_ms * output_tokens * 1e6)
+        return {
+            "prompt_eval_count":    prompt_tokens,
+            "prompt_eval_duration": prompt_ns,
+            "eval_count":           output_tokens,
+            "eval_duration":        eval_ns,
+            "total_duration":       prompt_ns + eval_ns,
+        }
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline mock of the Ollama HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--models", default=",".join(DEFAULT_MODELS), help="comma-separated model names")
+    parser.add_argument("--token-ms", type=float, default=10.0, help="generation latency per output token")
+    parser.add_argument("--prompt-ms", type=float, default=50.0, help="prompt eval latency per 1k prompt tokens")
+    parser.add_argument("--load-ms", type=float, default=0.0, help="one-off load latency per model")
+    parser.add_argument("--error-404", type=float, default=0.0, help="fraction of requests answered 404")
+    parser.add_argument("--error-500", type=float, default=0.0, help="fraction of requests answered 500")
+    parser.add_argument("--tool-script", help="JSON file: [{match, name, arguments}, ...]")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    script = None
+    if args.tool_script:
+        with open(args.tool_script, "r", encoding="utf-8") as f:
+            script = json.load(f)
+
+    server = MockOllama(
+        host=args.host, port=args.port,
+        models=[m.strip() for m in args.models.split(",") if m.strip()],
+        token_ms=args.token_ms, prompt_ms=args.prompt_ms, load_ms=args.load_ms,
+        error_404=args.error_404, error_500=args.error_500,
+        tool_script=script, seed=args.seed,
+    ).start()
+    print(f"[MOCK OLLAMA] Listening on {server.url} (models: {', '.join(server.models)})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,1940 @@
+"""
+⚡ Performance Layer Test Suite — offline checks for the latency features.
+
+Covers:
+  1. Sentence splitting for the streamed TTS pipeline
+  2. Prompt-cache friendly layout, keep_alive and prompt_eval stats
+  3. Memoized system prompt on bucketed emotional state
+  4. Model warm-up / keep-alive refresh
+  5. Cached model registry + /api/show capabilities
+  6. Deterministic command fast-path
+  7. Persistent response cache (technical Q&A)
+  8. Latency-aware model router
+  9. Hedged requests (small vs large under a deadline)
+ 10. Circuit breaker + turn deadline
+ 11. Token-budgeted history + dynamic num_ctx / num_predict
+ 12. Background rolling summary of evicted turns
+ 13. Tool-schema pruning for command turns
+ 14. Per-turn tracing spans + rolling histograms
+ 15. Mock Ollama server + offline load benchmark
+ 16. Single-flight coalescing of retried requests
+ 17. Bounded-parallel batch chat (chat_many)
+ 18. Precompiled tool dispatch registry
+ 19. Parallel execution of independent tool calls
+ 20. Async slow tools (acknowledge now, deliver later)
+ 21. Persistent YouTube query → videoId cache
+ 22. Warm in-process yt-dlp resolver
+ 23. Streamed replies cleaned sentence by sentence (chat_stream)
+ 24. Per-session brains: LRU / TTL eviction, pinned and busy sessions
+ 25. Async brain (achat / think_and_reply_async) against the mock server
+"""
+
+import os
+import sys
+import time
+
+_REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if _REPO not in sys.path:
+    sys.path.insert(0, _REPO)
+
+os.environ["NEON_HEADLESS"] = "1"
+os.environ.setdefault("NEON_WARMUP", "0")   # no background preload against a real Ollama
+
+passed = 0
+failed = 0
+total  = 0
+
+
+def _test(name: str, condition: bool, detail: str = ""):
+    global passed, failed, total
+    total += 1
+    if condition:
+        passed += 1
+        print(f"  ✅ {name}")
+    else:
+        failed += 1
+        print(f"  ❌ [FAILED] {name}{' -- ' + detail if detail else ''}")
+
+
+def _section(title: str):
+    print(f"\n{'='*70}")
+    print(f"  {title}")
+    print(f"{'='*70}")
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  1. SENTENCE SPLITTING (LLM → TTS PIPELINE)
+# ═══════════════════════════════════════════════════════════════════════
+def test_sentence_splitting():
+    _section("1. Sentence Splitting for the TTS Pipeline")
+    from style.postprocess import split_complete_sentences
+
+    sentences, rest = split_complete_sentences("Hello there, Boss. How are you? I am")
+    _test("two complete sentences", sentences == ["Hello there, Boss.", "How are you?"], str(sentences))
+    _test("unfinished tail kept", rest == "I am", repr(rest))
+
+    sentences, rest = split_complete_sentences("Pi is 3.14 roughly. ")
+    _test("decimal point not a sentence end", sentences == ["Pi is 3.14 roughly."], str(sentences))
+
+    sentences, rest = split_complete_sentences("Hi. ")
+    _test("tiny sentence waits for more text", sentences == [] and rest == "Hi. ", repr(rest))
+
+    sentences, rest = split_complete_sentences("Hi. Opening YouTube now! ")
+    _test("tiny sentence merged with next", sentences == ["Hi. Opening YouTube now!"], str(sentences))
+
+    sentences, rest = split_complete_sentences("No end yet")
+    _test("no terminal punctuation → nothing flushed", sentences == [] and rest == "No end yet")
+
+    # Simulate token-by-token streaming: joined output must equal the input
+    text = "On it, Boss~ YouTube coming right up! Anything else? "
+    buf, out = "", []
+    for ch in text:
+        buf += ch
+        done, buf = split_complete_sentences(buf)
+        out.extend(done)
+    _test("streamed split is lossless", " ".join(out + [buf.strip()]).strip() == text.strip(), str(out))
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  2. PROMPT LAYOUT (STABLE PREFIX) + KEEP_ALIVE + EVAL STATS
+# ═══════════════════════════════════════════════════════════════════════
+def test_prompt_layout():
+    _section("2. Prompt Layout, keep_alive & prompt_eval Stats")
+    from brain.llm import NeonBrain, KEEP_ALIVE, _parse_keep_alive
+
+    _test("keep_alive '-1' → int", _parse_keep_alive("-1") == -1)
+    _test("keep_alive '30m' kept", _parse_keep_alive("30m") == "30m")
+    _test("keep_alive empty → default", _parse_keep_alive("") == "30m")
+
+    brain = NeonBrain(check_connection=False)
+    turn, _ = brain._prepare_turn("tell me a fun fact about space", target="mobile")
+    msgs = turn["payload"]["messages"]
+    system = msgs[0]["content"]
+    _test("keep_alive sent", turn["payload"].get("keep_alive") == KEEP_ALIVE)
+    _test("no clock in system prompt", "[TIME CONTEXT" not in system)
+    _test("no platform in system prompt", "[USER PLATFORM" not in system)
+    _test("volatile context on last user message",
+          "[TIME CONTEXT" in msgs[-1]["content"] and msgs[-1]["content"].endswith("tell me a fun fact about space"))
+
+    brain._complete_turn(turn, {"role": "assistant", "content": "Space is big, Boss."})
+    _test("history keeps clean user text", brain.history[-2]["content"] == "tell me a fun fact about space",
+          brain.history[-2]["content"][:60])
+
+    turn2, _ = brain._prepare_turn("and one more about the ocean", target="desktop")
+    msgs2 = turn2["payload"]["messages"]
+    _test("history replayed verbatim after system prompt", msgs2[1:3] == brain.history[-2:])
+    _test("only the last message carries context",
+          all("[TIME CONTEXT" not in m["content"] for m in msgs2[:-1]))
+
+    brain._record_eval_stats({"prompt_eval_count": 12, "prompt_eval_duration": 8_000_000,
+                              "eval_count": 30, "eval_duration": 300_000_000}, turn2)
+    _test("prompt_eval stats recorded",
+          brain.last_eval_stats["prompt_eval_count"] == 12 and brain.last_eval_stats["prompt_eval_ms"] == 8.0)
+    brain._record_eval_stats({"message": {"content": "x"}}, turn2)
+    _test("responses without timings ignored", brain.eval_stats_summary()["turns"] == 1)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  3. MEMOIZED SYSTEM PROMPT (QUANTIZED STATE)
+# ═══════════════════════════════════════════════════════════════════════
+def test_prompt_cache():
+    _section("3. Memoized System Prompt")
+    import re
+    from brain.prompt import (
+        get_system_prompt, get_cached_system_prompt, quantize_intensity,
+        quantize_affection, prompt_cache_info, BANTER_BLOCKS,
+    )
+
+    _test("intensity buckets", [quantize_intensity(x) for x in (0.0, 0.29, 0.3, 0.6, 0.61, 0.8, 0.81, 5)]
+          == [0.2, 0.2, 0.5, 0.5, 0.7, 0.7, 0.9, 0.9])
+    _test("affection buckets", [quantize_affection(x) for x in (0, 34.9, 35, 59.9, 60, 84.9, 85, 999)]
+          == [20.0, 20.0, 50.0, 50.0, 70.0, 70.0, 90.0, 90.0])
+    _test("garbage state → defaults", quantize_intensity("x") == 0.5 and quantize_affection(None) == 50.0)
+
+    # Bucketing must not change anything but the printed intensity value
+    strip = lambda p: re.sub(r"Intensity \d\.\d\d", "Intensity _", p)
+    mismatches = []
+    for emo in ("calm", "happy", "sad", "mad", "weird"):
+        for i in (0.0, 0.15, 0.295, 0.3, 0.45, 0.6, 0.605, 0.75, 0.8, 0.85, 1.0):
+            for a in (0, 20, 34.96, 35, 50, 59.9, 60, 80, 84.9, 85, 100):
+                want = strip(get_system_prompt(emo, i, a)) + BANTER_BLOCKS["balanced"]
+                got = strip(get_cached_system_prompt(emo, i, a, "balanced"))
+                if got != want:
+                    mismatches.append((emo, i, a))
+    _test("bucketed prompt text == exact prompt text", not mismatches, str(mismatches[:3]))
+
+    p1 = get_cached_system_prompt("happy", 0.41, 51.0, "roaster", suffix="\n\nRULE")
+    p2 = get_cached_system_prompt(" Happy ", 0.55, 58.3, "ROASTER", suffix="\n\nRULE")
+    _test("same bucket → same object", p1 is p2)
+    _test("suffix before banter block", p1.endswith("RULE" + BANTER_BLOCKS["roaster"]))
+    _test("unknown banter mode → balanced",
+          get_cached_system_prompt("calm", 0.5, 50, "???").endswith(BANTER_BLOCKS["balanced"]))
+    info = prompt_cache_info()
+    _test("LRU bounded", info.maxsize is not None and info.currsize <= info.maxsize, str(info))
+
+    n = 2000
+    t0 = time.perf_counter()
+    for k in range(n):
+        get_system_prompt("happy", 0.4 + (k % 10) / 100, 50 + k % 5)
+    raw = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for k in range(n):
+        get_cached_system_prompt("happy", 0.4 + (k % 10) / 100, 50 + k % 5)
+    cached = time.perf_counter() - t0
+    print(f"     ↳ {n} builds: raw {raw*1000:.1f}ms vs cached {cached*1000:.1f}ms")
+    _test("cached builder faster", cached < raw)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  4. MODEL WARM-UP
+# ═══════════════════════════════════════════════════════════════════════
+class _FakeResponse:
+    def __init__(self, data, status=200):
+        self._data, self.status_code = data, status
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def json(self):
+        return self._data
+
+
+class _FakeWarmSession:
+    def __init__(self, fail_models=()):
+        self.posts = []
+        self.fail_models = set(fail_models)
+
+    def post(self, url, json=None, timeout=None):
+        self.posts.append((url, json))
+        if json["model"] in self.fail_models:
+            raise ConnectionError("refused")
+        cold = sum(1 for _, p in self.posts if p["model"] == json["model"]) == 1
+        return _FakeResponse({"done": True, "load_duration": 1_500_000_000 if cold else 2_000_000})
+
+
+def test_model_warmup():
+    _section("4. Model Warm-up / keep_alive Refresh")
+    from brain.warmup import ModelWarmer
+
+    sess = _FakeWarmSession()
+    w = ModelWarmer(sess, ["big", "small", "big"], "http://x/api/generate",
+                    keep_alive="30m", options={"num_ctx": 3072}, interval=60)
+    _test("models deduped", w.models == ["big", "small"])
+    w.warm_all()
+    _test("one empty-prompt generate per model", [p["model"] for _, p in sess.posts] == ["big", "small"])
+    first = sess.posts[0][1]
+    _test("warm-up sends keep_alive + num_ctx",
+          first["prompt"] == "" and first["keep_alive"] == "30m" and first["options"] == {"num_ctx": 3072})
+    stats = w.stats()
+    _test("cold load time recorded", stats["big"].get("cold_load_ms") == 1500.0, str(stats["big"]))
+
+    w.warm("big")
+    stats = w.stats()
+    _test("refresh keeps the cold load time", stats["big"]["cold_load_ms"] == 1500.0 and stats["big"]["load_ms"] == 2.0)
+    _test("warm-up count", stats["big"]["warmups"] == 2)
+
+    bad = ModelWarmer(_FakeWarmSession(fail_models={"gone"}), ["gone"], "http://x/api/generate")
+    _test("failed warm-up → False", bad.warm("gone") is False and bad.stats()["gone"]["failures"] == 1)
+
+    # Idle refresh: only models not used for `interval` are re-warmed
+    sess2 = _FakeWarmSession()
+    w2 = ModelWarmer(sess2, ["big", "small"], "http://x/api/generate", interval=5)
+    w2.touch("big")
+    w2._last_used["small"] = time.time() - 10
+    idle = w2.idle_models()
+    _test("recently used model not refreshed", idle == ["small"], str(idle))
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  5. MODEL REGISTRY
+# ═══════════════════════════════════════════════════════════════════════
+class _FakeOllamaMeta:
+    """/api/tags + /api/show only; counts round trips."""
+    def __init__(self, models, shows):
+        self.models, self.shows = models, shows
+        self.tags_calls = 0
+        self.show_calls = 0
+
+    def get(self, url, timeout=None):
+        self.tags_calls += 1
+        return _FakeResponse({"models": [{"name": m} for m in self.models]})
+
+    def post(self, url, json=None, timeout=None):
+        self.show_calls += 1
+        if json["model"] not in self.shows:
+            return _FakeResponse({"error": "not found"}, status=404)
+        return _FakeResponse(self.shows[json["model"]])
+
+
+class _DownSession:
+    def get(self, *a, **kw):
+        raise ConnectionError("refused")
+
+    post = get
+
+
+def test_model_registry():
+    _section("5. Model Registry & Capabilities")
+    from brain.model_registry import ModelRegistry
+
+    fake = _FakeOllamaMeta(
+        ["llama3.2:3b", "gemma:2b", "phi3:latest"],
+        {
+            "llama3.2:3b": {"capabilities": ["completion", "tools"], "details": {"parameter_size": "3.2B"},
+                            "model_info": {"llama.context_length": 131072}},
+            "gemma:2b":    {"capabilities": ["completion"], "details": {"parameter_size": "2B"},
+                            "model_info": {"gemma.context_length": 8192}},
+            "phi3:latest": {"template": "{{ if .Tools }}...{{ end }}", "details": {}},
+        },
+    )
+    down = ModelRegistry(_DownSession(), "tags", "show", ttl=60)
+    _test("unknown while Ollama unreachable", down.is_installed("llama3.2:3b") is None)
+    _test("unreachable → fallback is the preferred model", down.pick_fallback("llama3.2:3b") == "llama3.2:3b")
+
+    reg = ModelRegistry(fake, "tags", "show", ttl=60)
+    reg.refresh()
+    _test("installed list cached", reg.installed() == ["llama3.2:3b", "gemma:2b", "phi3:latest"])
+    calls = fake.tags_calls
+    for _ in range(20):
+        reg.installed(); reg.is_installed("gemma:2b"); reg.pick_fallback("llama3.2:3b")
+    _test("no /api/tags round trip while fresh", fake.tags_calls == calls, str(fake.tags_calls))
+    _test("':latest' tag optional", reg.is_installed("phi3") is True)
+    _test("missing model detected", reg.is_installed("mistral:7b") is False)
+    _test("fallback prefers LARGE", reg.pick_fallback("llama3.2:3b") == "llama3.2:3b")
+    _test("fallback → first installed", reg.pick_fallback("mistral:7b") == "llama3.2:3b")
+
+    caps = reg.capabilities("llama3.2:3b", block=True)
+    _test("capabilities parsed",
+          caps == {"tools": True, "context_length": 131072, "parameter_size": "3.2B",
+                   "capabilities": ["completion", "tools"]}, str(caps))
+    reg.capabilities("gemma:2b", block=True)
+    reg.capabilities("phi3:latest", block=True)
+    _test("no tools on gemma (no name guess)", reg.supports_tools("gemma:2b") is False)
+    _test("old Ollama: tools from template", reg.supports_tools("phi3:latest") is True)
+    shows = fake.show_calls
+    reg.supports_tools("llama3.2:3b")
+    _test("capabilities served from cache", fake.show_calls == shows)
+
+    _test("unknown model → name heuristic", reg.supports_tools("llama-guard:1b") is True)
+    calls = fake.tags_calls
+    reg.invalidate()
+    _test("stale list still served after invalidate", "gemma:2b" in reg.installed())
+    for _ in range(50):
+        if fake.tags_calls > calls:
+            break
+        time.sleep(0.01)
+    _test("invalidate triggers a background refetch", fake.tags_calls == calls + 1, str(fake.tags_calls - calls))
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  6. COMMAND FAST-PATH
+# ═══════════════════════════════════════════════════════════════════════
+def test_fast_path():
+    _section("6. Deterministic Command Fast-Path")
+    from brain.llm import NeonBrain, _match_fast_command, OFFLINE_REPLY
+
+    cases = {
+        "open youtube on mobile":           ("open_app", {"app_name": "youtube"}),
+        "Hey Neon, can you open whatsapp please": ("open_app", {"app_name": "whatsapp"}),
+        "mute":                             ("volume_control", {"action": "mute"}),
+        "set volume to 40":                 ("volume_control", {"action": "set", "level": 40}),
+        "turn the volume down":             ("volume_control", {"action": "down"}),
+        "set brightness to 80%":            ("brightness_control", {"action": "set", "level": 80}),
+        "take a screenshot":                ("take_screenshot", {}),
+        "lock my pc":                       ("lock_screen", {}),
+        "switch to roaster mode":           ("set_personality", {"mode": "roaster"}),
+        "play moon funk on spotify":        ("play_music", {"query": "moon funk", "platform": "spotify"}),
+        "play lofi beats on yt on mobile":  ("play_music", {"query": "lofi beats", "platform": "youtube"}),
+        "play python tutorial":             ("play_music", {"query": "python tutorial"}),
+        "play eye of the tiger":            ("play_music", {"query": "eye of the tiger"}),
+        "play on my way":                   ("play_music", {"query": "on my way"}),
+        "search youtube for lofi beats":    ("search_youtube", {"query": "lofi beats"}),
+    }
+    for text, (name, args) in cases.items():
+        got = _match_fast_command(text.lower())
+        _test(f"fast: {text!r}", got == {"name": name, "arguments": args}, str(got))
+
+    for text in (
+        "open youtube and play lofi", "how do i take a screenshot", "what is mute",
+        "play it again", "play some music", "open the door", "open scam",
+        "set volume to 140", "shutdown", "delete notes.txt", "turn off wifi",
+        "i hate it when you mute me", "play desktop dreams",
+    ):
+        _test(f"LLM: {text!r}", _match_fast_command(text.lower()) is None)
+
+    from brain.llm import _detect_platform, _detect_target
+    _test("'python' is not YouTube", _detect_platform("play python tutorial") is None)
+    _test("'epic' is not a pc", _detect_target("play epic music") == "auto")
+
+    # End to end: the fast path must not touch Ollama at all
+    brain = NeonBrain(check_connection=False)
+    brain.session = _DownSession()
+    t0 = time.perf_counter()
+    reply = brain.chat("switch to curious mode")
+    elapsed = time.perf_counter() - t0
+    _test("fast turn answered without the LLM", bool(reply) and reply != OFFLINE_REPLY, str(reply))
+    _test("fast turn under 100ms", elapsed < 0.1, f"{elapsed*1000:.1f}ms")
+    _test("fast turn recorded in history", brain.history[-2]["content"] == "switch to curious mode")
+    _test("tool side effects applied", brain.memory.state.get("prefs", {}).get("banter_mode") == "curious")
+    brain.memory.state.setdefault("prefs", {})["banter_mode"] = "balanced"
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  7. RESPONSE CACHE
+# ═══════════════════════════════════════════════════════════════════════
+class _FakeChatSession:
+    """Answers /api/chat with a fixed reply; counts calls."""
+    def __init__(self, content="A decorator wraps a function to extend it."):
+        self.content = content
+        self.calls = 0
+
+    def post(self, url, json=None, timeout=None, **kw):
+        self.calls += 1
+        return _FakeResponse({"message": {"role": "assistant", "content": self.content}, "done": True,
+                              "prompt_eval_count": 10, "eval_count": 5})
+
+
+def test_response_cache():
+    _section("7. Persistent Response Cache")
+    import tempfile
+    from brain import response_cache as rc
+    from brain.llm import NeonBrain
+
+    _test("normalization", rc.normalize_question("  What is a Python   decorator?? ") == "what is a python decorator")
+    k1 = rc.make_key("What is a decorator?", "m", {"temperature": 0.2}, "fp")
+    _test("key ignores case/punctuation", k1 == rc.make_key("what is a decorator", "m", {"temperature": 0.2}, "fp"))
+    _test("key includes model/options/prompt",
+          len({k1, rc.make_key("what is a decorator", "m2", {"temperature": 0.2}, "fp"),
+               rc.make_key("what is a decorator", "m", {"temperature": 0.6}, "fp"),
+               rc.make_key("what is a decorator", "m", {"temperature": 0.2}, "fp2")}) == 4)
+    _test("referential follow-ups not cached", not rc.is_self_contained("explain this code"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.json")
+        cache = rc.ResponseCache(path=path, max_entries=2, ttl_seconds=60)
+        cache.put("a", "A"); cache.put("b", "B")
+        cache.get("a")                      # a is now most recent
+        cache.put("c", "C")                 # evicts b
+        _test("LRU eviction", cache.get("b") is None and cache.get("a") == "A" and cache.get("c") == "C")
+        _test("hit/miss counters", cache.stats()["hits"] == 3 and cache.stats()["misses"] == 1, str(cache.stats()))
+
+        reloaded = rc.ResponseCache(path=path, max_entries=2, ttl_seconds=60)
+        _test("survives restart", reloaded.get("a") == "A" and reloaded.get("c") == "C")
+        reloaded._entries["a"]["created"] -= 120
+        _test("TTL expiry", reloaded.get("a") is None)
+
+        # End to end: second identical technical question skips Ollama
+        brain = NeonBrain(check_connection=False)
+        brain.response_cache = rc.ResponseCache(path=os.path.join(tmp, "brain.json"))
+        brain.session = _FakeChatSession()
+        first = brain.chat("What is a Python decorator?")
+        for _ in range(50):                 # store runs on a background thread
+            if len(brain.response_cache):
+                break
+            time.sleep(0.01)
+        brain._last_input = ""              # step past the 3s duplicate gate
+        second = brain.chat("what is a python decorator")
+        _test("repeat technical question served from cache", brain.session.calls == 1 and first == second,
+              f"calls={brain.session.calls}")
+        _test("cache hit still recorded in history", brain.history[-2]["content"] == "what is a python decorator")
+
+        brain.session.calls = 0
+        brain.chat("hey how was your day")
+        brain._last_input = ""
+        brain.chat("hey how was your day")
+        _test("casual (emotion-dependent) chat never cached", brain.session.calls == 2)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  8. LATENCY-AWARE ROUTER
+# ═══════════════════════════════════════════════════════════════════════
+def test_router():
+    _section("8. Latency-Aware Model Router")
+    import tempfile
+    from brain.router import ModelRouter, percentile
+
+    _test("p50 / p95", percentile([1, 2, 3, 4, 100], 50) == 3 and percentile(list(range(1, 101)), 95) == 95)
+    _test("percentile of nothing", percentile([], 95) == 0.0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log = os.path.join(tmp, "router.log")
+        r = ModelRouter("big", "small", slo_ms=1000, window=10, min_samples=3, probe_interval=60, log_path=log)
+        _test("no data → preferred", r.route("big") == "big")
+        for ms in (400, 500, 450):
+            r.record("big", ms)
+        _test("within SLO → preferred", r.route("big") == "big")
+
+        for ms in (3000, 3500, 4000, 3800):
+            r.record("big", ms)
+        _test("p95 over SLO → small model", r.route("big") == "small")
+        _test("small stays small", r.route("small") == "small")
+        _test("commands keep big if small can't do tools",
+              r.route("big", needs_tools=True, supports_tools=lambda m: m != "small") == "big")
+
+        r._last_probe["big"] -= 61          # probe interval elapsed
+        _test("periodic probe back to big", r.route("big") == "big" and r.decisions[-1]["reason"].startswith("probe"))
+        _test("one probe per interval", r.route("big") == "small")
+        r.record("big", 600)                # probe met the SLO
+        _test("recovered after fast probe", r.route("big") == "big" and r.stats("big")["samples"] == 1)
+
+        for ms in (3000, 3500, 4000):
+            r.record("small", ms)
+        _test("slow small never upgraded to big", r.route("small") == "small"
+              and r.decisions[-1]["reason"].startswith("slo"))
+
+        with open(log, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        _test("every decision audited", sum("->" in l for l in lines) == len(r.decisions), f"{len(lines)} lines")
+        _test("ok decisions audited too", any("| ok |" in l for l in lines))
+        _test("recovery audited", any("recovered" in l for l in lines))
+
+        small_log = os.path.join(tmp, "small.log")
+        bounded = ModelRouter("big", "small", slo_ms=1000, min_samples=1, probe_interval=3600,
+                              log_path=small_log, log_max_bytes=1024)
+        bounded.record("big", 5000)
+        for _ in range(40):
+            bounded.route("big")
+        _test("audit log bounded", os.path.getsize(small_log) <= 1024 + 200 and os.path.exists(small_log + ".1"))
+
+    from brain.router import ROUTER_LOG
+    _test("audit file on by default", bool(ROUTER_LOG) and ROUTER_LOG.endswith(os.path.join("memory", "state", "router.log"))
+          or os.getenv("NEON_ROUTER_LOG") is not None)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  9. HEDGED REQUESTS
+# ═══════════════════════════════════════════════════════════════════════
+class _FakeStreamResponse:
+    """NDJSON stream that takes `latency` seconds per chunk; close() aborts it."""
+    def __init__(self, model, words, latency):
+        self.model, self.words, self.latency = model, words, latency
+        self.status_code = 200
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.closed = True
+
+    def raise_for_status(self):
+        pass
+
+    def iter_lines(self, chunk_size=None):
+        import json as _json
+        for w in self.words:
+            time.sleep(self.latency)
+            if self.closed:
+                raise ConnectionError("stream closed")
+            yield _json.dumps({"message": {"content": w}, "done": False}).encode()
+        yield _json.dumps({"done": True, "total_duration": 1_000_000, "eval_count": len(self.words)}).encode()
+
+
+class _FakeHedgeSession:
+    def __init__(self, latency_by_model):
+        self.latency = latency_by_model
+        self.responses = {}
+
+    def post(self, url, json=None, timeout=None, stream=False):
+        model = json["model"]
+        if self.latency.get(model) is None:
+            raise ConnectionError("refused")
+        resp = _FakeStreamResponse(model, ["answer ", "from ", model], self.latency[model])
+        self.responses[model] = resp
+        return resp
+
+
+def test_hedging():
+    _section("9. Hedged Requests")
+    from brain.hedging import hedged_post, HedgeStats
+
+    payload = {"model": "big", "messages": [{"role": "user", "content": "hi"}]}
+
+    stats = HedgeStats()
+    sess = _FakeHedgeSession({"big": 0.01, "small": 0.01})
+    r = hedged_post(sess, "url", payload, "small", delay_s=0.5, deadline_s=5, stats=stats)
+    _test("fast primary → no hedge sent", r["model"] == "big" and "small" not in sess.responses)
+    _test("stream folded into a message", r["message"]["content"] == "answer from big" and r["total_duration"] == 1_000_000)
+
+    sess = _FakeHedgeSession({"big": 0.5, "small": 0.01})
+    t0 = time.perf_counter()
+    r = hedged_post(sess, "url", payload, "small", delay_s=0.1, deadline_s=5, stats=stats)
+    elapsed = time.perf_counter() - t0
+    _test("slow primary → small wins", r["model"] == "small", str(r and r["model"]))
+    _test("winner well before primary would finish", elapsed < 0.6, f"{elapsed:.2f}s")
+    time.sleep(0.05)
+    _test("loser stream cancelled", sess.responses["big"].closed)
+
+    sess = _FakeHedgeSession({"big": 0.1, "small": 0.5})
+    r = hedged_post(sess, "url", payload, "small", delay_s=0.05, deadline_s=5, stats=stats)
+    _test("primary can still win after the hedge", r["model"] == "big")
+
+    sess = _FakeHedgeSession({"big": None, "small": 0.01})
+    r = hedged_post(sess, "url", payload, "small", delay_s=1.0, deadline_s=5, stats=stats)
+    _test("primary error → hedge sent immediately", r is not None and r["model"] == "small")
+
+    sess = _FakeHedgeSession({"big": 1.0, "small": 1.0})
+    t0 = time.perf_counter()
+    r = hedged_post(sess, "url", payload, "small", delay_s=0.05, deadline_s=0.3, stats=stats)
+    _test("deadline → None", r is None and time.perf_counter() - t0 < 0.5)
+
+    snap = stats.snapshot()
+    _test("win stats", (snap["primary_fast"], snap["hedge_wins"], snap["primary_wins"], snap["failures"]) == (1, 2, 1, 1),
+          str(snap))
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  10. CIRCUIT BREAKER + TURN DEADLINE
+# ═══════════════════════════════════════════════════════════════════════
+class _ProbeSession:
+    def __init__(self):
+        self.up = False
+
+    def get(self, url, timeout=None):
+        if not self.up:
+            raise ConnectionError("refused")
+        return _FakeResponse({"models": []})
+
+
+class _HangingSession:
+    """Every /api/chat times out; records the timeouts it was given."""
+    def __init__(self):
+        self.calls = 0
+        self.timeouts = []
+
+    def post(self, url, json=None, timeout=None, **kw):
+        import requests
+        self.calls += 1
+        self.timeouts.append(timeout)
+        raise requests.exceptions.ReadTimeout("read timed out")
+
+
+def test_circuit_breaker():
+    _section("10. Circuit Breaker + Turn Deadline")
+    import requests
+    from brain import circuit_breaker as cb
+    from brain.llm import NeonBrain, OFFLINE_REPLY, HTTP_RETRIES, TURN_DEADLINE, _request_timeout
+
+    probe = _ProbeSession()
+    breaker = cb.CircuitBreaker(probe, "tags", failure_threshold=2, probe_interval=0.05)
+    breaker.record_failure()
+    _test("stays closed below threshold", breaker.state == cb.CLOSED and breaker.allow())
+    breaker.record_failure()
+    _test("opens at threshold", breaker.state == cb.OPEN and not breaker.allow())
+    time.sleep(0.15)
+    _test("probe keeps it open while Ollama is down", breaker.state == cb.OPEN)
+    probe.up = True
+    for _ in range(50):
+        if breaker.state != cb.OPEN:
+            break
+        time.sleep(0.02)
+    _test("probe answer → half-open", breaker.state == cb.HALF_OPEN and breaker.allow())
+    breaker.record_failure()
+    _test("half-open failure → open again", breaker.state == cb.OPEN)
+    for _ in range(50):
+        if breaker.state != cb.OPEN:
+            break
+        time.sleep(0.02)
+    breaker.record_success()
+    _test("half-open success → closed", breaker.state == cb.CLOSED and breaker.snapshot()["opens"] == 2)
+
+    deadline = time.time() + 6
+    connect, read = _request_timeout(deadline)
+    _test("retries fit inside the deadline", connect * (HTTP_RETRIES + 1) <= read <= 6, f"{connect}, {read}")
+    try:
+        _request_timeout(time.time() - 1)
+        expired = False
+    except requests.exceptions.Timeout:
+        expired = True
+    _test("expired deadline raises Timeout", expired)
+
+    brain = NeonBrain(check_connection=False)
+    brain.session = _HangingSession()
+    brain.breaker = cb.CircuitBreaker(_ProbeSession(), "tags", failure_threshold=3, probe_interval=60)
+    _test("past deadline → no request sent", brain._post({"model": "m"}, deadline=time.time() - 1) is None
+          and brain.session.calls == 0)
+    brain.breaker = cb.CircuitBreaker(_ProbeSession(), "tags", failure_threshold=3, probe_interval=60)
+    for text in ("tell me a story", "how are you doing", "what should i eat"):
+        brain._last_input = ""
+        reply = brain.chat(text)
+    _test("hung Ollama → offline reply", reply == OFFLINE_REPLY)
+    _test("timeouts bounded by the turn deadline", all(t[1] <= TURN_DEADLINE for t in brain.session.timeouts))
+    _test("breaker opened after 3 timeouts", brain.breaker_state()["state"] == cb.OPEN)
+
+    calls = brain.session.calls
+    brain._last_input = ""
+    t0 = time.perf_counter()
+    reply = brain.chat("tell me a joke")
+    ms = (time.perf_counter() - t0) * 1000
+    _test("open breaker fails fast", reply == OFFLINE_REPLY and brain.session.calls == calls and ms < 100, f"{ms:.1f}ms")
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  11. TOKEN BUDGET
+# ═══════════════════════════════════════════════════════════════════════
+def test_token_budget():
+    _section("11. Token Budget + Dynamic num_ctx")
+    from brain import token_budget as tb
+    from brain.llm import NeonBrain
+
+    _test("estimate ≈ chars / 3.5", tb.estimate_tokens("x" * 350) == 100 and tb.estimate_tokens("") == 0)
+    tb.estimate_tokens.cache_clear()
+    msg = {"role": "user", "content": "hello " * 50}
+    tb.message_tokens(msg); tb.message_tokens(msg)
+    _test("per-entry counts memoized", tb.estimate_tokens.cache_info().hits >= 1)
+
+    history = []
+    for i in range(5):
+        history += [{"role": "user", "content": f"q{i} " * 20}, {"role": "assistant", "content": f"a{i} " * 20}]
+    history[2]["content"] = "pasted log line\n" * 500           # one huge old message
+    kept = tb.fit_history(history, 300)
+    _test("history trimmed to budget", tb.messages_tokens(kept) <= 300 and kept[-1] is history[-1])
+    _test("no gap over the oversized message", history[2] not in kept and history[3] not in kept)
+    _test("starts on a user message", kept[0]["role"] == "user")
+    _test("zero budget → no history", tb.fit_history(history, 0) == [])
+
+    _test("ctx buckets", (tb.ctx_bucket(1500, 2048, 8192), tb.ctx_bucket(2049, 2048, 8192),
+                          tb.ctx_bucket(50000, 2048, 8192)) == (2048, 4096, 8192))
+    _test("num_predict fits next to the prompt", tb.num_predict_for(4000, 4096) == 96
+          and tb.num_predict_for(500, 2048) == tb.NUM_PREDICT)
+
+    sizer = tb.ContextSizer(floor=2048, ceiling=8192, shrink_after=3)
+    _test("starts at the floor", sizer.num_ctx("m", 1000) == 2048)
+    _test("grows at once", sizer.num_ctx("m", 3000) == 4096)
+    _test("sticky for smaller prompts", [sizer.num_ctx("m", 1000) for _ in range(2)] == [4096, 4096])
+    _test("shrinks after a streak", sizer.num_ctx("m", 1000) == 2048 and sizer.reloads == 2)
+    _test("capped by the model's context length", sizer.num_ctx("tiny", 6000, model_limit=4096) == 4096)
+
+    brain = NeonBrain(check_connection=False)
+    brain.sizer = tb.ContextSizer()
+    turn, _ = brain._prepare_turn("hey how is it going")
+    chat_opts = turn["payload"]["options"]
+    _test("short chat → small num_ctx", chat_opts["num_ctx"] == tb.NUM_CTX_MIN and
+          turn["prompt_tokens"] + chat_opts["num_predict"] <= chat_opts["num_ctx"], str(chat_opts))
+    brain.history = [{"role": "user", "content": "old question"}, {"role": "assistant", "content": "old answer"},
+                     {"role": "user", "content": "log " * 6000}, {"role": "assistant", "content": "that's long"}]
+    brain._last_input = ""
+    turn, _ = brain._prepare_turn("so what do you think")
+    sent = turn["payload"]["messages"][1:-1]
+    _test("oversized history entry not sent", all(len(m["content"]) < 1000 for m in sent), str(len(sent)))
+    brain._last_input = ""
+    turn, _ = brain._prepare_turn("open notepad and type hello")
+    if "tools" in turn["payload"]:
+        tools = turn["payload"]["tools"]
+        opts = turn["payload"]["options"]
+        _test("tool schemas counted in num_ctx",
+              turn["prompt_tokens"] > tb.tools_tokens(tools) + tb.message_tokens(turn["payload"]["messages"][0])
+              and opts["num_ctx"] >= turn["prompt_tokens"] + opts["num_predict"])
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  12. ROLLING SUMMARY
+# ═══════════════════════════════════════════════════════════════════════
+class _FakeSummarySession:
+    """Summaries take `delay` seconds; plain turns answer at once."""
+    def __init__(self, delay=0.0, fail=False):
+        self.delay, self.fail = delay, fail
+        self.summary_calls = []
+
+    def post(self, url, json=None, timeout=None, **kw):
+        system = json["messages"][0]["content"]
+        if "running summary" in system:
+            self.summary_calls.append(json)
+            time.sleep(self.delay)
+            if self.fail:
+                raise ConnectionError("refused")
+            n = len(self.summary_calls)
+            return _FakeResponse({"message": {"role": "assistant", "content": f"Boss likes tea. (fold {n})"}})
+        return _FakeResponse({"message": {"role": "assistant", "content": "Sure thing, Boss."}, "done": True})
+
+
+def test_rolling_summary():
+    _section("12. Rolling Summary")
+    from brain.summarizer import RollingSummarizer
+    from brain.llm import NeonBrain, MAX_HISTORY
+
+    sess = _FakeSummarySession()
+    summ = RollingSummarizer(sess, "chat", "small", batch=4, options=lambda: {"num_ctx": 2048})
+    summ.add([{"role": "user", "content": "i like tea"}, {"role": "assistant", "content": "noted"}])
+    summ.wait()
+    _test("no fold below one batch", sess.summary_calls == [] and summ.stats()["pending"] == 2)
+    summ.add([{"role": "user", "content": "my name is sam"}, {"role": "assistant", "content": "hi sam"}])
+    summ.wait()
+    _test("batch folded into summary", summ.summary == "Boss likes tea. (fold 1)" and summ.stats()["pending"] == 0)
+    body = sess.summary_calls[0]["messages"][1]["content"]
+    _test("fold sees the evicted turns", "Boss: my name is sam" in body and "Neon: noted" in body)
+    _test("fold reuses SMALL's num_ctx", sess.summary_calls[0]["options"]["num_ctx"] == 2048)
+    summ.add([{"role": "user", "content": "x"}] * 4)
+    summ.wait()
+    _test("previous summary carried into the next fold",
+          "Boss likes tea. (fold 1)" in sess.summary_calls[1]["messages"][1]["content"])
+
+    failing = RollingSummarizer(_FakeSummarySession(fail=True), "chat", "small", batch=2)
+    failing.add([{"role": "user", "content": f"m{i}"} for i in range(20)])
+    failing.wait()
+    _test("failed fold keeps turns queued (bounded)", failing.summary == "" and failing.stats()["pending"] == 8)
+
+    brain = NeonBrain(check_connection=False)
+    brain.session = _FakeSummarySession(delay=0.5)
+    brain.summarizer = RollingSummarizer(brain.session, "chat", "small", batch=4)
+    brain.history = [{"role": "user" if i % 2 == 0 else "assistant", "content": f"old {i}"} for i in range(MAX_HISTORY)]
+    t0 = time.perf_counter()
+    brain.chat("tell me something nice")
+    brain._last_input = ""
+    brain.chat("and another thing")
+    ms = (time.perf_counter() - t0) * 1000
+    _test("summarizing never blocks chat", ms < 400, f"{ms:.0f}ms for two turns")
+    _test("history still capped", len(brain.history) == MAX_HISTORY)
+    brain.summarizer.wait()
+    brain._last_input = ""
+    turn, _ = brain._prepare_turn("what do you remember")
+    _test("summary injected into the system prompt",
+          "[EARLIER IN THIS CONVERSATION: Boss likes tea." in turn["payload"]["messages"][0]["content"])
+    brain.reset_history()
+    _test("reset clears the summary", brain.summarizer.summary == "")
+
+    from brain.llm import HISTORY_WINDOW
+    brain = NeonBrain(check_connection=False)
+    brain.session = _FakeSummarySession()
+    brain.summarizer = RollingSummarizer(brain.session, "chat", "small", batch=100)
+    for i in range(8):
+        brain._last_input = ""
+        brain.chat(f"tell me fact number {i}")
+    queued = [m["content"] for m in brain.summarizer._pending]
+    _test("summarized once out of the sent window", queued == [m["content"] for m in brain.history[:-HISTORY_WINDOW]]
+          and len(queued) == 16 - HISTORY_WINDOW, str(queued))
+    for i in range(8, 14):
+        brain._last_input = ""
+        brain.chat(f"tell me fact number {i}")
+    queued = brain.summarizer._pending
+    _test("every message summarized exactly once", len(queued) == 28 - HISTORY_WINDOW
+          and queued[0]["content"] == "tell me fact number 0", str(len(queued)))
+
+    brain = NeonBrain(check_connection=False)
+    brain.session = _FakeSummarySession()
+    brain.summarizer = RollingSummarizer(brain.session, "chat", "small", batch=100)
+    brain.history = [{"role": "user" if i % 2 == 0 else "assistant", "content": f"old {i}"} for i in range(8)]
+    brain._last_input = ""
+    brain.chat("explain how a python decorator works")
+    queued = [m["content"] for m in brain.summarizer._pending]
+    _test("technical turn folds what its 6-message window left out",
+          queued == ["old 0", "old 1", "old 2", "old 3"], str(queued))
+
+    slow = _FakeSummarySession(delay=0.2)
+    racing = RollingSummarizer(slow, "chat", "small", batch=2)
+    racing.add([{"role": "user", "content": "a"}, {"role": "assistant", "content": "b"}])
+    time.sleep(0.05)                      # fold of a/b in flight
+    racing.add([{"role": "user", "content": "c"}])
+    racing.wait()
+    _test("turns added mid-fold stay queued", [m["content"] for m in racing._pending] == ["c"]
+          and racing.folds == 1, str(racing._pending))
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  13. TOOL-SCHEMA PRUNING
+# ═══════════════════════════════════════════════════════════════════════
+class _PromptSizedSession:
+    """prompt_eval_count grows with the request body, like a real prompt."""
+    def post(self, url, json=None, timeout=None, **kw):
+        import json as _json
+        return _FakeResponse({"message": {"role": "assistant", "content": "On it."}, "done": True,
+                              "prompt_eval_count": len(_json.dumps(json)) // 4, "eval_count": 3})
+
+
+def test_tool_pruning():
+    _section("13. Tool-Schema Pruning")
+    from brain.llm import NeonBrain, TOOLS, _COMMAND_RE
+    from brain.tool_selector import ToolSelector
+
+    sel = ToolSelector(TOOLS, command_re=_COMMAND_RE, top_k=4)
+    names = lambda text, stats=None: [t["function"]["name"] for t in sel.select(text, stats)]
+    _test("mute → volume_control + fallback", names("mute") == ["open_app", "search_google", "volume_control"])
+    _test("description examples match", "set_personality" in names("be more roasty")
+          and "brightness_control" in names("dim the screen"))
+    _test("multi-command keeps both tools", {"take_screenshot", "lock_screen"} <= set(names("take a screenshot and lock my pc")))
+    _test("fallback set always sent", {"open_app", "search_google"} <= set(names("hmm do the thing")))
+    _test("top-k bounds the list", len(sel.select("search play open delete create lock mute dim wifi")) <= 4 + 2)
+    usage = {"search_youtube": {"count": 40}, "search_google": {"count": 1}}
+    ranked = sorted(sel.scores("search cats", usage).items(), key=lambda kv: -kv[1])
+    _test("usage breaks ties", ranked[0][0] == "search_youtube", str(ranked[:2]))
+
+    counts = {}
+    for label, selector in (("all", None), ("pruned", sel)):
+        brain = NeonBrain(check_connection=False)
+        brain.session = _PromptSizedSession()
+        brain.tool_selector = selector
+        brain.chat("turn the volume down a bit")
+        counts[label] = brain.last_eval_stats
+    saved = counts["all"]["prompt_eval_count"] - counts["pruned"]["prompt_eval_count"]
+    _test("fewer schemas sent", counts["pruned"]["tools_sent"] < counts["all"]["tools_sent"] == len(TOOLS),
+          f"{counts['pruned']['tools_sent']} vs {counts['all']['tools_sent']}")
+    _test("prompt_eval_count saved per command turn", saved > 1000, f"saved {saved} tok")
+    _test("saving reported in eval stats", counts["pruned"]["tool_tokens_saved"] > 1000)
+    print(f"  ℹ️  prompt_eval {counts['all']['prompt_eval_count']} → {counts['pruned']['prompt_eval_count']} tok "
+          f"(-{saved}), est. schema tokens saved {counts['pruned']['tool_tokens_saved']}")
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  14. TRACING
+# ═══════════════════════════════════════════════════════════════════════
+class _TimedChatSession:
+    """Chat replies carrying Ollama's timing fields (ns)."""
+    def post(self, url, json=None, timeout=None, stream=False, **kw):
+        if stream:
+            return _FakeStreamResponse(json["model"], ["All ", "good, ", "Boss."], 0.01)
+        time.sleep(0.02)
+        return _FakeResponse({"model": json["model"], "message": {"role": "assistant", "content": "All good, Boss."},
+                              "done": True, "load_duration": 1_000_000, "prompt_eval_count": 40,
+                              "prompt_eval_duration": 5_000_000, "eval_count": 6,
+                              "eval_duration": 12_000_000, "total_duration": 19_000_000})
+
+
+def test_tracing():
+    _section("14. Per-Turn Tracing")
+    from brain.tracing import TurnTrace, TraceStats
+    from brain.llm import NeonBrain
+
+    stats = TraceStats(window=10)
+    trace = TurnTrace(stats)
+    with trace.span("a"):
+        time.sleep(0.01)
+    trace.add("ollama.eval", 7.0)
+    data = trace.finish()
+    _test("span measured", data["spans"][0]["name"] == "a" and data["spans"][0]["ms"] >= 9, str(data["spans"][0]))
+    _test("external duration attached", data["spans"][1] == {**data["spans"][1], "name": "ollama.eval", "ms": 7.0})
+    with trace.span("late"):
+        pass
+    summary = stats.summary()
+    _test("finished turn + late span in histograms", {"turn", "a", "ollama.eval", "late"} <= set(summary))
+    for ms in (0.5, 3, 3, 40, 20000):
+        stats.record({"x": ms})
+    hist = stats.summary()["x"]
+    _test("histogram buckets", hist["histogram"] == {"<=1ms": 1, "<=5ms": 2, "<=50ms": 1, ">10000ms": 1}, str(hist))
+    _test("rolling percentiles", hist["p50_ms"] == 3 and hist["max_ms"] == 20000)
+
+    brain = NeonBrain(check_connection=False)
+    brain._trace_stats = TraceStats()
+    brain.session = _TimedChatSession()
+    brain.chat("hey how are you doing today")
+    t = brain.last_trace
+    names = [s["name"] for s in t["spans"]]
+    _test("chat stages traced", all(n in names for n in
+          ("duplicate_check", "intent", "emotion", "prompt_build", "http", "postprocess")), str(names))
+    _test("ollama durations attached", t["ollama"]["prompt_eval_ms"] == 5.0 and "ollama.prompt_eval" in names)
+    _test("http span covers the round trip", next(s for s in t["spans"] if s["name"] == "http")["ms"] >= 20)
+    for _ in range(50):
+        if "memory_save" in [s["name"] for s in brain.last_trace["spans"]]:
+            break
+        time.sleep(0.01)
+    _test("background memory save traced", "memory_save" in [s["name"] for s in brain.last_trace["spans"]])
+
+    brain._last_input = ""
+    brain.chat("mute")
+    t = brain.last_trace
+    names = [s["name"] for s in t["spans"]]
+    _test("fast-path turn: tool + flavor spans, no http", t["outcome"] == "fast_path"
+          and "tool.volume_control" in names and "flavor" in names and "http" not in names, str(names))
+
+    brain._last_input = ""
+    "".join(brain.chat_stream("tell me something fun"))
+    _test("streamed turn traced", brain.last_trace["outcome"] == "llm"
+          and "http" in [s["name"] for s in brain.last_trace["spans"]])
+    summary = brain.trace_stats()
+    _test("rolling stats per stage", summary["turn"]["samples"] == 3 and summary["http"]["samples"] == 2,
+          str({k: v["samples"] for k, v in summary.items()}))
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  15. MOCK OLLAMA + BENCHMARK
+# ═══════════════════════════════════════════════════════════════════════
+def test_mock_bench():
+    _section("15. Mock Ollama Server + Offline Benchmark")
+    import json
+    import tempfile
+    import subprocess
+    import requests
+    from scripts.mock_ollama import MockOllama
+
+    server = MockOllama(token_ms=2, prompt_ms=0, seed=1).start()
+    try:
+        tags = requests.get(f"{server.url}/api/tags", timeout=5).json()
+        _test("tags lists models", [m["name"] for m in tags["models"]] == ["llama3.2:3b", "llama3.2:1b"])
+        missing = requests.post(f"{server.url}/api/chat", json={"model": "nope", "messages": []}, timeout=5)
+        _test("unknown model → 404", missing.status_code == 404 and "not found" in missing.json()["error"])
+
+        tools = [{"type": "function", "function": {"name": "open_app", "parameters": {}}}]
+        body = {"model": "llama3.2:3b", "messages": [{"role": "user", "content": "open spotify"}], "tools": tools}
+        msg = requests.post(f"{server.url}/api/chat", json={**body, "stream": False}, timeout=5).json()["message"]
+        _test("scripted tool call", msg["tool_calls"][0]["function"] == {"name": "open_app", "arguments": {"app_name": "spotify"}})
+
+        t0 = time.perf_counter()
+        resp = requests.post(f"{server.url}/api/chat", stream=True, timeout=5, json={
+            "model": "llama3.2:1b", "stream": True, "messages": [{"role": "user", "content": "hey there"}]})
+        chunks = [json.loads(line) for line in resp.iter_lines() if line]
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        words = len(chunks) - 1
+        _test("streamed token by token", words > 5 and chunks[-1]["done"] and chunks[-1]["eval_count"] == words)
+        _test("per-token latency applied", elapsed_ms >= words * 2, f"{elapsed_ms:.0f}ms for {words} tokens")
+
+        server.error_500 = 1.0
+        _test("500 injection", requests.post(f"{server.url}/api/generate",
+              json={"model": "llama3.2:3b", "prompt": ""}, timeout=5).status_code == 500)
+        _test("request counters", server.counts.get("error_500") == 1 and server.counts.get("chat") == 3,
+              str(server.counts))
+    finally:
+        server.stop()
+
+    # Full run in a child process: NEON_OLLAMA_URL has to be set before brain imports
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "report.json")
+        proc = subprocess.run(
+            [sys.executable, os.path.join(_REPO, "scripts", "bench_neon.py"), "--turns", "18",
+             "--concurrency", "3", "--token-ms", "1", "--json", out],
+            cwd=tmp, capture_output=True, text=True, timeout=180,
+        )
+        report = {}
+        if proc.returncode == 0 and os.path.exists(out):
+            with open(out, "r", encoding="utf-8") as f:
+                report = json.load(f)
+        _test("benchmark runs against the mock", report.get("turns") == 18, (proc.stderr or "")[-300:])
+        types = report.get("types") or {}
+        _test("all turn types measured", set(types) == {"command", "chat", "technical"}, str(list(types)))
+        _test("percentiles reported", all(r["p50_ms"] <= r["p95_ms"] <= r["p99_ms"] for r in types.values()))
+        _test("no failed turns", sum(r["errors"] for r in types.values()) == 0, report.get("first_error", ""))
+        _test("LLM turns went through the mock", (report.get("mock") or {}).get("chat", 0) > 0)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  16. SINGLE-FLIGHT
+# ═══════════════════════════════════════════════════════════════════════
+class _SlowChatSession:
+    """Counts chat calls; each one takes a while so retries overlap it."""
+    def __init__(self, delay: float = 0.2):
+        self.delay = delay
+        self.calls = 0
+
+    def post(self, url, json=None, timeout=None, stream=False, **kw):
+        self.calls += 1
+        time.sleep(self.delay)
+        return _FakeResponse({"message": {"role": "assistant", "content": f"Answer number {self.calls}, Boss."},
+                              "done": True, "prompt_eval_count": 10, "eval_count": 5})
+
+
+def test_single_flight():
+    _section("16. Single-Flight Coalescing")
+    import asyncio
+    import threading
+    from brain.singleflight import SingleFlight, flight_key
+    from brain.tool_registry import ToolSpec
+
+    _test("key ignores case / spacing", flight_key("s", "Open  YouTube ", "mobile") == flight_key("s", "open youtube", "mobile"))
+    _test("key keeps session + target", len({flight_key("a", "x", "mobile"), flight_key("b", "x", "mobile"),
+                                              flight_key("a", "x", "desktop")}) == 3)
+
+    flight = SingleFlight(grace_s=0.3)
+    runs = []
+
+    def work():
+        runs.append(1)
+        time.sleep(0.1)
+        return {"reply": "done", "n": len(runs)}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", work))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    _test("concurrent identical calls run once", len(runs) == 1 and len(results) == 5)
+    _test("every caller gets the same result", all(r is results[0] for r in results))
+    _test("retry inside grace window replays", flight.do("k", work) is results[0] and len(runs) == 1)
+    time.sleep(0.35)
+    _test("grace window expires", flight.do("k", work)["n"] == 2)
+    st = flight.stats()
+    _test("stats", st["leaders"] == 2 and st["coalesced"] == 4 and st["replayed"] == 1, str(st))
+
+    def boom():
+        time.sleep(0.05)
+        raise ValueError("nope")
+
+    errors = []
+
+    def call_boom():
+        try:
+            flight.do("bad", boom)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call_boom) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    _test("failure shared with waiters", len(errors) == 3)
+    _test("failures not kept", flight.do("bad", lambda: "ok") == "ok")
+
+    picky = SingleFlight(grace_s=5, keep=lambda r: r != "error")
+    picky.do("e", lambda: "error")
+    _test("rejected results not replayed", picky.do("e", lambda: "fresh") == "fresh")
+
+    async_runs = []
+
+    async def awork():
+        async_runs.append(1)
+        await asyncio.sleep(0.05)
+        return "async done"
+
+    async def gather(flight):
+        return await asyncio.gather(*(flight.ado("k", awork) for _ in range(5)))
+
+    out = asyncio.run(gather(SingleFlight()))
+    _test("async callers coalesced", out == ["async done"] * 5 and len(async_runs) == 1, f"runs={len(async_runs)}")
+
+    # End to end: a retried request gets the first request's reply, and Ollama is asked once
+    import neon_brain
+    neon_brain.sessions.http_session = _SlowChatSession()
+    session_id = "sf-test"
+    replies = []
+    threads = [threading.Thread(target=lambda: replies.append(
+        neon_brain.think_and_reply("tell me a fun fact", session_id=session_id))) for _ in range(3)]
+    for t in threads:
+        t.start()
+        time.sleep(0.02)
+    for t in threads:
+        t.join()
+    brain = neon_brain.sessions.get(session_id)
+    _test("retries share one LLM call", brain.session.calls == 1, f"calls={brain.session.calls}")
+    _test("retries get the same reply", len({r["reply"] for r in replies}) == 1 and "Answer number 1" in replies[0]["reply"],
+          str([r["reply"] for r in replies]))
+    again = neon_brain.think_and_reply("tell me a fun fact", session_id=session_id)
+    _test("late retry replays instead of 'I heard you'", again["reply"] == replies[0]["reply"])
+    _test("callers get their own dict", again is not replies[0])
+
+    volume = []
+
+    def volume_control(action: str = "", level=None, target: str = "auto"):
+        volume.append(action)
+        return {"status": "success", "message": f"Volume {action}."}
+
+    command_brain = neon_brain.sessions.get("sf-command")
+    registry = command_brain.system.tool_registry
+    command_brain.system.tool_registry = {**registry, "volume_control": ToolSpec("volume_control", volume_control)}
+    try:
+        neon_brain.think_and_reply("volume up", session_id="sf-command")
+        command_brain._last_input_ts -= 5   # past the brain's own 3 s duplicate check
+        neon_brain.think_and_reply("volume up", session_id="sf-command")
+    finally:
+        command_brain.system.tool_registry = registry
+    _test("finished command not replayed: repeat runs again", volume == ["up", "up"], str(volume))
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  17. BATCH CHAT
+# ═══════════════════════════════════════════════════════════════════════
+class _ConcurrentChatSession:
+    """Echoes the question back; tracks how many requests overlap."""
+    def __init__(self, delay: float = 0.1):
+        import threading
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.payloads = []
+
+    def post(self, url, json=None, timeout=None, stream=False, **kw):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            self.payloads.append(json)
+        question = json["messages"][-1]["content"].split("\n\n")[-1]
+        # Later prompts finish first, so input order has to be restored
+        time.sleep(self.delay * (1.5 if question.endswith("0") else 1.0))
+        with self.lock:
+            self.active -= 1
+        return _FakeResponse({"message": {"role": "assistant", "content": f"Reply to {question}"},
+                              "done": True, "prompt_eval_count": 10, "eval_count": 5})
+
+
+def test_chat_many():
+    _section("17. Bounded-Parallel Batch Chat")
+    import requests
+    from brain.llm import NeonBrain, OFFLINE_REPLY
+
+    brain = NeonBrain(check_connection=False)
+    brain.session = _ConcurrentChatSession(delay=0.1)
+    brain.history = [{"role": "user", "content": "earlier"}, {"role": "assistant", "content": "noted"}]
+    prompts = [f"tell me a story number {i}" for i in range(6)]
+
+    t0 = time.perf_counter()
+    replies = brain.chat_many(prompts, max_parallel=3)
+    elapsed = time.perf_counter() - t0
+    _test("replies in input order", [r.rstrip(".") for r in replies] == [f"Reply to {p}" for p in prompts], str(replies))
+    _test("at most max_parallel in flight", brain.session.peak == 3, f"peak={brain.session.peak}")
+    _test("faster than one at a time", elapsed < 6 * 0.1, f"{elapsed:.2f}s")
+    _test("turns appended in input order",
+          [m["content"] for m in brain.history[2::2]] == prompts and len(brain.history) == 14)
+    _test("every prompt saw the pre-batch history",
+          all(p["messages"][1]["content"] == "earlier" and len(p["messages"]) == 4 for p in brain.session.payloads))
+    _test("each batch turn traced", brain.last_trace["outcome"] == "llm"
+          and "http" in [s["name"] for s in brain.last_trace["spans"]])
+
+    brain.session = _ConcurrentChatSession(delay=0.01)
+    mixed = brain.chat_many(["mute", "what is a python decorator"], max_parallel=4)
+    _test("fast-path command in a batch skips the LLM", len(brain.session.payloads) == 1 and len(mixed) == 2 and mixed[0])
+
+    brain.session = _ConcurrentChatSession(delay=0.01)
+    twice = brain.chat_many(["tell me a joke", "tell me a joke"])
+    _test("repeated prompt in a batch answered twice",
+          len(brain.session.payloads) == 2 and all(r.startswith("Reply to tell me a joke") for r in twice), str(twice))
+
+    before_history = list(brain.history)
+    before_status = dict(brain.engine.status)
+    brain.session = _ConcurrentChatSession(delay=0.05)
+    stateless = brain.chat_many(["i love you so much", "open spotify", "explain recursion"], stateless=True)
+    _test("stateless replies in order", stateless == ["Reply to i love you so much", "Reply to open spotify",
+                                                      "Reply to explain recursion"], str(stateless))
+    _test("stateless leaves history + emotion alone",
+          brain.history == before_history and brain.engine.status == before_status)
+    _test("stateless sends no history or tools",
+          all(len(p["messages"]) == 2 and "tools" not in p for p in brain.session.payloads))
+
+    class _DownSession:
+        def post(self, *a, **kw):
+            raise requests.exceptions.ConnectionError("refused")
+        def get(self, *a, **kw):
+            raise requests.exceptions.ConnectionError("refused")
+
+    offline = NeonBrain(check_connection=False)
+    offline.breaker = None
+    offline.session = _DownSession()
+    _test("offline batch answers every prompt",
+          offline.chat_many(["hey there", "how are you"]) == [OFFLINE_REPLY, OFFLINE_REPLY])
+    _test("empty batch", brain.chat_many([]) == [])
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  18. TOOL DISPATCH REGISTRY
+# ═══════════════════════════════════════════════════════════════════════
+def test_tool_registry():
+    _section("18. Precompiled Tool Dispatch Registry")
+    from brain.llm import NeonBrain, TOOLS
+    from scripts.bench_tool_dispatch import run as bench_dispatch
+
+    brain = NeonBrain(check_connection=False)
+    registry = brain.system.tool_registry
+    _test("every schema has a registered tool", {t["function"]["name"] for t in TOOLS} <= set(registry))
+    _test("risk level carried", registry["delete_file"].risk == "high" and registry["open_app"].risk == "low")
+    _test("internal methods not dispatchable", "close_whatsapp_session" not in registry and "_log" not in registry)
+
+    vol = registry["volume_control"]
+    _test("int level from string", vol.prepare({"action": "set", "level": "40"}) == {"action": "set", "level": 40})
+    _test("int level from float", vol.prepare({"action": "set", "level": 75.0})["level"] == 75)
+    _test("uncoercible level dropped", vol.prepare({"action": "up", "level": "loud"}) == {"action": "up"})
+    _test("unknown args dropped", vol.prepare({"action": "mute", "bogus": 1}) == {"action": "mute"})
+    music = registry["play_music"]
+    _test("bool flag coerced", music.prepare({"query": "lofi", "autoplay": "false"}, "desktop")["autoplay"] is False)
+    _test("headless → mobile target", registry["open_app"].prepare({"app_name": "x"}, "auto", headless=True)["target"] == "mobile")
+    _test("explicit desktop kept", registry["open_app"].prepare({"app_name": "x"}, "desktop", headless=True)["target"] == "desktop")
+    _test("non-device tool untouched",
+          registry["toggle_connectivity"].prepare({"target": "wifi"}, "mobile", headless=True) == {"target": "wifi"})
+
+    context = []
+    out = brain._execute_tool_calls([{"function": {"name": "close_whatsapp_session", "arguments": {}}}], context)
+    _test("unregistered tool reported, not run", "not found" in out)
+    brain._current_user_lower = "open spotify"
+    brain._execute_tool_calls([{"function": {"name": "open_app", "arguments": '{"app_name": "spotify"}'}}], context, target="mobile")
+    _test("dispatch through the registry", isinstance(brain.last_action, dict) and brain.last_action.get("type"), str(brain.last_action))
+
+    results = bench_dispatch(iterations=500)
+    _test("registry dispatch cheaper than per-call introspection", results["registry"] < results["legacy"], str(results))
+    print(f"  ℹ️  dispatch overhead {results['legacy']:.1f} → {results['registry']:.1f} µs/call")
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  19. PARALLEL TOOL CALLS
+# ═══════════════════════════════════════════════════════════════════════
+def test_parallel_tools():
+    _section("19. Parallel Execution of Independent Tool Calls")
+    import threading
+    from brain.llm import NeonBrain
+    from brain.tool_registry import ToolSpec
+    from brain.tool_executor import run_tool_calls
+
+    log = []
+    lock = threading.Lock()
+    active = {"n": 0, "peak": 0, "high_overlap": False}
+
+    def spec(name: str, delay: float, risk: str = "low") -> ToolSpec:
+        def tool(tag: str = ""):
+            with lock:
+                active["n"] += 1
+                active["peak"] = max(active["peak"], active["n"])
+                log.append(("start", name, tag))
+            time.sleep(delay)
+            with lock:
+                if risk == "high" and active["n"] > 1:
+                    active["high_overlap"] = True
+                active["n"] -= 1
+                log.append(("end", name, tag))
+            return {"status": "success", "message": f"{name} {tag}"}
+        return ToolSpec(name, tool, risk=risk)
+
+    brain = NeonBrain(check_connection=False)
+    brain.system.tool_registry = {
+        "open_app":       spec("open_app", 0.2),
+        "search_google":  spec("search_google", 0.2),
+        "volume_control": spec("volume_control", 0.1),
+        "power_control":  spec("power_control", 0.1, risk="high"),
+    }
+    brain._current_user_lower = "open spotify and search google for lo-fi"
+
+    def calls(*names):
+        return [{"function": {"name": n, "arguments": {"tag": f"#{i}"}}} for i, n in enumerate(names)]
+
+    context = []
+    t0 = time.perf_counter()
+    out = brain._execute_tool_calls(calls("open_app", "search_google"), context)
+    elapsed = time.perf_counter() - t0
+    _test("independent tools overlap", elapsed < 0.35 and active["peak"] == 2, f"{elapsed:.2f}s peak={active['peak']}")
+    _test("results in call order", out.split("\n") == ["open_app #0", "search_google #1"], out)
+    _test("context messages in call order", [m["name"] for m in context] == ["open_app", "search_google"])
+
+    log.clear()
+    brain._execute_tool_calls(calls("volume_control", "volume_control", "open_app"), [])
+    vol = [entry for entry in log if entry[1] == "volume_control"]
+    _test("conflicting tools serialized in order",
+          [e[0] + e[2] for e in vol] == ["start#0", "end#0", "start#1", "end#1"], str(vol))
+
+    log.clear()
+    active["peak"] = 0
+    brain._execute_tool_calls(calls("open_app", "power_control", "search_google"), [])
+    order = [(e[0], e[1]) for e in log]
+    _test("high-risk tool runs alone", not active["high_overlap"]
+          and order.index(("end", "open_app")) < order.index(("start", "power_control"))
+          and order.index(("end", "power_control")) < order.index(("start", "search_google")), str(order))
+
+    out = brain._execute_tool_calls(calls("open_app", "made_up_tool"), [])
+    _test("unknown tool still reported in place", out.split("\n")[1].startswith("Error: Tool 'made_up_tool'"), out)
+    _test("single worker = sequential", run_tool_calls([(None, lambda: 1), (None, lambda: 2)], max_workers=1) == [1, 2])
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  20. ASYNC SLOW TOOLS
+# ═══════════════════════════════════════════════════════════════════════
+def test_async_tools():
+    _section("20. Async Slow Tools")
+    from brain.llm import NeonBrain
+    from brain.tool_registry import ToolSpec
+    from brain.async_tools import AsyncToolRunner, is_slow
+
+    _test("youtube lookup is slow", is_slow("play_music", {"query": "async tools test track", "platform": "youtube", "autoplay": True}))
+    _test("spotify is instant", not is_slow("play_music", {"query": "lofi", "platform": "spotify"}))
+    _test("no autoplay is instant", not is_slow("play_music", {"query": "lofi", "platform": "youtube", "autoplay": False}))
+    _test("whatsapp send is slow", is_slow("send_whatsapp_message", {"contact_name": "mom", "message": "hi"}))
+    _test("other tools are instant", not is_slow("open_app", {"app_name": "spotify"}))
+
+    def play_music(query: str = "", platform: str = "spotify", autoplay: bool = True, target: str = "auto"):
+        if platform == "youtube":
+            time.sleep(0.5)
+        return {
+            "status": "success",
+            "message": f"Playing {query} on {platform}.",
+            "action": {"type": "open_url", "url": f"https://{platform}.example/{query}"},
+        }
+
+    brain = NeonBrain(check_connection=False)
+    brain.system.tool_registry = {"play_music": ToolSpec("play_music", play_music)}
+    brain._current_user_lower = "play lofi on youtube"
+
+    def call(platform: str):
+        return [{"function": {"name": "play_music", "arguments": {"query": "lofi", "platform": platform}}}]
+
+    _test("off by default", brain.async_tools is None and brain.poll_tool_results() == [])
+    t0 = time.perf_counter()
+    out = brain._execute_tool_calls(call("youtube"), [])
+    _test("without the runner the turn waits", time.perf_counter() - t0 >= 0.45 and "Playing lofi" in out, out)
+
+    delivered = []
+    brain.enable_async_tools(on_result=delivered.append)
+    brain.last_action, brain.last_pending = None, []
+    context = []
+    t0 = time.perf_counter()
+    out = brain._execute_tool_calls(call("youtube"), context)
+    elapsed = time.perf_counter() - t0
+    _test("slow tool acknowledged right away", elapsed < 0.2 and "on YouTube" in out, f"{elapsed:.2f}s {out}")
+    _test("pending handle recorded", len(brain.last_pending) == 1 and brain.last_pending[0]["tool"] == "play_music", str(brain.last_pending))
+    _test("no action until it finishes", brain.last_action is None)
+    _test("acknowledgement in the tool context", context and context[0]["content"] == out)
+    _test("listed as pending", [h["id"] for h in brain.async_tools.pending()] == [brain.last_pending[0]["id"]])
+
+    results = brain.poll_tool_results(timeout=2.0)
+    _test("result delivered through the queue", len(results) == 1 and results[0]["id"] == brain.last_pending[0]["id"], str(results))
+    result = results[0] if results else {}
+    _test("action payload delivered", (result.get("action") or {}).get("url") == "https://youtube.example/lofi", str(result))
+    _test("reply is flavored text", isinstance(result.get("reply"), str) and "lofi" in result.get("reply", ""), str(result))
+    _test("elapsed reported", result.get("elapsed_ms", 0) >= 450, str(result.get("elapsed_ms")))
+    _test("callback got the same result", delivered == results)
+    _test("queue drained", brain.poll_tool_results() == [] and brain.async_tools.pending() == [])
+
+    brain.last_pending = []
+    out = brain._execute_tool_calls(call("spotify"), [])
+    _test("instant tool stays synchronous", "Playing lofi on spotify" in out and brain.last_pending == []
+          and brain.last_action.get("url", "").startswith("https://spotify"), out)
+
+    def send_whatsapp_message(contact_name: str = "", message: str = ""):
+        time.sleep(0.2)
+        return {"status": "error", "message": f"Could not find contact '{contact_name}' in WhatsApp."}
+
+    brain.system.tool_registry["send_whatsapp_message"] = ToolSpec("send_whatsapp_message", send_whatsapp_message, risk="high")
+    brain._last_input = ""
+    turn, early = brain._prepare_turn("send hi to mom on whatsapp")
+    reply = brain._complete_turn(turn, {"role": "assistant", "content": "", "tool_calls": [
+        {"function": {"name": "send_whatsapp_message", "arguments": {"contact_name": "mom", "message": "hi"}}}]})
+    _test("pending send acknowledged, not reported as done",
+          early is None and "I'll tell you when it's through" in (reply or "") and "delivered" not in (reply or "").lower(), str(reply))
+    results = brain.poll_tool_results(timeout=2.0)
+    failed = results[0] if results else {}
+    _test("failing slow tool delivered as an error", failed.get("status") == "error", str(failed))
+    _test("error reply is the tool's own message",
+          failed.get("reply") == "Could not find contact 'mom' in WhatsApp.", str(failed.get("reply")))
+
+    brain._last_input = ""
+    reply = brain.chat("play async test song on youtube")
+    _test("pending play acknowledged verbatim", reply == "Finding 'async test song' on YouTube, it will start in a moment.", str(reply))
+    brain.poll_tool_results(timeout=2.0)
+
+    runner = AsyncToolRunner(max_queued=2)
+    def boom():
+        raise RuntimeError("driver gone")
+    for _ in range(3):
+        runner.submit("send_whatsapp_message", {}, boom, lambda result: {"status": "success"})
+    deadline = time.time() + 2
+    while runner.completed < 3 and time.time() < deadline:
+        time.sleep(0.01)
+    results = runner.poll()
+    _test("failing tool delivered as an error", results and all(r["status"] == "error" and "driver gone" in r["reply"] for r in results), str(results))
+    _test("result queue bounded (oldest dropped)", len(results) == 2, str(len(results)))
+    runner.shutdown()
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  21. YOUTUBE VIDEO-ID CACHE
+# ═══════════════════════════════════════════════════════════════════════
+def test_youtube_cache():
+    _section("21. Persistent YouTube Query → videoId Cache")
+    import tempfile
+    import brain.youtube_cache as youtube_cache
+    from brain.youtube_cache import VideoIdCache, normalize_query
+    from brain.system_controller import SystemController
+    from brain.async_tools import is_slow
+
+    calls = []
+
+    def stub(query: str):
+        calls.append(query)
+        return None if "nothing" in query else "dQw4w9WgXcQ"
+
+    def html_stub(query: str):
+        calls.append("html:" + query)
+        return "jfKfPfyJRdk" if "fallback" in query else None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "youtube_cache.json")
+        cache = VideoIdCache(path=path, max_entries=3)
+        _test("query normalized", normalize_query("  Lofi   BEATS!! ") == "lofi beats")
+        _test("miss runs the resolver", cache.resolve("lofi beats", [stub]) == "dQw4w9WgXcQ" and calls == ["lofi beats"])
+        t0 = time.perf_counter()
+        video_id = cache.resolve("Lofi  Beats!", [stub])
+        hit_us = (time.perf_counter() - t0) * 1e6
+        _test("repeat resolves from the cache", video_id == "dQw4w9WgXcQ" and len(calls) == 1, str(calls))
+        _test("hit takes microseconds", hit_us < 1000, f"{hit_us:.0f}µs")
+
+        calls.clear()
+        _test("next resolver on a miss", cache.resolve("fallback song", [lambda q: None, html_stub]) == "jfKfPfyJRdk")
+        _test("resolver recorded", cache._entries["fallback song"]["source"] == "html_stub")
+
+        calls.clear()
+        _test("failed lookup returns None", cache.resolve("nothing here", [stub, html_stub]) is None and len(calls) == 2)
+        _test("failure cached (no second lookup)", cache.resolve("nothing here", [stub, html_stub]) is None and len(calls) == 2)
+        _test("negative hit counted", cache.stats()["negative_hits"] == 1, str(cache.stats()))
+
+        reloaded = VideoIdCache(path=path)
+        _test("entries survive a restart", reloaded.get("lofi beats") == (True, "dQw4w9WgXcQ") and len(reloaded) == 3)
+
+        cache.get("lofi beats")
+        cache.put("new song", "AAAAAAAAAAA")
+        _test("LRU evicts the least recently used", "fallback song" not in cache and "lofi beats" in cache and len(cache) == 3)
+
+        short = VideoIdCache(path="", ttl_seconds=0.05, negative_ttl_seconds=0.05)
+        short.put("a", "AAAAAAAAAAA")
+        short.put("b", None)
+        time.sleep(0.08)
+        _test("entries expire after their TTL", short.get("a") == (False, None) and short.get("b") == (False, None))
+        mixed = VideoIdCache(path="", ttl_seconds=60, negative_ttl_seconds=0.05)
+        mixed.put("a", "AAAAAAAAAAA")
+        mixed.put("b", None)
+        time.sleep(0.08)
+        _test("failures expire sooner", mixed.get("a") == (True, "AAAAAAAAAAA") and "b" not in mixed)
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("{broken")
+        _test("corrupted file → empty cache", len(VideoIdCache(path=path)) == 0)
+
+        calls.clear()
+        system = SystemController(require_confirmation=False)
+        system.youtube_cache = VideoIdCache(path=os.path.join(tmp, "controller.json"))
+        system.youtube_resolvers = [stub]
+        first = system.play_music("lofi beats", platform="youtube", target="mobile")
+        second = system.play_music("LOFI beats", platform="youtube", target="mobile")
+        url = (second.get("action") or {}).get("url", "")
+        _test("play_music resolves through the cache",
+              "v=dQw4w9WgXcQ" in url and first.get("action") == second.get("action") and calls == ["lofi beats"], str(calls))
+        miss = system.play_music("nothing at all", platform="youtube", target="mobile")
+        _test("no result → YouTube Music search", "music.youtube.com/search" in (miss.get("action") or {}).get("url", ""))
+
+        shared, youtube_cache._SHARED_CACHE = youtube_cache._SHARED_CACHE, VideoIdCache(path="")
+        try:
+            youtube_cache._SHARED_CACHE.put("daily song", "AAAAAAAAAAA")
+            _test("cached lookup not sent to the background",
+                  not is_slow("play_music", {"query": "Daily Song", "platform": "youtube"})
+                  and is_slow("play_music", {"query": "weekly song", "platform": "youtube"}))
+        finally:
+            youtube_cache._SHARED_CACHE = shared
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  22. WARM YT-DLP RESOLVER
+# ═══════════════════════════════════════════════════════════════════════
+def test_yt_resolver():
+    _section("22. Warm In-Process yt-dlp Resolver")
+    import threading
+    from brain import yt_resolver
+    from brain.yt_resolver import YtDlpResolver
+    from brain.youtube_cache import VideoIdCache
+    from brain.system_controller import SystemController, _yt_dlp_first_video_id
+
+    searches = []
+
+    class FakeYDL:
+        def __init__(self):
+            time.sleep(0.1)   # import / extractor setup
+
+        def extract_info(self, url, download=True):
+            searches.append((url, download, threading.current_thread().name))
+            query = url.split(":", 1)[1]
+            if "slow" in query:
+                time.sleep(0.3)
+            if "broken" in query:
+                raise RuntimeError("HTTP Error 429")
+            if "empty" in query:
+                return {"entries": []}
+            return {"entries": [{"id": "id-" + query.replace(" ", "-")}]}
+
+    resolver = YtDlpResolver(factory=FakeYDL, timeout=1.0).start()
+    _test("lookup returns the top video id", resolver("lofi beats") == "id-lofi-beats")
+    _test("searches ytsearch1 without download",
+          searches[0][:2] == ("ytsearch1:lofi beats", False) and searches[0][2] == "neon-yt-resolver", str(searches[:1]))
+    t0 = time.perf_counter()
+    ids = [resolver(f"song {i}") for i in range(5)]
+    warm_ms = (time.perf_counter() - t0) * 1000 / 5
+    _test("one YoutubeDL reused for every lookup", resolver.instances == 1 and ids[4] == "id-song-4", str(resolver.stats()))
+    _test("warm lookups skip the setup cost", warm_ms < 50, f"{warm_ms:.1f}ms")
+
+    out = {}
+    threads = [threading.Thread(target=lambda q=q: out.__setitem__(q, resolver(q))) for q in ("a", "b", "c")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    _test("concurrent lookups queued on one worker", out == {"a": "id-a", "b": "id-b", "c": "id-c"}, str(out))
+
+    _test("no result → None", resolver("empty search") is None)
+    _test("extractor error → None", resolver("broken search") is None and resolver.errors == 1)
+    t0 = time.perf_counter()
+    _test("per-request timeout", resolver.lookup("slow search", timeout=0.1) is None and time.perf_counter() - t0 < 0.25)
+    _test("timeout counted", resolver.timeouts == 1)
+    _test("worker keeps serving after a timeout", resolver("after") == "id-after")
+    _test("socket timeout set for yt-dlp", yt_resolver.YDL_OPTIONS["socket_timeout"] == yt_resolver.YT_SOCKET_TIMEOUT)
+
+    release = threading.Event()
+
+    class HangingYDL(FakeYDL):
+        def extract_info(self, url, download=True):
+            if "hang" in url:
+                release.wait(5)   # a dead connection without a socket timeout
+                return {"entries": [{"id": "too-late"}]}
+            return super().extract_info(url, download)
+
+    hanging = YtDlpResolver(factory=HangingYDL, timeout=0.3).start()
+    hanging("warm up")
+    out = {}
+    stuck = threading.Thread(target=lambda: out.__setitem__("hang", hanging("hang forever")))
+    t0 = time.perf_counter()
+    stuck.start()
+    time.sleep(0.05)   # the worker is now inside the hung extraction
+    out["q"] = hanging.lookup("queued song", timeout=2.0)
+    stuck.join()
+    _test("hung extraction times out", out.get("hang", "missing") is None and hanging.timeouts == 1)
+    _test("hung worker replaced by a fresh one", hanging.stats()["recycles"] == 1 and hanging.instances == 2,
+          str(hanging.stats()))
+    _test("later lookups not blocked by the hung one", out.get("q") == "id-queued-song"
+          and time.perf_counter() - t0 < 1.5, str(out))
+    release.set()
+    _test("abandoned worker's late answer dropped", hanging("next song") == "id-next-song")
+    hanging.stop()
+    _test("empty query not sent", resolver("") is None)
+
+    cache = VideoIdCache(path="")
+    cache.resolve("cached song", [resolver])
+    _test("cache records the warm resolver", cache._entries["cached song"]["source"] == "yt_dlp_warm")
+    resolver.stop()
+
+    failing = YtDlpResolver(factory=lambda: (_ for _ in ()).throw(ImportError("no extractor")), timeout=1.0)
+    _test("broken init → None, not a crash", failing("x") is None)
+    failing.stop()
+
+    system = SystemController(require_confirmation=False)
+    first = system.youtube_resolvers[0]
+    if yt_resolver._YTDLP_OK:
+        _test("library importable → warm resolver first", isinstance(first, YtDlpResolver))
+    else:
+        _test("library missing → subprocess fallback", first is _yt_dlp_first_video_id and yt_resolver.get_shared_yt_resolver() is None)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  23. CHAT_STREAM
+# ═══════════════════════════════════════════════════════════════════════
+class _ScriptedStreamSession:
+    """Streams `words` (then `tool_calls`, if any); non-stream posts get the whole reply."""
+    def __init__(self, words, tool_calls=None, latency=0.03):
+        self.words, self.tool_calls, self.latency = list(words), tool_calls, latency
+
+    def post(self, url, json=None, timeout=None, stream=False, **kw):
+        if not stream:
+            message = {"role": "assistant", "content": "".join(self.words)}
+            if self.tool_calls:
+                message["tool_calls"] = self.tool_calls
+            return _FakeResponse({"model": json["model"], "message": message, "done": True})
+        response = _FakeStreamResponse(json["model"], self.words, self.latency)
+        tool_calls = self.tool_calls
+        lines = response.iter_lines
+
+        def iter_lines(chunk_size=None):
+            import json as _json
+            for line in lines(chunk_size):
+                if tool_calls and _json.loads(line).get("done"):
+                    yield _json.dumps({"message": {"content": "", "tool_calls": tool_calls}, "done": False}).encode()
+                yield line
+        response.iter_lines = iter_lines
+        return response
+
+
+def test_chat_stream():
+    _section("23. Streamed Replies (chat_stream)")
+    from brain.llm import NeonBrain
+    from brain.tool_registry import ToolSpec
+
+    def stream(brain, prompt):
+        brain._last_input = ""
+        t0 = time.perf_counter()
+        pieces, times = [], []
+        for piece in brain.chat_stream(prompt):
+            pieces.append(piece)
+            times.append(time.perf_counter() - t0)
+        return pieces, times, time.perf_counter() - t0
+
+    words = ["Hey Boss, idk ", "what you mean 😅 rn. ", "*giggles* Tell me ", "more about ", "it, ok? ",
+             "I'm all ears ", "tonight."]
+    brain = NeonBrain(check_connection=False)
+    brain.session = _ScriptedStreamSession(words)
+    pieces, times, total = stream(brain, "hey what do you think about rainy days")
+    streamed = "".join(pieces)
+    _test("sentences streamed one by one", len(pieces) >= 3, str(pieces))
+    _test("pieces join to the final reply", streamed == brain.last_reply, f"{streamed!r} vs {brain.last_reply!r}")
+    _test("history holds the same text", brain.history[-1]["content"] == streamed)
+    _test("emoji / slang / actions cleaned before yielding",
+          not any(t in streamed for t in ("😅", "idk", " rn", "*giggles*")) and "I don't know" in pieces[0], str(pieces))
+    _test("first sentence before the stream ends", times[0] < total * 0.6, f"{times[0]:.2f}s of {total:.2f}s")
+    _test("ttft recorded at the first sentence", brain.last_ttft is not None and brain.last_ttft < total * 0.6)
+
+    brain._last_input = ""
+    chat_brain = NeonBrain(check_connection=False)
+    chat_brain.session = _ScriptedStreamSession(words)
+    _test("same text as chat()", chat_brain.chat("hey what do you think about rainy days") == streamed)
+
+    brain.session = _ScriptedStreamSession(["Okay Boss, here we go. *waves ", "happily at you* ", "See you soon, ok? ", "Bye."])
+    pieces, _, _ = stream(brain, "hey say bye to me nicely")
+    _test("open *action* never leaks mid-stream",
+          not any("waves" in p for p in pieces) and "".join(pieces) == brain.last_reply, str(pieces))
+
+    brain.session = _ScriptedStreamSession(['{"name": "play_music", ', '"arguments": {"query": "lofi"}}'])
+    pieces, _, _ = stream(brain, "hey what do you think about jazz")
+    _test("tool JSON held back and intercepted",
+          pieces == [brain.last_reply] and "{" not in pieces[0] and "catch that" in pieces[0], str(pieces))
+
+    calls = []
+
+    def open_app(app_name: str = "", target: str = "auto"):
+        calls.append(app_name)
+        return {"status": "success", "message": f"Opened {app_name}."}
+
+    brain.system.tool_registry = {"open_app": ToolSpec("open_app", open_app, target="device")}
+    brain.session = _ScriptedStreamSession(["Sure Boss, ", "opening it now. "],
+                                           tool_calls=[{"function": {"name": "open_app", "arguments": {"app_name": "spotify"}}}])
+    pieces, _, _ = stream(brain, "could you open spotify and then search lofi on google")
+    _test("command turn: tool runs, model wording held",
+          calls == ["spotify"] and pieces == [brain.last_reply] and "opening it now" not in pieces[0].lower(), str(pieces))
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  24. SESSION MANAGER
+# ═══════════════════════════════════════════════════════════════════════
+class _StubSessionBrain:
+    """Just enough of a brain for SessionManager: records how it was built."""
+    def __init__(self, system=None, memory=None, http_session=None, check_connection=True, restore_emotion=True):
+        self.system, self.memory, self.session = system, memory, http_session
+        self.check_connection = check_connection
+        self.restore_emotion = restore_emotion
+        self.async_tools = None
+
+
+class _PendingRunner:
+    def __init__(self, pending):
+        self._pending = pending
+
+    def pending(self):
+        return list(self._pending)
+
+
+def test_sessions():
+    _section("24. Per-Session Brains & Eviction")
+    import asyncio
+    from brain.sessions import SessionManager
+    from brain.llm import NeonBrain
+
+    manager = SessionManager(brain_cls=_StubSessionBrain, max_sessions=3, ttl_seconds=60, pinned=("home",))
+    home = manager.get("home")
+    a, b = manager.get("a"), manager.get("b")
+    _test("one brain per session", len({id(home), id(a), id(b)}) == 3 and len(manager) == 3)
+    _test("same session → same brain", manager.get("a") is a)
+    _test("shared system / memory / pool", a.system is b.system and a.memory is b.memory and a.session is b.session)
+    _test("only the first brain pings Ollama", home.check_connection and not a.check_connection)
+    _test("session id normalized for `in`", " a " in manager and "" not in manager)
+
+    manager.get("c")   # full: "b" is least recently used ("a" was touched above)
+    _test("LRU evicts the least recently used", "b" not in manager and "a" in manager and "c" in manager)
+    _test("pinned never evicted", "home" in manager)
+    st = manager.stats()
+    _test("stats", st["sessions"] == 3 and st["max_sessions"] == 3 and st["evictions"] == 1, str(st))
+
+    with manager.turn("a"):
+        manager.get("d")
+        _test("session mid-turn skipped by LRU", "a" in manager and "c" not in manager)
+
+    manager.get("a").async_tools = _PendingRunner([{"id": "play_music-1", "tool": "play_music"}])
+    manager.get("e")
+    _test("session with a pending async tool skipped", "a" in manager and "d" not in manager)
+
+    async def async_turn():
+        async with manager.aturn("e"):
+            manager.get("a")   # "e" is now the least recently used
+            manager.get("f")
+    manager.get("a").async_tools = None
+    asyncio.run(async_turn())
+    _test("session mid-async-turn skipped", "e" in manager and "a" not in manager)
+
+    ttl = SessionManager(brain_cls=_StubSessionBrain, max_sessions=10, ttl_seconds=0.1, pinned=("home",))
+    ttl.get("home")
+    ttl.get("old")
+    ttl.get("busy").async_tools = _PendingRunner([{"id": "send_whatsapp_message-1", "tool": "send_whatsapp_message"}])
+    time.sleep(0.15)
+    ttl.get("new")
+    _test("idle session expires after the TTL", "old" not in ttl and "new" in ttl)
+    _test("TTL keeps pinned and busy sessions", "home" in ttl and "busy" in ttl)
+
+    class _SlowBrain(_StubSessionBrain):
+        built = []
+
+        def __init__(self, **kw):
+            _SlowBrain.built.append(1)
+            time.sleep(0.3)   # memory restore, emotion engine, ...
+            super().__init__(**kw)
+
+    import threading
+    slow = SessionManager(brain_cls=_StubSessionBrain, max_sessions=10)
+    ready = slow.get("ready")
+    slow.brain_cls = _SlowBrain
+    builders = [threading.Thread(target=slow.get, args=("new",)) for _ in range(3)]
+    for t in builders:
+        t.start()
+    time.sleep(0.05)
+    t0 = time.perf_counter()
+    other = slow.get("ready")
+    lookup_ms = (time.perf_counter() - t0) * 1000
+    for t in builders:
+        t.join()
+    _test("building a brain doesn't block other sessions", other is ready and lookup_ms < 100, f"{lookup_ms:.0f}ms")
+    _test("concurrent first use builds one brain", len(_SlowBrain.built) == 1 and len(slow) == 2)
+
+    # One lock per session for sync and async turns
+    order = []
+
+    def sync_turn():
+        with slow.turn("ready"):
+            order.append("sync start")
+            time.sleep(0.2)
+            order.append("sync end")
+
+    async def async_turn_after_sync():
+        await asyncio.sleep(0.05)
+        async with slow.aturn("ready"):
+            order.append("async")
+
+    worker = threading.Thread(target=sync_turn)
+    worker.start()
+    asyncio.run(async_turn_after_sync())
+    worker.join()
+    _test("sync and async turns of one session never overlap", order == ["sync start", "sync end", "async"], str(order))
+
+    # Emotion is per conversation: only pinned sessions restore the shared state
+    shared = SessionManager(brain_cls=NeonBrain, pinned=("home",))
+    shared._checked_connection = True
+    shared.memory.state.update({"grudge_score": 42.0, "affection": 12.0, "last_interaction": time.time()})
+    home, phone = shared.get("home"), shared.get("phone")
+    _test("pinned session restores shared emotion", home.engine.status["grudge_score"] == 42.0)
+    _test("new session starts fresh", phone.engine.status["grudge_score"] == 0.0
+          and phone.engine.status["affection"] != 12.0, str(phone.engine.status))
+
+    import neon_brain
+    result = neon_brain.think_and_reply("   ", session_id="never-seen")
+    _test("empty prompt creates no session", result["mode"] == "calm" and "never-seen" not in neon_brain.sessions, str(result))
+    result = asyncio.run(neon_brain.think_and_reply_async("", session_id="never-seen-async"))
+    _test("empty async prompt creates no session", result["mode"] == "calm" and "never-seen-async" not in neon_brain.sessions)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  25. ASYNC BRAIN
+# ═══════════════════════════════════════════════════════════════════════
+def test_async_brain():
+    _section("25. Async Brain (achat)")
+    import asyncio
+    import threading
+    import brain.llm as llm
+    import brain.async_llm as async_llm
+    from brain.llm import NeonBrain, OFFLINE_REPLY
+    from brain.async_llm import AsyncNeonBrain, aclose_shared_client
+    from brain.tool_registry import ToolSpec
+    from scripts.mock_ollama import MockOllama
+
+    def point_at(base_url):
+        # Both clients read the module-level URLs on every request
+        llm.OLLAMA_URL = async_llm.OLLAMA_URL = f"{base_url}/api/chat"
+        llm.OLLAMA_GENERATE_URL = f"{base_url}/api/generate"
+
+    saved = (llm.OLLAMA_URL, async_llm.OLLAMA_URL, llm.OLLAMA_GENERATE_URL)
+    server = MockOllama(token_ms=0, prompt_ms=0, seed=1).start()
+    only_large = MockOllama(models=(llm.LARGE_MODEL_NAME,), token_ms=0, prompt_ms=0, seed=1).start()
+    try:
+        point_at(server.url)
+        prompt = "hey how was your day today"
+        sync_brain = NeonBrain(check_connection=False)
+        sync_reply = sync_brain.chat(prompt)
+
+        async def scenario():
+            out = {}
+            brain = AsyncNeonBrain(check_connection=False)
+            out["reply"] = await brain.achat(prompt)
+            out["history"] = [dict(m) for m in brain.history]
+
+            loop_thread = threading.get_ident()
+            tool_threads = []
+
+            def open_app(app_name: str = "", target: str = "auto"):
+                tool_threads.append(threading.get_ident())
+                return {"status": "success", "message": f"Opened {app_name}."}
+
+            brain.system.tool_registry = {"open_app": ToolSpec("open_app", open_app, target="device")}
+            brain._last_input = ""
+            await brain.achat("could you open spotify and then search lofi on google")
+            out["tool_off_loop"] = bool(tool_threads) and loop_thread not in tool_threads
+
+            point_at(only_large.url)
+            missing = AsyncNeonBrain(check_connection=False)
+            out["fallback"] = await missing.achat("hey tell me something nice")
+
+            point_at("http://127.0.0.1:9")   # nothing listens on the discard port
+            offline = AsyncNeonBrain(check_connection=False)
+            out["offline"] = await offline.achat("hey are you still there")
+
+            import neon_brain
+            point_at(server.url)
+            out["backend"] = await neon_brain.think_and_reply_async("hey what are you up to", session_id="async-brain")
+            await aclose_shared_client()
+            return out
+
+        out = asyncio.run(scenario())
+        _test("achat reply matches chat()", out["reply"] == sync_reply and bool(sync_reply), f"{out['reply']!r} vs {sync_reply!r}")
+        _test("achat history matches chat()",
+              [(m["role"], m["content"]) for m in out["history"]] == [(m["role"], m["content"]) for m in sync_brain.history])
+        _test("tool calls run off the event loop", out["tool_off_loop"])
+        _test("404 falls back to an installed model",
+              out["fallback"] not in (None, "", OFFLINE_REPLY) and only_large.counts.get("error_404", 0) >= 1,
+              f"{out['fallback']!r} {only_large.counts}")
+        _test("offline → offline reply", out["offline"] == OFFLINE_REPLY, repr(out["offline"]))
+        _test("think_and_reply_async answers", out["backend"]["reply"] and "mode" in out["backend"], str(out["backend"]))
+    finally:
+        llm.OLLAMA_URL, async_llm.OLLAMA_URL, llm.OLLAMA_GENERATE_URL = saved
+        server.stop()
+        only_large.stop()
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  RUN ALL
+# ═══════════════════════════════════════════════════════════════════════
+def main():
+    global passed, failed, total
+
+    test_sentence_splitting()
+    test_prompt_layout()
+    test_prompt_cache()
+    test_model_warmup()
+    test_model_registry()
+    test_fast_path()
+    test_response_cache()
+    test_router()
+    test_hedging()
+    test_circuit_breaker()
+    test_token_budget()
+    test_rolling_summary()
+    test_tool_pruning()
+    test_tracing()
+    test_mock_bench()
+    test_single_flight()
+    test_chat_many()
+    test_tool_registry()
+    test_parallel_tools()
+    test_async_tools()
+    test_youtube_cache()
+    test_yt_resolver()
+    test_chat_stream()
+    test_sessions()
+    test_async_brain()
+
+    print(f"\n{'='*70}")
+    print(f"  ⚡ PERFORMANCE RESULTS: {passed}/{total} passed, {failed} failed")
+    print(f"{'='*70}")
+
+    if failed > 0:
+        print(f"\n❌ {failed} TEST(S) FAILED!")
+        return 1
+    else:
+        print("\n✅ ALL PERFORMANCE TESTS PASSED!")
+        return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
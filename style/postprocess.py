@@ -143,3 +143,29 @@ def prepare_tts_text(text: str, max_chars: int = 360) -> str:
                 text += "."
 
     return text
+
+
+# Sentence end: terminal punctuation (plus closing quotes/brackets) followed by whitespace.
+# "3.5" or "example.com" never split because no whitespace follows the dot.
+_SENTENCE_END_RE = re.compile(r"[.!?~]+[\"')\]]*\s+")
+
+
+def split_complete_sentences(buffer: str, min_chars: int = 12) -> tuple:
+    """
+    Splits streamed text into complete sentences + the unfinished remainder.
+    Very short sentences ("Hi.") are merged with the next one so the TTS
+    server isn't called for tiny fragments.
+
+    Returns (sentences, remainder).
+    """
+    sentences = []
+    start = 0
+    pending = ""
+    for m in _SENTENCE_END_RE.finditer(buffer or ""):
+        pending += buffer[start:m.end()]
+        start = m.end()
+        if len(pending.strip()) >= min_chars:
+            sentences.append(pending.strip())
+            pending = ""
+    remainder = pending + (buffer or "")[start:]
+    return sentences, remainder
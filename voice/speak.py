@@ -5,12 +5,22 @@ import numpy as np
 from io import BytesIO
 import re
 import os
+import queue
+import threading
 
 try:
     from style.postprocess import prepare_tts_text as _shared_prepare_tts_text
+    from style.postprocess import split_complete_sentences, postprocess_reply
 except ImportError:
     _shared_prepare_tts_text = None
 
+    def postprocess_reply(text):
+        return (text or "").strip()
+
+    def split_complete_sentences(buffer, min_chars=12):
+        parts = re.split(r"(?<=[.!?])\s+", buffer or "")
+        return [p for p in parts[:-1] if p.strip()], parts[-1]
+
 # =========================
 # ⚙️ CONFIGURATION
 # =========================
@@ -24,6 +34,11 @@ REF_LANG = "en"
 # Session for faster API calls (Keep-Alive)
 session = requests.Session()
 
+# One output stream: speak(), a SpeechPipeline reply and background
+# announcements (main.announce_tool_result) take turns instead of cutting
+# each other off with sd.play / sd.stop
+_PLAYBACK_LOCK = threading.RLock()
+
 VOICE_STYLE = "default"
 _VOICE_STYLE_PARAMS = {
     # Keep changes subtle; GPT-SoVITS can get unstable with extreme params.
@@ -96,25 +111,17 @@ def _prepare_text(text: str) -> str:
 
     return text
 
-def speak(text: str):
+def _synthesize(clean_text: str):
     """
-    Synthesizes speech and plays it immediately.
-    Blocking Mode: True (Prevents bot from listening to itself).
+    Sends already-prepared text to GPT-SoVITS.
+    Returns (mono float32 audio, sample_rate) or None on failure.
     """
-    
-    # 1. Pre-Check
-    clean_text = _prepare_text(text)
-    if not clean_text:
-        return
-    print(f"[TTS RAW] {text!r}")
-    print(f"[TTS SAY] {clean_text!r}")
-
     # Check if reference audio exists to avoid API 500 errors
     if not os.path.exists(REF_AUDIO_PATH):
         print(f"[ERROR] [Neon VOICE] Reference audio not found at {REF_AUDIO_PATH}")
-        return
+        return None
 
-    # 2. API Payload (Optimized Parameters)
+    # API Payload (Optimized Parameters)
     style = _VOICE_STYLE_PARAMS.get(VOICE_STYLE, _VOICE_STYLE_PARAMS["default"])
     payload = {
         "text": clean_text,
@@ -133,37 +140,170 @@ def speak(text: str):
     }
 
     try:
-        # 3. Request TTS
         response = session.post(API_URL, json=payload, timeout=30)
-        
+
         if response.status_code != 200:
             print(f"[WARN] [Neon VOICE] API Error {response.status_code}: {response.text}")
-            return
+            return None
 
-        # 4. Process Audio
         audio_data = BytesIO(response.content)
         audio, sr = sf.read(audio_data, dtype="float32")
 
         # Stereo to Mono conversion (if needed)
         if audio.ndim > 1:
             audio = np.mean(audio, axis=1)
-
-        # 5. Audio Padding (Hardware Warmup + Cutoff Prevention)
-        # 0.25s silence at START (Wake up speakers)
-        # 0.1s silence at END (Prevent trailing cut-off)
-        start_silence = np.zeros(int(sr * 0.25), dtype=np.float32)
-        end_silence = np.zeros(int(sr * 0.1), dtype=np.float32)
-        
-        final_audio = np.concatenate([start_silence, audio, end_silence])
-
-        # 6. Playback (Blocking)
-        sd.play(final_audio, sr)
-        sd.wait()
+        return audio, sr
 
     except requests.exceptions.ConnectionError:
         print("[ERROR] [Neon VOICE] Connection refused. Is GPT-SoVITS running?")
     except Exception as e:
         print(f"[ERROR] [Neon VOICE] Critical error: {e}")
+    return None
+
+
+def _play(audio, sr, lead_in: float = 0.25, tail: float = 0.1) -> None:
+    """
+    Blocking playback with padding.
+    lead_in: silence at START (wake up speakers), tail: silence at END
+    (prevents trailing cut-off).
+    """
+    start_silence = np.zeros(int(sr * lead_in), dtype=np.float32)
+    end_silence = np.zeros(int(sr * tail), dtype=np.float32)
+    final_audio = np.concatenate([start_silence, audio, end_silence])
+
+    try:
+        with _PLAYBACK_LOCK:
+            sd.play(final_audio, sr)
+            sd.wait()
+    except Exception as e:
+        print(f"[ERROR] [Neon VOICE] Playback error: {e}")
+
+
+def speak(text: str):
+    """
+    Synthesizes speech and plays it immediately.
+    Blocking Mode: True (Prevents bot from listening to itself).
+    """
+    
+    # 1. Pre-Check
+    clean_text = _prepare_text(text)
+    if not clean_text:
+        return
+    print(f"[TTS RAW] {text!r}")
+    print(f"[TTS SAY] {clean_text!r}")
+
+    # 2. Request TTS
+    result = _synthesize(clean_text)
+    if result is None:
+        return
+
+    # 3. Playback (Blocking)
+    _play(*result)
+
+
+# =========================
+# 🔁 SENTENCE PIPELINE
+# =========================
+_ACTION_ONLY_RE = re.compile(r"\*.*?\*|\(.*?\)")
+
+
+class SpeechPipeline:
+    """
+    Sentence-pipelined TTS for streamed replies.
+
+    feed() receives text as the model generates it. Every complete sentence
+    goes through postprocess_reply (the cleanup chat() applies: emoji, slang,
+    markdown) and prepare_tts_text and is synthesized on a worker thread while
+    the model keeps generating; a player thread plays the clips strictly in
+    order from an audio queue. First audio therefore starts after roughly one
+    sentence of generation + one synthesis, not after the whole reply.
+
+    Usage:
+        pipe = SpeechPipeline(stop_check=lambda: STOP_REQUESTED)
+        for delta in brain.chat_stream(text):
+            pipe.feed(delta)
+        pipe.finish()
+        pipe.wait()
+    """
+
+    def __init__(self, stop_check=None):
+        self._stop_check = stop_check or (lambda: False)
+        self._buffer = ""
+        self._text_q: "queue.Queue" = queue.Queue()
+        self._audio_q: "queue.Queue" = queue.Queue()
+        self._cancelled = threading.Event()
+        self._synth_thread = threading.Thread(target=self._synth_loop, daemon=True)
+        self._play_thread = threading.Thread(target=self._play_loop, daemon=True)
+        self._synth_thread.start()
+        self._play_thread.start()
+
+    def _stopped(self) -> bool:
+        return self._cancelled.is_set() or bool(self._stop_check())
+
+    def feed(self, delta: str) -> None:
+        """Adds streamed text; queues every sentence that is now complete."""
+        if not delta or self._stopped():
+            return
+        self._buffer += delta
+        sentences, self._buffer = split_complete_sentences(self._buffer)
+        for sentence in sentences:
+            self._text_q.put(sentence)
+
+    def finish(self) -> None:
+        """Flushes the unfinished tail and closes the text queue."""
+        tail = self._buffer.strip()
+        self._buffer = ""
+        if tail and not self._stopped():
+            self._text_q.put(tail)
+        self._text_q.put(None)
+
+    def cancel(self) -> None:
+        """Drops everything not yet played."""
+        self._cancelled.set()
+        self._text_q.put(None)
+        try:
+            sd.stop()
+        except Exception:
+            pass
+
+    def wait(self, timeout: float = None) -> None:
+        self._play_thread.join(timeout)
+
+    def _synth_loop(self) -> None:
+        while True:
+            sentence = self._text_q.get()
+            if sentence is None or self._stopped():
+                break
+            # Sentences that are only "(smiles)" / "*laughs*" have nothing to say
+            if not re.search(r"[A-Za-z0-9]", _ACTION_ONLY_RE.sub("", sentence)):
+                continue
+            # Same text chat() would return; a no-op for chat_stream output,
+            # which is already cleaned sentence by sentence
+            clean_text = _prepare_text(postprocess_reply(sentence))
+            if not clean_text:
+                continue
+            result = _synthesize(clean_text)
+            if result is not None:
+                self._audio_q.put(result)
+        self._audio_q.put(None)
+
+    def _play_loop(self) -> None:
+        first = True
+        try:
+            while True:
+                item = self._audio_q.get()
+                if item is None or self._stopped():
+                    break
+                if first:
+                    # The whole reply is one utterance: nothing else plays in between
+                    _PLAYBACK_LOCK.acquire()
+                audio, sr = item
+                # Only the first clip needs the speaker wake-up lead-in
+                _play(audio, sr, lead_in=0.25 if first else 0.0, tail=0.05)
+                first = False
+        finally:
+            if not first:
+                _PLAYBACK_LOCK.release()
 
 # Test run (optional)
 if __name__ == "__main__":